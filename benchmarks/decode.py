@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+"""
+Compares decoding large NX-API responses from the text of the response, as
+the connectors used to, with decoding them from its bytes with
+aeon.base.decode, with each installed JSON backend.  No device is needed;
+captured responses may be given, or outputs of the same shape are made up:
+
+    benchmarks/decode.py
+    benchmarks/decode.py --json show-ip-route.json --xml show-ip-route.xml --config config.xml
+"""
+
+from __future__ import print_function
+
+import argparse
+import importlib
+import json
+import timeit
+
+import requests
+from lxml import etree
+
+from aeon.base import decode
+from aeon.nxos.connector import _parse_config_resp, _parse_opcmd_resp
+
+
+def cli():
+    psr = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    psr.add_argument('--json', help='captured ins_api JSON response of a show command')
+    psr.add_argument('--xml', help='captured ins_api XML response of a show command')
+    psr.add_argument('--config', help='captured ins_api XML response of a configuration')
+    psr.add_argument('--routes', type=int, default=20000,
+                     help='routes in the made up show ip route output')
+    psr.add_argument('-n', '--count', type=int, default=10,
+                     help='responses decoded in each run')
+    psr.add_argument('-r', '--repeat', type=int, default=3,
+                     help='runs of each case; the best is reported')
+    return psr.parse_args()
+
+
+def read(filename):
+    with open(filename, 'rb') as f:
+        return f.read()
+
+
+def show_ip_route(routes):
+    return {'TABLE_vrf': {'ROW_vrf': {'vrf-name-out': 'default', 'TABLE_addrf': {'ROW_addrf': {
+        'addrf': 'ipv4', 'TABLE_prefix': {'ROW_prefix': [
+            {'ipprefix': '10.%d.%d.0/24' % (index // 256, index % 256), 'ucast-nhops': '1',
+             'mcast-nhops': '0', 'attached': 'false',
+             'TABLE_path': {'ROW_path': [
+                 {'ipnexthop': '192.168.0.1', 'ifname': 'Eth1/1', 'uptime': 'P1DT2H',
+                  'pref': '110', 'metric': '41', 'clientname': 'ospf-1', 'type': 'intra',
+                  'ubest': 'true'}]}}
+            for index in range(routes)]}}}}}}
+
+
+def to_xml(tag, value):
+    if isinstance(value, dict):
+        return '<%s>%s</%s>' % (tag, ''.join(to_xml(key, each) for key, each in value.items()), tag)
+    if isinstance(value, list):
+        return ''.join(to_xml(tag, each) for each in value)
+    return '<%s>%s</%s>' % (tag, value, tag)
+
+
+def responses(args):
+    body = show_ip_route(args.routes)
+    as_json = args.json and read(args.json) or json.dumps({'ins_api': {
+        'type': 'cli_show', 'version': '1.0', 'sid': 'eoc', 'outputs': {'output': {
+            'input': 'show ip route', 'msg': 'Success', 'code': '200', 'body': body}}}}).encode()
+
+    as_xml = args.xml and read(args.xml) or (
+        '<?xml version="1.0"?>\n<ins_api><type>cli_show</type><version>1.0</version><sid>eoc</sid>'
+        '<outputs><output><body>%s</body><input>show ip route</input><msg>Success</msg>'
+        '<code>200</code></output></outputs></ins_api>' % to_xml('show_ip_route', body)).encode()
+
+    config = args.config and read(args.config) or (
+        '<?xml version="1.0"?>\n<ins_api><type>cli_conf</type><version>1.0</version><sid>eoc</sid>'
+        '<outputs>%s</outputs></ins_api>' % ''.join(
+            '<output><body/><code>200</code><msg>Success</msg></output>'
+            for _ in range(args.routes))).encode()
+
+    return as_json, as_xml, config
+
+
+def response(content, content_type):
+    resp = requests.models.Response()
+    resp._content = content
+    resp.headers['Content-Type'] = content_type
+    return resp
+
+
+def cases(as_json, as_xml, config):
+    # the former parsing, from requests.Response.text and .json()
+    json_resp = response(as_json, 'application/json')
+    xml_resp = response(as_xml, 'text/xml')
+    config_resp = response(config, 'text/xml')
+
+    yield 'json', 'text', lambda: json.loads(json_resp.text)['ins_api']['outputs']['output']['body']
+    yield 'json', 'resp.json()', lambda: json_resp.json()['ins_api']['outputs']['output']['body']
+    yield 'xml', 'text', lambda: etree.XML(xml_resp.text).find('outputs/output/body')
+    yield 'config', 'text', lambda: etree.XML(config_resp.text).find('outputs/output/clierror')
+
+    for backend in decode.JSON_BACKENDS:
+        try:
+            importlib.import_module(backend)
+        except ImportError:
+            continue
+        yield 'json', 'bytes/%s' % backend, (
+            lambda backend=backend: decode.set_json_backend(backend) and _parse_opcmd_resp(as_json, 'json'))
+
+    yield 'xml', 'bytes', lambda: _parse_opcmd_resp(as_xml, 'xml')
+    yield 'config', 'bytes', lambda: _parse_config_resp(config)
+
+
+def main():
+    args = cli()
+    as_json, as_xml, config = responses(args)
+    sizes = dict(json=len(as_json), xml=len(as_xml), config=len(config))
+
+    default = decode.json_backend()
+    try:
+        for kind, how, func in cases(as_json, as_xml, config):
+            elapsed = min(timeit.repeat(func, number=args.count, repeat=args.repeat))
+            print('%-6s %8.1fMB %-14s %9.2fms/response' % (
+                kind, sizes[kind] / 1e6, how, 1000 * elapsed / args.count))
+    finally:
+        decode.set_json_backend(default)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+"""
+Compares the cost of encoding NX-API show requests and decoding their
+responses with the XML ins_api envelope and with JSON-RPC, for one command
+and for a batch of commands.  No device is needed.
+
+    benchmarks/nxapi_encoding.py -n 20000
+"""
+
+from __future__ import print_function
+
+import argparse
+import json
+import timeit
+
+from aeon.nxos.connector import (
+    NxosOperRequest, _parse_opcmd_resp, _parse_opcmds_resp,
+    _jsonrpc_request, _parse_jsonrpc_resp)
+
+# the output of 'show interface brief' for one interface, as found in the
+# polling of a 48 port switch.
+ROW = {'interface': 'Ethernet1/1', 'vlan': '1', 'type': 'eth', 'portmode': 'access',
+       'state': 'up', 'state_rsn_desc': 'none', 'speed': '10G', 'ratemode': 'D'}
+BODY = {'TABLE_interface': {'ROW_interface': [dict(ROW, interface='Ethernet1/%d' % port)
+                                              for port in range(1, 49)]}}
+
+
+def cli():
+    psr = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    psr.add_argument('-n', '--count', type=int, default=10000,
+                     help='requests encoded and responses decoded in each run')
+    psr.add_argument('-b', '--batch', type=int, default=10,
+                     help='commands in a batch')
+    psr.add_argument('-r', '--repeat', type=int, default=3,
+                     help='runs of each case; the best is reported')
+    return psr.parse_args()
+
+
+def ins_api_resp(commands):
+    outputs = [dict(code='200', msg='Success', input=cmd, body=BODY) for cmd in commands]
+    return json.dumps({'ins_api': {'type': 'cli_show', 'version': '1.0', 'sid': 'eoc', 'outputs': {
+        'output': outputs[0] if len(outputs) == 1 else outputs}}})
+
+
+def jsonrpc_resp(commands):
+    got = [dict(jsonrpc='2.0', id=index, result=dict(body=BODY))
+           for index, _ in enumerate(commands, 1)]
+    return json.dumps(got[0] if len(got) == 1 else got)
+
+
+def cases(batch):
+    command = 'show interface brief'
+    commands = [command] * batch
+
+    one_ins_api, many_ins_api = ins_api_resp([command]), ins_api_resp(commands)
+    one_jsonrpc, many_jsonrpc = jsonrpc_resp([command]), jsonrpc_resp(commands)
+
+    return [
+        ('encode', 'one command', 'ins_api', lambda: str(NxosOperRequest(command=command))),
+        ('encode', 'one command', 'jsonrpc', lambda: _jsonrpc_request([command])),
+        ('encode', 'batch', 'ins_api', lambda: str(NxosOperRequest(command=' ;'.join(commands)))),
+        ('encode', 'batch', 'jsonrpc', lambda: _jsonrpc_request(commands)),
+        ('decode', 'one command', 'ins_api', lambda: _parse_opcmd_resp(one_ins_api, 'json')),
+        ('decode', 'one command', 'jsonrpc', lambda: _parse_jsonrpc_resp(one_jsonrpc, [command])),
+        ('decode', 'batch', 'ins_api', lambda: _parse_opcmds_resp(many_ins_api, commands)),
+        ('decode', 'batch', 'jsonrpc', lambda: _parse_jsonrpc_resp(many_jsonrpc, commands)),
+    ]
+
+
+def main():
+    args = cli()
+    for step, size, transport, func in cases(args.batch):
+        elapsed = min(timeit.repeat(func, number=args.count, repeat=args.repeat))
+        print('%-6s %-11s %-7s %8.3fs %8.2fus/call' % (
+            step, size, transport, elapsed, 1e6 * elapsed / args.count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+"""
+Compares running many small commands on a Linux-based device with a channel
+per command (Connector.execute) and in the persistent shell of the connector
+(Connector.execute(shell=True)).
+
+    benchmarks/shell_session.py 10.0.0.100 -u cumulus -p CumulusLinux! -n 200
+"""
+
+from __future__ import print_function
+
+import argparse
+import time
+
+from aeon.cumulus.connector import Connector
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def cli():
+    psr = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    psr.add_argument('target', help='hostname or IP address of the device')
+    psr.add_argument('-u', '--user', default='admin')
+    psr.add_argument('-p', '--passwd', default='admin')
+    psr.add_argument('-n', '--count', type=int, default=100,
+                     help='number of commands in each run')
+    psr.add_argument('-c', '--command', default='cat /sys/class/net/eth0/operstate',
+                     help='command to run')
+    psr.add_argument('-r', '--repeat', type=int, default=3,
+                     help='runs of each mode; the best is reported')
+    return psr.parse_args()
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = _clock()
+        good, results = func()
+        elapsed = _clock() - start
+        assert good, results[-1]
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    args = cli()
+    con = Connector(args.target, user=args.user, passwd=args.passwd, pool=None)
+    commands = [args.command] * args.count
+
+    # open the shell up front, its setup is paid once per connector.
+    con.shell
+
+    modes = [
+        ('channel per command', lambda: con.execute(commands)),
+        ('persistent shell', lambda: con.execute(commands, shell=True))]
+
+    try:
+        for name, func in modes:
+            elapsed = timed(func, args.repeat)
+            print('%-20s %4d commands %8.3fs %8.2fms/command' % (
+                name, args.count, elapsed, 1000 * elapsed / args.count))
+    finally:
+        con.close()
+
+
+if __name__ == '__main__':
+    main()
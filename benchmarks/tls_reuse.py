@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+"""
+Compares eAPI requests over HTTPS made with a new connection and a full TLS
+handshake each, with a new connection resuming the TLS session of the last,
+and over one kept-alive connection.
+
+By default a local TLS stand-in for eAPI is used, which measures the client
+side only; the handshake costs far more on the CPU of a switch:
+
+    benchmarks/tls_reuse.py -n 200
+    benchmarks/tls_reuse.py --target 10.0.0.101 -u admin -p admin -n 200
+"""
+
+from __future__ import print_function
+
+import argparse
+import datetime
+import json
+import os
+import shutil
+import ssl
+import tempfile
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+import requests.packages.urllib3
+
+from aeon.eos.connector import Connector
+from aeon.base.http import TLS_RESUMPTION, http_pool
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+def cli():
+    psr = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    psr.add_argument('--target', help='hostname or IP address of an EOS device, '
+                                      'instead of the local stand-in')
+    psr.add_argument('-u', '--user', default='admin')
+    psr.add_argument('-p', '--passwd', default='admin')
+    psr.add_argument('-n', '--count', type=int, default=100,
+                     help='number of requests in each run')
+    psr.add_argument('-r', '--repeat', type=int, default=3,
+                     help='runs of each mode; the best is reported')
+    return psr.parse_args()
+
+
+class EapiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['content-length'])).decode())
+        body = json.dumps(dict(jsonrpc='2.0', id=request['id'],
+                               result=[{} for _ in request['params']['cmds']])).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TLSServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def get_request(self):
+        sock, addr = self.socket.accept()
+        return self.context.wrap_socket(sock, server_side=True), addr
+
+    def handle_error(self, request, client_address):
+        pass
+
+
+def stand_in():
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    # RSA 2048, as found on most devices
+    key = rsa.generate_private_key(65537, 2048, default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, u'switch')])
+    now = datetime.datetime.utcnow()
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        key.public_key()).serial_number(1).not_valid_before(now).not_valid_after(
+        now + datetime.timedelta(days=1)).sign(key, hashes.SHA256(), default_backend())
+
+    tmpdir = tempfile.mkdtemp()
+    try:
+        certfile, keyfile = os.path.join(tmpdir, 'cert.pem'), os.path.join(tmpdir, 'key.pem')
+        with open(certfile, 'wb') as f:
+            f.write(cert.public_bytes(serialization.Encoding.PEM))
+        with open(keyfile, 'wb') as f:
+            f.write(key.private_bytes(
+                serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+                serialization.NoEncryption()))
+
+        server = TLSServer(('127.0.0.1', 0), EapiHandler)
+        server.context = ssl.SSLContext(getattr(ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23))
+        server.context.load_cert_chain(certfile, keyfile)
+    finally:
+        shutil.rmtree(tmpdir)
+
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    return server
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = _clock()
+        func()
+        elapsed = _clock() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    args = cli()
+    requests.packages.urllib3.disable_warnings()
+
+    server = None
+    if args.target:
+        target, port = args.target, 443
+    else:
+        server = stand_in()
+        target, port = '127.0.0.1', server.server_port
+
+    def connector(pool):
+        return Connector(target, port=port, proto='https', user=args.user, passwd=args.passwd,
+                         pool=pool)
+
+    def full_handshake():
+        for _ in range(args.count):
+            con = connector(http_pool())
+            con.execute('show clock')
+            con.close()
+
+    def resumed():
+        pool = http_pool()
+        for _ in range(args.count):
+            con = connector(pool)
+            con.execute('show clock')
+            pool.poolmanager.clear()
+
+    def keepalive():
+        con = connector(None)
+        for _ in range(args.count):
+            con.execute('show clock')
+        con.close()
+
+    modes = [('full handshake', full_handshake)]
+    if TLS_RESUMPTION:
+        modes.append(('resumed session', resumed))
+    modes.append(('kept-alive', keepalive))
+
+    try:
+        for name, func in modes:
+            elapsed = timed(func, args.repeat)
+            print('%-16s %4d requests %8.3fs %8.2fms/request' % (
+                name, args.count, elapsed, 1000 * elapsed / args.count))
+    finally:
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,12 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import sys
+
+if sys.version_info < (3, 5):
+    raise ImportError('aeon.aio requires Python 3.5 or later')
+
+from aeon.aio.device import Device  # NOQA
+from aeon.aio.utils import get_device  # NOQA
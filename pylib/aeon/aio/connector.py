@@ -0,0 +1,298 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import asyncio
+import itertools
+import socket
+import ssl
+from copy import deepcopy
+
+import aiohttp
+import asyncssh
+
+from aeon import exceptions
+from aeon.exceptions import LoginNotReadyError, ConfigError, CommandError
+from aeon.cumulus.connector import _batch_boundary, _batch_script, _batch_results
+from aeon.eos.exceptions import EosException
+from aeon.nxos import exceptions as NxosExc
+from aeon.nxos.connector import NxosConnector as _NxosConnector
+from aeon.nxos.connector import (
+    NxosOperRequest, NxosConfigRequest, _RE_CONF,
+    _check_resp_status, _parse_config_resp, _parse_opcmd_resp, _parse_opcmds_resp)
+
+
+__all__ = ['SshConnector', 'EapiConnector', 'NxosConnector']
+
+
+class SshConnector(object):
+    """
+    asyncio counterpart of aeon.cumulus.connector.Connector, used for the
+    Cumulus, Ubuntu, CentOS and OPX devices.
+    """
+    DEFAULT_PROTOCOL = 'ssh'
+    DEFAULT_MAX_CHANNELS = 8
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        self.proto = kwargs.get('proto') or self.DEFAULT_PROTOCOL
+        self.port = kwargs.get('port') or socket.getservbyname('ssh')
+        self.user = kwargs.get('user', 'admin')
+        self.passwd = kwargs.get('passwd', 'admin')
+
+        # an already authenticated asyncssh connection may be handed over
+        # by the caller (e.g. aeon.aio.get_device).
+        self._conn = kwargs.get('client')
+
+    @property
+    def connected(self):
+        return self._conn is not None
+
+    async def open(self):
+        if self._conn is not None:
+            return
+
+        try:
+            self._conn = await asyncssh.connect(
+                self.hostname, port=self.port,
+                username=self.user, password=self.passwd,
+                known_hosts=None)
+
+        except Exception as exc:
+            raise LoginNotReadyError(exc=exc, message='Unable to connect.')
+
+    async def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            await self._conn.wait_closed()
+            self._conn = None
+
+    async def execute(self, commands, stop_on_error=True, batch=False):
+        if batch:
+            boundary = _batch_boundary()
+            got = await self._conn.run(_batch_script(commands, boundary, stop_on_error))
+            return _batch_results(commands, boundary, got.stdout, got.stderr)
+
+        results = []
+        exit_code_collector = 0
+
+        for cmd in commands:
+            result = await self._exec_command(cmd)
+            exit_code_collector |= result['exit_code']
+            results.append(result)
+
+            if stop_on_error is True and result['exit_code'] != 0:
+                return False, results
+
+        return bool(0 == exit_code_collector), results
+
+    async def execute_concurrent(self, commands, max_channels=DEFAULT_MAX_CHANNELS):
+        """
+        As aeon.cumulus.connector.Connector.execute_concurrent.
+        """
+        channels = asyncio.Semaphore(max_channels)
+
+        async def exec_command(cmd):
+            async with channels:
+                return await self._exec_command(cmd)
+
+        results = await asyncio.gather(*[exec_command(cmd) for cmd in commands])
+        return all(0 == result['exit_code'] for result in results), list(results)
+
+    async def _exec_command(self, cmd):
+        got = await self._conn.run(cmd)
+        return dict(cmd=cmd, exit_code=got.exit_status,
+                    stdout=got.stdout,
+                    stderr=got.stderr)
+
+
+class _HttpConnector(object):
+    """
+    Common handling of the aiohttp session for the HTTP based connectors.
+    A session given as the 'session' keyword is shared, not owned, by the
+    connector; this allows one connection pool to be used for many devices.
+    """
+    DEFAULT_PROTOCOL = 'http'
+    DEFAULT_TIMEOUT = 60
+
+    def __init__(self, hostname, **kwargs):
+        self.hostname = hostname
+        self.proto = kwargs.get('proto') or self.DEFAULT_PROTOCOL
+        self.port = kwargs.get('port') or socket.getservbyname(self.proto)
+        self.user = kwargs.get('user')
+        self.passwd = kwargs.get('passwd')
+
+        self.session = kwargs.get('session')
+        self._owns_session = self.session is None
+
+    @property
+    def api_auth(self):
+        return aiohttp.BasicAuth(self.user, self.passwd)
+
+    async def open(self):
+        if self.session is None:
+            self.session = aiohttp.ClientSession()
+
+    async def close(self):
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+
+class EapiConnector(_HttpConnector):
+    """
+    asyncio counterpart of aeon.eos.connector.Connector, using the eAPI
+    JSON-RPC interface directly.
+    """
+    DEFAULT_TIMEOUT = 240
+
+    _request_ids = itertools.count(1)
+
+    def __init__(self, hostname, **kwargs):
+        super(EapiConnector, self).__init__(hostname, **kwargs)
+        if self.proto not in ('http', 'https'):
+            raise ValueError('unsupported eAPI transport: %s' % self.proto)
+
+        self.api_url = "{proto}://{target}:{port}/command-api".format(
+            proto=self.proto, port=self.port, target=self.hostname)
+
+    async def _run_cmds(self, commands, encoding='json'):
+        body = dict(jsonrpc='2.0', method='runCmds',
+                    id=next(self._request_ids),
+                    params=dict(version=1, cmds=commands, format=encoding))
+
+        # as for pyeapi, the device certificate is not verified
+        async with self.session.post(
+                self.api_url, json=body, auth=self.api_auth, ssl=False,
+                timeout=aiohttp.ClientTimeout(total=self.DEFAULT_TIMEOUT)) as resp:
+            got = await resp.json(content_type=None)
+
+        if 'error' in got:
+            raise EosException(got['error'].get('message'))
+
+        return got
+
+    async def execute(self, commands, encoding='json'):
+
+        # Make a copy of commands so that commands object isn't mutated outside of this function
+        commands = deepcopy(commands)
+
+        # Convert to list if not already a list
+        commands = commands if isinstance(commands, list) else [commands]
+
+        # Add 'enable' if not the first enty in the commands list
+        if commands[0] != 'enable':
+            commands.insert(0, 'enable')
+        try:
+            got = await self._run_cmds(commands, encoding=encoding)
+        except Exception as exc:
+            raise CommandError(exc=exc, commands=commands)
+
+        results = got['result']
+        results.pop(0)
+        return results if len(results) > 1 else results.pop()
+
+    async def configure(self, contents):
+        if not isinstance(contents, list):
+            raise RuntimeError('contents must be a list, for now')
+
+        # filters out empty lines
+        contents = ['enable', 'configure'] + list(filter(bool, contents))
+
+        try:
+            await self._run_cmds(contents)
+        except Exception as exc:
+            raise ConfigError(exc=exc, contents=contents)
+
+
+class NxosConnector(_HttpConnector):
+    """
+    asyncio counterpart of aeon.nxos.connector.NxosConnector.
+    """
+    MAX_OPCMDS = _NxosConnector.MAX_OPCMDS
+
+    def __init__(self, hostname, **kwargs):
+        super(NxosConnector, self).__init__(hostname, **kwargs)
+
+        self.api_url = "{proto}://{target}:{port}/ins".format(
+            proto=self.proto, port=self.port, target=self.hostname)
+
+        self.api_headers = {
+            'content-type': 'text/xml'
+        }
+
+        # as aeon.nxos.connector.NxosConnector, the connector keeps the
+        # nxapi_auth cookie the device sets once the user is authenticated,
+        # so that later requests skip the AAA login.  It is kept by the
+        # connector, not in the cookie jar of the session, which may be
+        # shared, and which keeps no cookie of a device addressed by IP.
+        self._cookies = {}
+
+        # as for aeon.nxos.connector.NxosConnector, the device certificate
+        # is verified unless 'verify' is False, with the CA bundle at the
+        # path given as 'verify' if it is one
+        self.verify = kwargs.get('verify', True)
+        if isinstance(self.verify, str):
+            self._ssl = ssl.create_default_context(cafile=self.verify)
+        else:
+            self._ssl = None if self.verify else False
+
+    async def _send(self, rqst, timeout=None):
+        _timeout = timeout if timeout is not None else self.DEFAULT_TIMEOUT
+        try:
+            async with self.session.post(
+                    self.api_url, headers=self.api_headers,
+                    auth=self.api_auth, data=str(rqst),
+                    ssl=self._ssl, cookies=self._cookies,
+                    timeout=aiohttp.ClientTimeout(total=_timeout)) as resp:
+                content = await resp.read()
+
+            if 'nxapi_auth' in resp.cookies:
+                self._cookies['nxapi_auth'] = resp.cookies['nxapi_auth'].value
+
+        except asyncio.TimeoutError as exc:
+            cmd_exc = exceptions.TimeoutError(exc)
+            cmd_exc.timeout = timeout
+            raise cmd_exc
+
+        except Exception as exc:
+            raise NxosExc.RequestError(exc)
+
+        _check_resp_status(resp.status, resp.reason)
+        return content
+
+    async def exec_config(self, contents, timeout=None):
+        rqst = NxosConfigRequest()
+        rqst.command = _RE_CONF.sub(' ; ', contents)
+
+        content = await self._send(rqst, timeout)
+        return _parse_config_resp(content)
+
+    async def exec_opcmd(self, command, raw_resp=False, timeout=None, **kwargs):
+        rqst = NxosOperRequest(command=command)
+        rqst.msg_type = kwargs.get('msg_type')
+        rqst.resp_fmt = kwargs.get('resp_fmt')
+
+        content = await self._send(rqst, timeout)
+        return _parse_opcmd_resp(content, rqst.resp_fmt, raw_resp)
+
+    async def exec_opcmds(self, commands, timeout=None, **kwargs):
+        """
+        As aeon.nxos.connector.NxosConnector.exec_opcmds, over the ins_api
+        interface: many show commands in as few requests as NX-API allows.
+        :return: list of the JSON body of each command, in order, or of the
+                 NxosExc.CommandError of each command that failed
+        """
+        commands = list(commands)
+        results = []
+
+        for start in range(0, len(commands), self.MAX_OPCMDS):
+            chunk = commands[start:start + self.MAX_OPCMDS]
+            rqst = NxosOperRequest(command=' ;'.join(chunk))
+            rqst.msg_type = kwargs.get('msg_type')
+
+            content = await self._send(rqst, timeout)
+            results.extend(_parse_opcmds_resp(content, chunk))
+
+        return results
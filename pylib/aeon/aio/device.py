@@ -0,0 +1,158 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import asyncio
+import datetime
+import socket
+
+from aeon.base.device import BaseDevice, batch_routines
+from aeon.base.facts import LazyFacts
+from aeon.exceptions import ProbeError
+
+
+__all__ = ['Device', 'run_routine']
+
+
+async def run_routine(routine, api):
+    """
+    Drives a facts routine (see aeon.base.device.BaseDevice._gather_facts),
+    awaiting each of the requested calls on the async connector in turn.
+    :param routine: generator yielding api_call() requests
+    :param api: async connector
+    :return: None
+    """
+    result, error = None, None
+    while True:
+        try:
+            if error is not None:
+                method, args, kwargs = routine.throw(error)
+            else:
+                method, args, kwargs = routine.send(result)
+        except StopIteration:
+            return
+
+        result, error = None, None
+        try:
+            result = await getattr(api, method)(*args, **kwargs)
+        except Exception as exc:
+            error = exc
+
+
+class Device(object):
+    """
+    asyncio counterpart of the blocking Device classes.  The facts logic of
+    the blocking Device class for the NOS is re-used as-is; only the calls it
+    makes on the connector are awaited on the async connector instead.
+
+    Use Device.create(), or aeon.aio.get_device(), to obtain a connected
+    instance.
+    """
+    DEFAULT_PROBE_TIMEOUT = BaseDevice.DEFAULT_PROBE_TIMEOUT
+    PROBE_INTERVAL = 1
+
+    def __init__(self, target, nos_device, connector, **kwargs):
+        """
+        :param target: hostname or ipaddr of target device
+        :param nos_device: the blocking Device class of the NOS, e.g. aeon.eos.device.Device
+        :param connector: the async connector class, from aeon.aio.connector
+        :param kwargs:
+            'user' : login user-name, defaults to "admin"
+            'passwd': login password, defaults to "admin
+        """
+        self.target = target
+        self.port = kwargs.get('port')
+        self.user = kwargs.get('user', 'admin')
+        self.passwd = kwargs.get('passwd', 'admin')
+        self.timeout = kwargs.get('timeout', self.DEFAULT_PROBE_TIMEOUT)
+        self.OS_NAME = nos_device.OS_NAME
+        self.facts = LazyFacts(nos_device.FACT_GROUPS)
+        self.facts['os_name'] = nos_device.OS_NAME
+        self.api = connector(hostname=target, **kwargs)
+
+        # an instance of the blocking Device class that is never connected;
+        # it is only used to run the NOS facts routine.
+
+        self._batch_facts = nos_device.BATCH_FACTS
+        self._batch_calls = nos_device.BATCH_CALLS
+        self._nos_device = nos_device.__new__(nos_device)
+        self._nos_device.target = target
+        self._nos_device.facts = self.facts
+
+    @classmethod
+    async def create(cls, target, nos_device, connector, **kwargs):
+        """
+        Creates the device, opens its connector, then probes and gathers
+        facts unless 'no_probe' / 'no_gather_facts' are given, as for the
+        blocking Device classes.
+        """
+        dev = cls(target, nos_device, connector, **kwargs)
+        await dev.api.open()
+
+        try:
+            # no need to probe a device the connector is already logged in to.
+            if 'no_probe' not in kwargs and getattr(dev.api, 'connected', False) is not True:
+                await dev.probe()
+
+            if 'no_gather_facts' not in kwargs:
+                await dev.gather_facts(fields=kwargs.get('fields'))
+        except BaseException:
+            # including the cancellation of a create that timed out
+            await dev.close()
+            raise
+
+        return dev
+
+    async def gather_facts(self, fields=None):
+        """
+        As BaseDevice.gather_facts.  Facts cannot be gathered when they are
+        read, so only the facts gathered here are present.
+        """
+        groups = self.facts.pending(fields)
+        if self._batch_facts and len(groups) > 1:
+            await run_routine(batch_routines(
+                [self._nos_device._gather_facts(group) for group in groups],
+                self._batch_calls), self.api)
+            for group in groups:
+                self.facts.loaded(group)
+            return
+
+        for group in groups:
+            await run_routine(self._nos_device._gather_facts(group), self.api)
+            self.facts.loaded(group)
+
+    async def probe(self):
+        loop = asyncio.get_event_loop()
+        start = loop.time()
+        end = start + self.timeout
+
+        port = self.port or socket.getservbyname(self.api.proto)
+
+        while loop.time() < end:
+            try:
+                _, writer = await asyncio.wait_for(
+                    asyncio.open_connection(self.target, int(port)),
+                    self.PROBE_INTERVAL)
+            except (OSError, asyncio.TimeoutError):
+                await asyncio.sleep(self.PROBE_INTERVAL)
+                continue
+
+            writer.close()
+            elapsed = datetime.timedelta(seconds=loop.time() - start)
+            return True, elapsed
+
+        # Raise ProbeError if unable to reach in time allotted
+        raise ProbeError('Unable to reach device within %s seconds' % self.timeout)
+
+    async def close(self):
+        await self.api.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __repr__(self):
+        return 'Device(%r)' % self.target
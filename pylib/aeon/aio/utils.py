@@ -0,0 +1,239 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import asyncio
+import socket
+import ssl
+
+import asyncssh
+
+import aeon.nxos.device
+import aeon.eos.device
+import aeon.cumulus.device
+import aeon.ubuntu.device
+import aeon.centos.device
+import aeon.opx.device
+from aeon.aio.device import Device
+from aeon.aio.connector import SshConnector, EapiConnector, NxosConnector
+from aeon.exceptions import TargetError
+from aeon.utils import (
+    DETECT_TIMEOUT, _SSH_NOS, _API_NOS,
+    _candidate_probes, _detection_script, _match_nos)
+from aeon.utils.nos_cache import host_key_fingerprint
+from aeon.utils.fingerprint import Fingerprint, DEFAULT_TIMEOUT, _API_PATHS, _API_PROTOS, _API_PRESENT
+
+
+__all__ = ['get_device', 'probe_target']
+
+
+async def _probe_ssh_banner(target, timeout):
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(target, socket.getservbyname('ssh')), timeout)
+        try:
+            banner = await asyncio.wait_for(reader.readline(), timeout)
+        finally:
+            writer.close()
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+    banner = banner.decode('ascii', 'replace').strip()
+    return banner if banner.startswith('SSH-') else None
+
+
+async def _probe_api(target, proto, path, timeout):
+    # only checking whether the API answers, not who is answering
+    context = ssl._create_unverified_context() if 'https' == proto else None
+    try:
+        reader, writer = await asyncio.wait_for(
+            asyncio.open_connection(target, socket.getservbyname(proto), ssl=context), timeout)
+        try:
+            writer.write('POST {path} HTTP/1.0\r\nHost: {target}\r\nContent-Length: 0\r\n\r\n'.format(
+                path=path, target=target).encode('ascii'))
+            status_line = await asyncio.wait_for(reader.readline(), timeout)
+        finally:
+            writer.close()
+    except (OSError, asyncio.TimeoutError):
+        return None
+
+    fields = status_line.split()
+    return int(fields[1]) if len(fields) > 1 and fields[1].isdigit() else None
+
+
+async def probe_target(target, timeout=DEFAULT_TIMEOUT):
+    """
+    asyncio counterpart of aeon.utils.fingerprint.probe_target.
+    :param target: IP address or hostname of target
+    :param timeout: time, in seconds, allowed for each probe
+    :return: aeon.utils.fingerprint.Fingerprint
+    """
+    fingerprint = Fingerprint(target)
+
+    api_probes = [(nos, proto, path)
+                  for nos, path in _API_PATHS
+                  for proto in _API_PROTOS]
+
+    got = await asyncio.gather(
+        _probe_ssh_banner(target, timeout),
+        *[_probe_api(target, proto, path, timeout) for nos, proto, path in api_probes])
+
+    fingerprint.ssh_banner = got[0]
+    for (nos, proto, path), status in zip(api_probes, got[1:]):
+        if status in _API_PRESENT and nos not in fingerprint.api_protos:
+            fingerprint.api_protos[nos] = proto
+
+    fingerprint.classify()
+    return fingerprint
+
+
+async def _detect_nos(conn, target, deadline=None, candidates=None):
+    """
+    asyncio counterpart of aeon.utils._detect_nos; all of the detection
+    commands are sent at once on a single interactive shell channel.
+    """
+    loop = asyncio.get_event_loop()
+    probes = list(_candidate_probes(candidates))
+
+    end = loop.time() + DETECT_TIMEOUT
+    if deadline is not None:
+        end = min(end, deadline)
+        if end <= loop.time():
+            raise TargetError('Timeout determining device type for %s' % target)
+
+    try:
+        process = await conn.create_process(term_type='vt100', encoding=None)
+        try:
+            process.stdin.write(_detection_script(probes).encode('ascii'))
+
+            output = b''
+            while True:
+                nos = _match_nos(output.decode('utf-8', 'replace'), probes)
+                remaining = end - loop.time()
+                if nos is not None or remaining <= 0:
+                    break
+
+                try:
+                    data = await asyncio.wait_for(process.stdout.read(32768), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if not data:
+                    break
+                output += data
+        finally:
+            process.close()
+
+    except asyncssh.Error as e:
+        raise TargetError("Error logging in to {target} : {error}".format(target=target, error=e))
+
+    if nos is None:
+        raise TargetError('Unable to determine device type for %s' % target)
+
+    return nos
+
+
+async def get_device(target=None, user='admin', passwd='admin', nos_only=False, timeout=None,
+                     cache=None, fingerprint=True, **kwargs):
+    """
+    asyncio counterpart of aeon.utils.get_device.  Many targets can be
+    discovered concurrently from one event loop, e.g. with asyncio.gather()
+    or asyncio.as_completed().
+    :param target: IP address or hostname of target
+    :param user: Username to login to target
+    :param passwd: Password to login to target
+    :param nos_only: Only check for device nos and return as string, do not return device object
+    :param timeout: Overall time, in seconds, allowed to login, determine the device type and
+                    create the device, facts gathering included
+    :param cache: aeon.utils.nos_cache.NosCache used to skip detection of known targets
+    :param fingerprint: fingerprint the target before logging in, see aeon.utils.fingerprint
+    :param kwargs: passed to the device, e.g. 'session' to share an aiohttp session
+    :return: aeon.aio.Device object
+    """
+    dev_table = {
+        'nxos': (aeon.nxos.device.Device, NxosConnector),
+        'eos': (aeon.eos.device.Device, EapiConnector),
+        'cumulus': (aeon.cumulus.device.Device, SshConnector),
+        'ubuntu': (aeon.ubuntu.device.Device, SshConnector),
+        'centos': (aeon.centos.device.Device, SshConnector),
+        'opx': (aeon.opx.device.Device, SshConnector)
+    }
+
+    loop = asyncio.get_event_loop()
+    deadline = None if timeout is None else loop.time() + timeout
+
+    def remaining():
+        if deadline is None:
+            return None
+        left = deadline - loop.time()
+        if left <= 0:
+            raise TargetError('Timeout getting device %s' % target)
+        return left
+
+    async def create(nos_device, connector, **create_kwargs):
+        try:
+            return await asyncio.wait_for(
+                Device.create(target, nos_device, connector, user=user, passwd=passwd,
+                              **create_kwargs),
+                remaining())
+        except asyncio.TimeoutError:
+            raise TargetError('Timeout getting device %s' % target)
+
+    candidates, api_protos = None, {}
+    if fingerprint:
+        found = await probe_target(target)
+        if found.nos in _API_NOS and not nos_only:
+            nos_device, connector = dev_table[found.nos]
+            return await create(nos_device, connector, proto=found.proto(found.nos), **kwargs)
+
+        candidates, api_protos = found.candidates, found.api_protos
+
+    try:
+        # the connect includes the banner and the authentication.
+        left = remaining()
+        conn = await asyncio.wait_for(
+            asyncssh.connect(target, username=user, password=passwd, known_hosts=None),
+            5 if left is None else min(5, left))
+    except asyncssh.PermissionDenied:
+        raise TargetError('Authentication error: %s' % target)
+    except (OSError, asyncio.TimeoutError):
+        raise TargetError('Device unreachable: %s' % target)
+    except asyncssh.Error:
+        raise TargetError('Error logging in: %s' % target)
+
+    try:
+        nos = None
+        if cache is not None:
+            host_key = host_key_fingerprint(conn.get_server_host_key().public_data)
+            nos = cache.get(target, host_key)
+
+        if nos is None:
+            nos = await _detect_nos(conn, target, deadline=deadline, candidates=candidates)
+            if cache is not None:
+                cache.set(target, host_key, nos)
+
+    except Exception:
+        conn.close()
+        raise
+
+    if nos_only or nos not in _SSH_NOS:
+        conn.close()
+
+    if nos_only:
+        return nos
+
+    nos_device, connector = dev_table[nos]
+    if nos in _SSH_NOS:
+        kwargs['client'] = conn
+    if nos in api_protos:
+        kwargs['proto'] = api_protos[nos]
+
+    try:
+        return await create(nos_device, connector, **kwargs)
+    except Exception:
+        if nos in _SSH_NOS:
+            conn.close()
+        if cache is not None:
+            # the cached NOS may be stale
+            cache.invalidate(target)
+        raise
@@ -0,0 +1,129 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import importlib
+import sys
+
+try:
+    from lxml import etree
+except ImportError:  # only needed for the XML of NX-API
+    etree = None
+
+__all__ = ['JSON_BACKENDS', 'Payload', 'json_backend', 'set_json_backend', 'loads']
+
+
+# the JSON parsers used when installed, fastest first; orjson and ujson
+# parse bytes as they come off the wire.  The json module is always there,
+# and only parses bytes from Python 3.6 on; before, they are decoded first.
+JSON_BACKENDS = ('orjson', 'ujson', 'json')
+
+_JSON_BYTES = sys.version_info < (3,) or sys.version_info >= (3, 6)
+
+_json_backend = None
+_json_loads = None
+
+
+def set_json_backend(name=None):
+    """
+    Chooses the JSON parser of the API response decoders.
+    :param name: one of JSON_BACKENDS, or None for the fastest one installed
+    :return: name of the backend chosen
+    """
+    global _json_backend, _json_loads
+
+    for each in JSON_BACKENDS if name is None else (name,):
+        try:
+            module = importlib.import_module(each)
+        except ImportError:
+            if name is not None:
+                raise
+            continue
+
+        _json_backend, _json_loads = each, module.loads
+        if each == 'json' and not _JSON_BYTES:
+            _json_loads = _text_loads(module.loads)
+        return each
+
+
+def _text_loads(loads):
+    def text_loads(content):
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        return loads(content)
+
+    return text_loads
+
+
+def json_backend():
+    """
+    :return: name of the JSON backend in use, see set_json_backend
+    """
+    return _json_backend
+
+
+def loads(content):
+    """
+    :param content: JSON document, as bytes (or text)
+    :return: the decoded document
+    """
+    return _json_loads(content)
+
+
+set_json_backend()
+
+
+_UNSET = object()
+
+
+class Payload(object):
+    """
+    The content of an API response, as bytes, decoded only when it is read
+    and then only once: the response is checked for a token by a scan of
+    the bytes, and the JSON or XML document is parsed straight from the
+    bytes, with no text decoding or encoding detection first.
+    """
+    __slots__ = ('content', '_json', '_xml')
+
+    def __init__(self, content):
+        """
+        :param content: the response content, e.g. requests.Response.content
+        """
+        self.content = content
+        self._json = _UNSET
+        self._xml = None
+
+    def __contains__(self, token):
+        """
+        Whether the content has the bytes token, without decoding it.
+        """
+        return token in self.content
+
+    @property
+    def json(self):
+        """
+        The decoded JSON document.
+        """
+        if self._json is _UNSET:
+            self._json = loads(self.content)
+        return self._json
+
+    @property
+    def xml(self):
+        """
+        The root element of the XML document.
+        """
+        if self._xml is None:
+            self._xml = etree.fromstring(self.content)
+        return self._xml
+
+    def xml_find(self, path):
+        """
+        :param path: path of an element from the root, e.g. 'outputs/output/body'
+        :return: the first element at the path, or None
+        """
+        # the body of an NX-API response is nearly all of it, so the whole
+        # document is parsed at once: lxml parses much faster than it
+        # iterates over the parse events.
+        return self.xml.find(path)
@@ -3,66 +3,417 @@
 # This source code is licensed under End User License Agreement found in the
 # LICENSE file at http://www.apstra.com/community/eula
 
+import sys
 import socket
 import datetime
-import time
 
-from aeon.exceptions import ProbeError
+from aeon.base.facts import LazyFacts, Facts
+from aeon.base.probe import probe_many
+from aeon.exceptions import CommandError, ProbeError
+
+
+def api_call(method, *args, **kwargs):
+    """
+    Describes a call to be made on the device connector on behalf of a
+    facts routine; see BaseDevice._run_routine.
+    :param method: name of the connector method
+    :return: (method, args, kwargs) request tuple
+    """
+    return method, args, kwargs
+
+
+class CallBatch(object):
+    """
+    Merges like calls of facts routines into a single call to the
+    connector; see batch_routines.
+    """
+    # name of the connector method whose calls are merged
+    method = None
+
+    @staticmethod
+    def accepts(args, kwargs):
+        """
+        :return: whether a call with these arguments can be merged
+        """
+        return True
+
+    @staticmethod
+    def merge(calls):
+        """
+        :param calls: (args, kwargs) of each of the calls
+        :return: api_call() request standing for all of the calls
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def split(calls, result):
+        """
+        :param calls: (args, kwargs) of each of the calls, as for merge()
+        :param result: the result of the merged call
+        :return: (result, error) of each of the calls, as if it had been
+                 made alone; error is None or an exc_info() tuple
+        """
+        raise NotImplementedError
+
+
+class ExecuteBatch(CallBatch):
+    """
+    Merges execute() calls into one execute(batch=True) call, for the
+    connectors of the Linux-based devices.  The merged call does not stop
+    on error, so only the calls it makes no difference to are merged: those
+    with stop_on_error=False, and those of a single command.  Any other call
+    is made on its own, rather than run commands after one that failed.
+    """
+    method = 'execute'
+
+    @staticmethod
+    def accepts(args, kwargs):
+        if not set(kwargs) <= set(['stop_on_error']):
+            return False
+        return kwargs.get('stop_on_error', True) is not True or len(args[0]) == 1
+
+    @staticmethod
+    def merge(calls):
+        return api_call('execute', [cmd for args, _ in calls for cmd in args[0]],
+                        stop_on_error=False, batch=True)
+
+    @staticmethod
+    def split(calls, result):
+        _, results = result
+        for args, _ in calls:
+            commands = args[0]
+            got, results = results[:len(commands)], results[len(commands):]
+            if len(got) < len(commands):
+                try:
+                    raise CommandError(
+                        RuntimeError('batch returned %d results for %d commands'
+                                     % (len(got), len(commands))),
+                        commands[len(got):])
+                except CommandError:
+                    yield None, sys.exc_info()
+                continue
+
+            yield (not any(each.get('exit_code') for each in got), got), None
+
+
+def batch_routines(routines, batches=(ExecuteBatch,)):
+    """
+    Runs facts routines side by side, as a single routine: at each step the
+    calls the routines request are merged by method, see CallBatch, so that
+    the commands of all of the routines reach the device together.  Each
+    routine is handed back its own part of the results, as if its call had
+    been made alone; any other call is made on its own.
+    :param routines: facts routines
+    :param batches: CallBatch classes of the calls to merge
+    :return: facts routine
+    """
+    batches = dict((batch.method, batch) for batch in batches)
+    steps = [(routine, None, None) for routine in routines]
+
+    while steps:
+        calls = []      # (batch, routine, args, kwargs)
+
+        for routine, result, error in steps:
+            while True:
+                try:
+                    if error is not None:
+                        method, args, kwargs = routine.throw(*error)
+                    else:
+                        method, args, kwargs = routine.send(result)
+                except StopIteration:
+                    break
+
+                batch = batches.get(method)
+                if batch is not None and batch.accepts(args, kwargs):
+                    calls.append((batch, routine, args, kwargs))
+                    break
+
+                result, error = None, None
+                try:
+                    result = yield method, args, kwargs
+                except Exception:
+                    error = sys.exc_info()
+
+        order, merged = [], {}      # batch: ([routine], [(args, kwargs)])
+        for batch, routine, args, kwargs in calls:
+            if batch not in merged:
+                order.append(batch)
+                merged[batch] = ([], [])
+            merged[batch][0].append(routine)
+            merged[batch][1].append((args, kwargs))
+
+        steps = []
+        for batch in order:
+            owners, batch_calls = merged[batch]
+            try:
+                result = yield batch.merge(batch_calls)
+            except Exception:
+                error = sys.exc_info()
+                steps.extend((routine, None, error) for routine in owners)
+                continue
+
+            for routine, (result, error) in zip(owners, batch.split(batch_calls, result)):
+                steps.append((routine, result, error))
+
+
+class DeviceSnapshot(object):
+    """
+    Small, connection-free and picklable copy of a device and its facts, as
+    returned by BaseDevice.snapshot(); attach() makes it a connected device
+    again.
+    """
+    __slots__ = ('device_class', 'target', 'port', 'user', 'passwd', 'facts')
+
+    def __init__(self, device_class, target, port, user, passwd, facts):
+        self.device_class = device_class
+        self.target = target
+        self.port = port
+        self.user = user
+        self.passwd = passwd
+        self.facts = facts
+
+    def __getstate__(self):
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __setstate__(self, state):
+        for name, value in zip(self.__slots__, state):
+            setattr(self, name, value)
+
+    def attach(self, **kwargs):
+        """
+        Creates the device again, connected to the target.  The facts of the
+        snapshot are not gathered again.
+        :param kwargs: as for the Device, e.g. 'passwd' or 'no_probe'
+        :return: Device
+        """
+        options = dict(user=self.user, passwd=self.passwd)
+        if self.port is not None:
+            options['port'] = self.port
+        options.update(kwargs)
+
+        dev = self.device_class(self.target, no_gather_facts=True, **options)
+        dev.restore(self.facts)
+        return dev
+
+    def __repr__(self):
+        return 'DeviceSnapshot(%r)' % self.target
 
 
 class BaseDevice(object):
     DEFAULT_PROBE_TIMEOUT = 10
 
+    # (group, fields) pairs, in gathering order; each group is gathered by
+    # the facts routine _gather_<group>, see _gather_facts.
+    FACT_GROUPS = ()
+
+    # the groups of facts that only change when the device is rebooted or
+    # upgraded, and may be kept in a facts store; and the facts that tell
+    # whether the stored facts are still valid.
+    STATIC_FACT_GROUPS = ()
+    FACTS_STORE_KEY = ('boot_time', 'os_version')
+
+    # the connector runs a batch of commands in one go, e.g. execute(batch=True);
+    # the facts routines are then run side by side, see batch_routines, with
+    # the calls of BATCH_CALLS merged.
+    BATCH_FACTS = False
+    BATCH_CALLS = (ExecuteBatch,)
+
     def __init__(self, target, connector, **kwargs):
         """
         :param target: hostname or ipaddr of target device
         :param kwargs:
             'user' : login user-name, defaults to "admin"
             'passwd': login password, defaults to "admin
+            'fields': facts to gather up front, defaults to all of them
+            'no_gather_facts': gather no facts up front
+            'facts_store': aeon.utils.facts_store.FactsStore to keep the static facts in
         """
         self.target = target
         self.port = kwargs.get('port')
         self.user = kwargs.get('user', 'admin')
         self.passwd = kwargs.get('passwd', 'admin')
         self.timeout = kwargs.get('timeout', self.DEFAULT_PROBE_TIMEOUT)
-        self.facts = {}
+        self.facts = LazyFacts(self.FACT_GROUPS, loader=self.gather_facts)
+        self.facts_store = kwargs.get('facts_store')
+        self._facts_restored = False
+        if getattr(self, 'OS_NAME', None) is not None:
+            self.facts['os_name'] = self.OS_NAME
+
+        probe = 'no_probe' not in kwargs
+
+        # a connector that can run its session over an already connected
+        # socket is handed the socket the probe opened, rather than the
+        # probe connecting and tearing down only for the connector to
+        # connect again.
+
+        if probe and getattr(connector, 'ACCEPTS_SOCK', False) is True and kwargs.get('client') is None:
+            port = self.port or socket.getservbyname(kwargs.get('proto') or connector.DEFAULT_PROTOCOL)
+            kwargs['sock'] = self._probe_socket(port)
+            probe = False
+
         self.api = connector(hostname=target, **kwargs)
 
-        if 'no_probe' not in kwargs:
+        # no need to probe a device the connector is already logged in to.
+
+        if probe and getattr(self.api, 'connected', False) is not True:
             self.probe()
 
         if 'no_gather_facts' not in kwargs:
-            self.gather_facts()
+            self.gather_facts(fields=kwargs.get('fields'))
 
-    def gather_facts(self):
+    def gather_facts(self, fields=None):
         """
-        Will be overridden by subclass
+        Runs the device facts routines against the device connector.  Facts
+        not gathered here are gathered when they are first read.
+        :param fields: names of the facts to gather, defaults to all of them;
+                       groups already gathered are not run again
         :return: None
         """
-        pass
+        groups = self.facts.pending(fields)
+        static = [group for group in groups if group in self.STATIC_FACT_GROUPS]
 
-    def probe(self):
-        interval = 1
-        start = datetime.datetime.now()
-        end = start + datetime.timedelta(seconds=self.timeout)
+        if static and self.facts_store is not None and not self._facts_restored:
+            self._restore_facts()
+            groups = self.facts.pending(fields)
+            static = [group for group in groups if group in self.STATIC_FACT_GROUPS]
 
-        port = self.port or socket.getservbyname(self.api.proto)
+        if self.BATCH_FACTS and len(groups) > 1:
+            self._run_routine(batch_routines([self._gather_facts(group) for group in groups],
+                                             self.BATCH_CALLS))
+            for group in groups:
+                self.facts.loaded(group)
+        else:
+            for group in groups:
+                self._run_routine(self._gather_facts(group))
+                self.facts.loaded(group)
+
+        if static and self.facts_store is not None:
+            self._store_facts()
+
+    def snapshot(self):
+        """
+        :return: DeviceSnapshot of the device and the facts gathered so far
+        """
+        return DeviceSnapshot(self.__class__, self.target, self.port, self.user, self.passwd,
+                              Facts.from_mapping(self.facts.gathered()))
+
+    def restore(self, facts):
+        """
+        Takes the facts of the device from a Facts record rather than
+        gathering them; only whole fact groups are taken.
+        :param facts: Facts, e.g. from a DeviceSnapshot
+        :return: None
+        """
+        known = facts.to_dict()
+        for group, fields in self.FACT_GROUPS:
+            if all(field in known for field in fields):
+                for field in fields:
+                    self.facts[field] = known[field]
+                self.facts.loaded(group)
+
+    def _restore_facts(self):
+        """
+        Serves the static facts from the facts store, if the device has not
+        been rebooted or upgraded since they were stored.
+        :return: None
+        """
+        self._facts_restored = True
+        self.gather_facts(fields=self.FACTS_STORE_KEY)
+
+        stored = self.facts_store.get(
+            self.target, self.facts['boot_time'],
+            self.facts['os_version'] if 'os_version' in self.FACTS_STORE_KEY else None)
+        if stored is not None:
+            self.restore(Facts.from_mapping(stored))
+
+    def _store_facts(self):
+        pending = self.facts.pending()
+        stored = dict(
+            (field, self.facts[field])
+            for group, fields in self.FACT_GROUPS
+            if group in self.STATIC_FACT_GROUPS and group not in pending
+            for field in fields)
+
+        self.facts_store.set(
+            self.target, self.facts['boot_time'],
+            self.facts['os_version'] if 'os_version' in self.FACTS_STORE_KEY else None,
+            stored)
+
+    def _gather_facts(self, group):
+        """
+        A facts routine is a generator that yields api_call() requests, and
+        is sent back the result of each call (or has the exception raised by
+        the call thrown at the yield).  This keeps the facts logic
+        independent of how the connector is driven.
+        :param group: name of a group in FACT_GROUPS
+        :return: the facts routine of the group
+        """
+        return getattr(self, '_gather_%s' % group)()
 
-        while datetime.datetime.now() < end:
-            s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            s.settimeout(interval)
+    def _run_routine(self, routine):
+        """
+        Drives a facts routine, making each of the requested calls on the
+        device connector in turn.
+        :param routine: generator yielding api_call() requests
+        :return: None
+        """
+        result, error = None, None
+        while True:
             try:
-                s.connect((self.target, int(port)))
-                s.shutdown(socket.SHUT_RDWR)
-                s.close()
-                elapsed = datetime.datetime.now() - start
-                return True, elapsed
-            except:  # NOQA
-                time.sleep(interval)
-                pass
+                if error is not None:
+                    method, args, kwargs = routine.throw(*error)
+                else:
+                    method, args, kwargs = routine.send(result)
+            except StopIteration:
+                return
+
+            result, error = None, None
+            try:
+                result = getattr(self.api, method)(*args, **kwargs)
+            except Exception:
+                error = sys.exc_info()
+
+    def probe(self):
+        """
+        Waits for the device management port to accept connections, retrying
+        at sub-second intervals for up to self.timeout seconds.
+        :return: (True, timedelta taken to reach the device)
+        """
+        port = self.port or socket.getservbyname(self.api.proto)
+
+        for _, elapsed in probe_many([self.target], int(port), self.timeout):
+            if elapsed is not None:
+                return True, datetime.timedelta(seconds=elapsed)
+
         # Raise ProbeError if unable to reach in time allotted
         raise ProbeError('Unable to reach device within %s seconds' % self.timeout)
 
+    def _probe_socket(self, port):
+        """
+        As probe(), but the connection is kept open for use by the connector.
+        :return: connected socket
+        """
+        for _, _, sock in probe_many([self.target], int(port), self.timeout, keep_open=True):
+            if sock is not None:
+                return sock
+
+        raise ProbeError('Unable to reach device within %s seconds' % self.timeout)
+
+    def close(self):
+        """
+        Closes the connection to the device; an SSH session is returned to
+        the pool it came from, see aeon.cumulus.pool.
+        """
+        close = getattr(self.api, 'close', None)
+        if close is not None:
+            close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
     def __repr__(self):
         return 'Device(%r)' % self.target
 
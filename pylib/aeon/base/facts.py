@@ -0,0 +1,131 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+try:
+    from collections.abc import MutableMapping
+except ImportError:  # python 2
+    from collections import MutableMapping
+
+__all__ = ['LazyFacts', 'Facts']
+
+
+class LazyFacts(MutableMapping):
+    """
+    The facts of a device.  The facts are gathered in groups, each group
+    being the device commands that provide a set of facts; a fact read
+    before its group has been gathered is gathered there and then, and only
+    that group is run.  Iterating the facts (or comparing, or converting
+    them to a dict) gathers all of them.
+    """
+    def __init__(self, groups, loader=None):
+        """
+        :param groups: sequence of (group, fields) pairs, in gathering order
+        :param loader: callable given a list of fields (or None for all)
+                       that gathers them, e.g. BaseDevice.gather_facts; if
+                       None the facts are never gathered on read
+        """
+        self._data = {}
+        self._groups = tuple(groups)
+        self._pending = set(group for group, _ in self._groups)
+        self._loader = loader
+
+    def pending(self, fields=None):
+        """
+        :param fields: fact names, or None for all facts
+        :return: list of the groups not yet gathered that provide the fields
+        """
+        groups = [(group, provides) for group, provides in self._groups
+                  if group in self._pending]
+        if fields is None:
+            return [group for group, _ in groups]
+
+        fields = set(fields)
+        return [group for group, provides in groups
+                if not fields.isdisjoint(provides)]
+
+    def loaded(self, group):
+        """
+        Records that the facts of the group have been gathered.
+        """
+        self._pending.discard(group)
+
+    def gathered(self):
+        """
+        :return: dict of the facts gathered so far, gathering no more
+        """
+        return dict(self._data)
+
+    def _load(self, fields=None):
+        if self._loader is not None and self.pending(fields):
+            self._loader(fields)
+
+    def __getitem__(self, key):
+        if key not in self._data:
+            self._load([key])
+        return self._data[key]
+
+    def __setitem__(self, key, value):
+        self._data[key] = value
+
+    def __delitem__(self, key):
+        del self._data[key]
+
+    def __iter__(self):
+        self._load()
+        return iter(self._data)
+
+    def __len__(self):
+        self._load()
+        return len(self._data)
+
+    def __repr__(self):
+        return repr(self._data)
+
+
+class Facts(object):
+    """
+    Compact record of the facts of a device, with the fixed set of fields
+    the devices of all NOS types gather.  A fact that was not gathered is
+    left unset, and reading it raises AttributeError.
+    """
+    __slots__ = (
+        'os_name', 'os_version', 'boot_time', 'vendor',
+        'fqdn', 'hostname', 'domain_name',
+        'hw_model', 'hw_version', 'hw_part_number', 'hw_part_version',
+        'chassis_id', 'serial_number', 'service_tag', 'mac_address', 'virtual')
+
+    def __init__(self, **facts):
+        for name, value in facts.items():
+            setattr(self, name, value)
+
+    @classmethod
+    def from_mapping(cls, facts):
+        """
+        :param facts: mapping of fact names to values, e.g. Device.facts;
+                      names that are not fields of the record are ignored
+        :return: Facts
+        """
+        return cls(**dict((name, facts[name]) for name in cls.__slots__ if name in facts))
+
+    def to_dict(self):
+        return dict((name, getattr(self, name))
+                    for name in self.__slots__ if hasattr(self, name))
+
+    def __getstate__(self):
+        return self.to_dict()
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
+    def __eq__(self, other):
+        return isinstance(other, Facts) and self.to_dict() == other.to_dict()
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return 'Facts(%s)' % ', '.join(
+            '%s=%r' % item for item in sorted(self.to_dict().items()))
@@ -0,0 +1,133 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import ssl
+import threading
+
+from requests.adapters import HTTPAdapter
+from requests.packages import urllib3
+from requests.packages.urllib3.exceptions import InsecureRequestWarning
+
+__all__ = ['HTTPPool', 'TLSSessionCache', 'http_pool', 'disable_insecure_warnings']
+
+# TLS sessions can only be resumed from Python 3.6 on.
+TLS_RESUMPTION = hasattr(ssl, 'SSLSession')
+
+
+class TLSSessionCache(object):
+    """
+    The TLS session last negotiated with each (address, port), so that a new
+    connection to a device resumes it rather than making a full handshake,
+    which is slow on the control-plane CPU of a switch.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sessions = {}
+
+    def get(self, key):
+        with self._lock:
+            return self._sessions.get(key)
+
+    def set(self, key, session):
+        if session is not None:
+            with self._lock:
+                self._sessions[key] = session
+
+    def clear(self):
+        with self._lock:
+            self._sessions.clear()
+
+
+if TLS_RESUMPTION:
+    class _ResumingSocket(ssl.SSLSocket):
+        # a TLS 1.3 server sends its session tickets after the handshake, so
+        # the session is only known once the connection has been used; it
+        # is saved again when the connection is closed.
+
+        def close(self):
+            key = getattr(self, '_tls_key', None)
+            if key is not None:
+                self.context.tls_sessions.set(key, self._tls_session())
+            super(_ResumingSocket, self).close()
+
+        def _tls_session(self):
+            try:
+                return self.session
+            except (ValueError, OSError):
+                return None
+
+    class _ResumingContext(ssl.SSLContext):
+        sslsocket_class = _ResumingSocket
+
+        def wrap_socket(self, sock, *args, **kwargs):
+            key = sock.getpeername()[:2]
+            kwargs.setdefault('session', self.tls_sessions.get(key))
+            try:
+                wrapped = super(_ResumingContext, self).wrap_socket(sock, *args, **kwargs)
+            except (ssl.SSLError, ValueError):
+                # e.g. the device no longer knows of the session
+                if kwargs['session'] is None:
+                    raise
+                kwargs['session'] = None
+                wrapped = super(_ResumingContext, self).wrap_socket(sock, *args, **kwargs)
+
+            wrapped._tls_key = key
+            self.tls_sessions.set(key, wrapped._tls_session())
+            return wrapped
+
+
+class HTTPPool(HTTPAdapter):
+    """
+    Keep-alive HTTP(S) connection pool for a requests.Session, which may be
+    shared by many connectors so that they all draw on the same open
+    connections.  Where Python supports it, a new HTTPS connection resumes
+    the TLS session of an earlier connection of the pool to the device.
+
+    The connections of at most max_hosts devices are kept; those of the
+    device least recently used are closed to make room for another, so a
+    pool shared by many connectors is sized for the number of devices.
+    """
+    DEFAULT_MAX_HOSTS = 64
+    DEFAULT_MAX_PER_HOST = 4
+
+    def __init__(self, max_hosts=DEFAULT_MAX_HOSTS, max_per_host=DEFAULT_MAX_PER_HOST):
+        """
+        :param max_hosts: number of devices connections are kept open to
+        :param max_per_host: number of connections kept open to each device
+        """
+        # a TLS session can only be resumed with the SSL context it was
+        # negotiated with, hence a cache of them for each pool.
+        self.tls_sessions = TLSSessionCache()
+        super(HTTPPool, self).__init__(pool_connections=max_hosts, pool_maxsize=max_per_host)
+
+    def init_poolmanager(self, *args, **kwargs):
+        if TLS_RESUMPTION:
+            context = _ResumingContext(ssl.PROTOCOL_TLS_CLIENT)
+            context.tls_sessions = self.tls_sessions
+
+            # the certificate is checked, or not, as requested for each
+            # request; see the requests 'verify' option.
+            context.check_hostname = False
+            kwargs['ssl_context'] = context
+
+        super(HTTPPool, self).init_poolmanager(*args, **kwargs)
+
+
+def http_pool(max_hosts=HTTPPool.DEFAULT_MAX_HOSTS, max_per_host=HTTPPool.DEFAULT_MAX_PER_HOST):
+    """
+    :return: HTTPPool, see HTTPPool.__init__ for the parameters
+    """
+    return HTTPPool(max_hosts=max_hosts, max_per_host=max_per_host)
+
+
+def disable_insecure_warnings():
+    """
+    Silences the InsecureRequestWarning of the https requests that do not
+    verify the device certificate, e.g. those of eAPI and of NX-API with
+    verify=False.  This is for the applications that knowingly do so: the
+    warning filter is process-wide, installed once rather than around each
+    request, and so is not undone by the requests of other threads.
+    """
+    urllib3.disable_warnings(InsecureRequestWarning)
@@ -0,0 +1,172 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import errno
+import select
+import socket
+import time
+
+__all__ = ['probe_many']
+
+DEFAULT_INTERVAL = 0.25
+DEFAULT_CONNECT_TIMEOUT = 1
+DEFAULT_MAX_INFLIGHT = 512
+
+_clock = getattr(time, 'monotonic', time.time)
+
+_IN_PROGRESS = (errno.EINPROGRESS, errno.EWOULDBLOCK, errno.EAGAIN)
+
+
+class _Poller(object):
+    """
+    Minimal write-readiness poller; epoll where the platform has it, poll
+    otherwise.  Timeouts are given in seconds.
+    """
+    def __init__(self):
+        if hasattr(select, 'epoll'):
+            self._poll = select.epoll()
+            self._scale = 1
+            self._mask = select.EPOLLOUT | select.EPOLLERR | select.EPOLLHUP
+        else:
+            self._poll = select.poll()
+            self._scale = 1000
+            self._mask = select.POLLOUT | select.POLLERR | select.POLLHUP
+
+    def register(self, fd):
+        self._poll.register(fd, self._mask)
+
+    def unregister(self, fd):
+        self._poll.unregister(fd)
+
+    def poll(self, timeout):
+        return [fd for fd, _ in self._poll.poll(max(timeout, 0) * self._scale)]
+
+    def close(self):
+        if hasattr(self._poll, 'close'):
+            self._poll.close()
+
+
+def _resolve(target, port):
+    try:
+        family, socktype, proto, _, addr = socket.getaddrinfo(
+            target, port, 0, socket.SOCK_STREAM)[0]
+    except socket.error:
+        return None
+    return family, socktype, proto, addr
+
+
+def probe_many(targets, port, deadline,
+               interval=DEFAULT_INTERVAL,
+               connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+               max_inflight=DEFAULT_MAX_INFLIGHT,
+               keep_open=False):
+    """
+    Probes a TCP port on many targets at once from a single thread.  Every
+    connect is non-blocking and multiplexed on one poller; a target that
+    refuses or does not answer within connect_timeout is retried after
+    interval seconds, until it answers or the deadline is reached.
+
+    :param targets: iterable of hostnames or ipaddrs
+    :param port: TCP port to connect to
+    :param deadline: seconds allowed for the whole sweep
+    :param interval: seconds to wait between attempts on the same target
+    :param connect_timeout: seconds before an unanswered attempt is abandoned
+    :param max_inflight: maximum number of connects outstanding at once
+    :param keep_open: hand the connected socket to the caller rather than
+                      closing it, so that it can be re-used as the transport
+                      of a session (e.g. paramiko.SSHClient.connect(sock=...))
+    :return: generator of (target, elapsed) as each target becomes
+             reachable, elapsed being seconds since the sweep started; the
+             targets not reached by the deadline are reported last with an
+             elapsed of None.  With keep_open, (target, elapsed, sock) is
+             generated instead, sock being a connected blocking socket, or
+             None for a target not reached.
+    """
+    start = _clock()
+    end = start + deadline
+
+    waiting = [(start, target) for target in targets]   # (not before, target)
+    addrs = {}
+    inflight = {}                                        # fd -> (target, sock, started)
+    unresolved = []
+    poller = _Poller()
+
+    def reached(target, sock, elapsed):
+        if not keep_open:
+            sock.close()
+            return target, elapsed
+        sock.setblocking(1)
+        return target, elapsed, sock
+
+    def attempt(target, now):
+        if target not in addrs:
+            addrs[target] = _resolve(target, port)
+        if addrs[target] is None:
+            unresolved.append(target)
+            return None
+        family, socktype, proto, addr = addrs[target]
+        sock = socket.socket(family, socktype, proto)
+        sock.setblocking(0)
+        err = sock.connect_ex(addr)
+        if err == 0:
+            return sock
+        if err in _IN_PROGRESS:
+            inflight[sock.fileno()] = (target, sock, now)
+            poller.register(sock.fileno())
+        else:
+            sock.close()
+            waiting.append((now + interval, target))
+        return None
+
+    def finish(fd):
+        target, sock, _ = inflight.pop(fd)
+        poller.unregister(fd)
+        err = sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+        if err != 0:
+            sock.close()
+        return target, sock, err
+
+    try:
+        while waiting or inflight:
+            now = _clock()
+            if now >= end:
+                break
+
+            due, waiting[:] = waiting[:], []
+            for not_before, target in due:
+                if not_before <= now and len(inflight) < max_inflight:
+                    sock = attempt(target, now)
+                    if sock is not None:
+                        yield reached(target, sock, now - start)
+                else:
+                    waiting.append((not_before, target))
+
+            wakeup = end
+            if waiting and len(inflight) < max_inflight:
+                wakeup = min(wakeup, min(t for t, _ in waiting))
+            if inflight:
+                wakeup = min(wakeup, min(s for _, _, s in inflight.values()) + connect_timeout)
+
+            for fd in poller.poll(wakeup - _clock()):
+                target, sock, err = finish(fd)
+                if err == 0:
+                    yield reached(target, sock, _clock() - start)
+                else:
+                    waiting.append((_clock() + interval, target))
+
+            now = _clock()
+            for fd, (target, _, started) in list(inflight.items()):
+                if now - started >= connect_timeout:
+                    finish(fd)[1].close()
+                    waiting.append((now + interval, target))
+    finally:
+        for fd in list(inflight):
+            target, sock, _ = finish(fd)
+            sock.close()
+            waiting.append((end, target))
+        poller.close()
+
+    for target in unresolved + [each[1] for each in waiting]:
+        yield (target, None, None) if keep_open else (target, None)
@@ -3,16 +3,27 @@
 # This source code is licensed under End User License Agreement found in the
 # LICENSE file at http://www.apstra.com/community/eula
 
-from aeon.base.device import BaseDevice
+from aeon.base.device import BaseDevice, api_call
 from aeon.cumulus.connector import Connector
+from aeon.cumulus.linux import LinuxDevice
 
 
 __all__ = ['Device']
 
 
-class Device(BaseDevice):
+class Device(LinuxDevice):
     OS_NAME = 'centos'
 
+    FACT_GROUPS = (
+        ('hostname', ('fqdn', 'hostname')),
+        ('os', ('os_version',)),
+        ('boot', ('boot_time',)),
+        ('hardware', ('virtual', 'vendor', 'serial_number', 'mac_address', 'hw_model',
+                      'hw_part_number', 'hw_version', 'service_tag')),
+    )
+    STATIC_FACT_GROUPS = ('hardware',)
+    IP_COMMAND = '/sbin/ip'
+
     def __init__(self, target, **kwargs):
         """
         :param target: hostname or ipaddr of target device
@@ -22,28 +33,21 @@ class Device(BaseDevice):
         """
         BaseDevice.__init__(self, target, Connector, **kwargs)
 
-    def get_mac_address(self, link_name):
-        good, got = self.api.execute(['/sbin/ip link show dev %s' % link_name])
-        data = got[0]['stdout']
-        macaddr = data.partition('link/ether ')[-1].split()[0]
-        return macaddr.upper()
+    def _gather_os(self):
+        good, got = yield api_call('execute', [
+            'cat /etc/centos-release | cut -d" " -f3'
+        ])
+
+        self.facts['os_version'] = got[0]['stdout'].strip()
 
-    def gather_facts(self):
+    def _hardware_facts(self, mac_address):
 
         facts = self.facts
-        facts['os_name'] = self.OS_NAME
-        good, got = self.api.execute([
-            'hostname',
-            'cat /etc/centos-release | cut -d" " -f3'
-        ])
 
-        facts['fqdn'] = got[0]['stdout'].strip()
-        facts['hostname'] = facts['fqdn']
-        facts['os_version'] = got[1]['stdout'].strip()
         facts['virtual'] = None
         facts['vendor'] = 'CentOS'
         facts['serial_number'] = None
-        facts['mac_address'] = self.get_mac_address("eth0")
+        facts['mac_address'] = mac_address
         facts['hw_model'] = 'Server'
         facts['hw_part_number'] = None
         facts['hw_version'] = None
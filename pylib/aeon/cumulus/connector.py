@@ -4,15 +4,99 @@
 # LICENSE file at http://www.apstra.com/community/eula
 
 import socket
+import uuid
+from multiprocessing.pool import ThreadPool
+
 import paramiko
 from aeon.exceptions import LoginNotReadyError
+from aeon.cumulus.shell import ShellSession
+from aeon.cumulus.stream import CommandStream
+from aeon.cumulus.transfer import FileTransfer
 
 
 __all__ = ['Connector']
 
 
+def _batch_boundary():
+    return 'AEON-BATCH-%s' % uuid.uuid4().hex
+
+
+def _batch_script(commands, boundary, stop_on_error=True):
+    """
+    Builds the shell script that runs commands in turn on a single channel.
+    Each command is run in a subshell, as it would have been on a channel of
+    its own, and is followed by a framing line, "<boundary> <index> <exit
+    code>" on stdout and "<boundary> <index>" on stderr.
+    """
+    lines = []
+    for index, cmd in enumerate(commands):
+        lines.append('(\n%s\n) </dev/null' % cmd)
+        lines.append('rc=$?')
+        lines.append("printf '\\n%s %d %%d\\n' $rc" % (boundary, index))
+        lines.append("printf '\\n%s %d\\n' >&2" % (boundary, index))
+        if stop_on_error is True:
+            lines.append('[ $rc -eq 0 ] || exit $rc')
+
+    return '\n'.join(lines) + '\n'
+
+
+def _batch_frames(output, boundary):
+    """
+    Splits the output of a batch script on its framing lines.
+    :return: dict of command index -> (output, [framing line fields])
+    """
+    if isinstance(output, bytes):
+        boundary, newline, space = boundary.encode('ascii'), b'\n', b' '
+    else:
+        newline, space = '\n', ' '
+    marker = newline + boundary + space
+
+    frames, pos = {}, 0
+    while True:
+        at = output.find(marker, pos)
+        if at < 0:
+            return frames
+        eol = output.find(newline, at + len(marker))
+        if eol < 0:
+            return frames
+        fields = output[at + len(marker):eol].split()
+        frames[int(fields[0])] = output[pos:at], fields[1:]
+        pos = eol + 1
+
+
+def _batch_results(commands, boundary, stdout, stderr):
+    """
+    :return: (good, results) from the output of a batch script, as for
+             Connector.execute
+    """
+    out_frames = _batch_frames(stdout, boundary)
+    err_frames = _batch_frames(stderr, boundary)
+
+    results = []
+    exit_code_collector = 0
+
+    for index, cmd in enumerate(commands):
+        if index not in out_frames:
+            break
+
+        cmd_stdout, fields = out_frames[index]
+        exit_code = int(fields[0])
+        exit_code_collector |= exit_code
+
+        results.append(dict(cmd=cmd, exit_code=exit_code,
+                            stdout=cmd_stdout,
+                            stderr=err_frames.get(index, (stderr[:0],))[0]))
+
+    good = bool(0 == exit_code_collector) and len(results) == len(commands)
+    return good, results
+
+
 class Connector(object):
     DEFAULT_PROTOCOL = 'ssh'
+    ACCEPTS_SOCK = True
+
+    # OpenSSH allows 10 sessions per connection by default (MaxSessions).
+    DEFAULT_MAX_CHANNELS = 8
 
     def __init__(self, hostname, **kwargs):
         self.hostname = hostname
@@ -21,37 +105,203 @@ class Connector(object):
         self.user = kwargs.get('user', 'admin')
         self.passwd = kwargs.get('passwd', 'admin')
 
-        self._client = paramiko.SSHClient()
-        self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        # an already authenticated paramiko.SSHClient may be handed over by
+        # the caller (e.g. aeon.utils.get_device), in which case it is used
+        # as-is rather than logging into the target a second time.
+
+        # likewise a socket already connected to the target (e.g. by
+        # BaseDevice.probe) may be handed over to carry the SSH session.
+
+        self._sock = kwargs.get('sock')
+
+        # otherwise, given an aeon.cumulus.pool.SSHPool (e.g. the process-wide
+        # aeon.cumulus.pool.default_pool), the session is checked out of it.
+
+        self._pool = kwargs.get('pool')
+        self._pooled = False
+
+        self._transfer = None
+        self._shell = None
 
-        self.open()
+        self._client = kwargs.get('client')
+        if self._client is None:
+            self.open()
+
+    @property
+    def connected(self):
+        transport = self._client.get_transport() if self._client is not None else None
+        return transport is not None and transport.is_active()
 
     def open(self):
+        # the handed over socket can carry only the one session.
+        sock, self._sock = self._sock, None
+
         try:
+            if self._pool is not None:
+                self._client = self._pool.checkout(
+                    self.hostname, self.port, self.user, self.passwd, sock=sock)
+                self._pooled = True
+                return
+
+            if self._client is None:
+                self._client = paramiko.SSHClient()
+                self._client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
             self._client.connect(
                 self.hostname, port=self.port,
-                username=self.user, password=self.passwd)
+                username=self.user, password=self.passwd,
+                sock=sock)
 
         except Exception as exc:
+            if sock is not None:
+                sock.close()
             raise LoginNotReadyError(exc=exc, message='Unable to connect.')
 
     def close(self):
-        self._client.close()
+        """
+        Closes the session, or returns it to the pool it came from.
+        """
+        if self._transfer is not None:
+            self._transfer.close()
+            self._transfer = None
+
+        if self._shell is not None:
+            self._shell.close()
+            self._shell = None
+
+        if self._pooled:
+            self._pool.checkin(self._pool.key(self.hostname, self.port, self.user, self.passwd),
+                               self._client)
+            self._client, self._pooled = None, False
+        elif self._client is not None:
+            self._client.close()
+
+    def execute(self, commands, stop_on_error=True, batch=False, shell=False):
+        """
+        :param commands: list of commands to run
+        :param stop_on_error: do not run the commands after one that fails
+        :param batch: run all of the commands on a single channel, rather
+                      than opening a channel for each of them
+        :param shell: run the commands in the persistent shell of the
+                      connector (see aeon.cumulus.shell.ShellSession), which
+                      is opened on first use and kept until the connector
+                      is closed; stderr is then part of stdout
+        :return: (True if all of the commands succeeded, list of result dicts)
+        """
+        if batch:
+            return self._execute_batch(commands, stop_on_error)
+
+        run = self.shell.run if shell else self._exec_command
 
-    def execute(self, commands, stop_on_error=True):
         results = []
         exit_code_collector = 0
 
         for cmd in commands:
-            stdin, stdout, stderr = self._client.exec_command(cmd)
-            exit_code = stdout.channel.recv_exit_status()
-            exit_code_collector |= exit_code
-
-            results.append(dict(cmd=cmd, exit_code=exit_code,
-                                stdout=stdout.read(),
-                                stderr=stderr.read()))
+            result = run(cmd)
+            exit_code_collector |= result['exit_code']
+            results.append(result)
 
-            if stop_on_error is True and exit_code != 0:
+            if stop_on_error is True and result['exit_code'] != 0:
                 return False, results
 
         return bool(0 == exit_code_collector), results
+
+    def execute_concurrent(self, commands, max_channels=DEFAULT_MAX_CHANNELS):
+        """
+        Runs independent commands at the same time, each on a channel of its
+        own over the one SSH connection.  All of the commands are run, there
+        is no stop_on_error.
+        :param commands: list of commands to run
+        :param max_channels: maximum number of channels open at once; the
+                             server limits this too (OpenSSH MaxSessions)
+        :return: (True if all of the commands succeeded, list of result
+                 dicts in the order of commands)
+        """
+        pool = ThreadPool(processes=max(1, min(max_channels, len(commands))))
+        try:
+            results = pool.map(self._exec_command, commands)
+        finally:
+            pool.terminate()
+
+        return all(0 == result['exit_code'] for result in results), results
+
+    def execute_stream(self, cmd, lines=False, spool_size=CommandStream.DEFAULT_SPOOL_SIZE,
+                       timeout=None):
+        """
+        Runs a command whose output may be too large to hold in memory.
+        :param cmd: command to run
+        :param lines: iterate lines of stdout rather than chunks
+        :param spool_size: bytes of stderr, or of stdout read by
+                           CommandStream.spool(), held in memory before
+                           spilling to a temporary file
+        :param timeout: seconds to wait for more output before raising
+                        aeon.exceptions.TimeoutError, None for no limit
+        :return: aeon.cumulus.stream.CommandStream, iterating stdout as it
+                 is received; exit_code and stderr are set once exhausted
+        """
+        channel = self._client.get_transport().open_session()
+        channel.exec_command(cmd)
+        return CommandStream(channel, lines=lines, spool_size=spool_size, timeout=timeout)
+
+    @property
+    def shell(self):
+        """
+        aeon.cumulus.shell.ShellSession on this session, opened on first use
+        and again should the shell have exited.
+        """
+        if self._shell is None or self._shell.closed:
+            self._shell = ShellSession(self._client)
+        return self._shell
+
+    @property
+    def transfer(self):
+        """
+        aeon.cumulus.transfer.FileTransfer over this session, the SFTP
+        channel being opened on first use.
+        """
+        if self._transfer is None:
+            self._transfer = FileTransfer(self)
+        return self._transfer
+
+    def put_file(self, local_path, remote_path, skip_same=True, checksum=None):
+        """
+        Copies a file to the device over SFTP.
+        :param local_path: file to copy to the device
+        :param remote_path: path of the file on the device
+        :param skip_same: do not copy the file if the remote file has the
+                          same checksum
+        :param checksum: sha256 hex digest of the local file, if known
+        :return: True if the file was copied, False if it was skipped
+        """
+        return self.transfer.put(local_path, remote_path,
+                                 skip_same=skip_same, checksum=checksum)
+
+    def get_file(self, remote_path, local_path, skip_same=True):
+        """
+        Copies a file from the device over SFTP.
+        :param remote_path: path of the file on the device
+        :param local_path: file to copy it to
+        :param skip_same: do not copy the file if the local file has the
+                          same checksum
+        :return: True if the file was copied, False if it was skipped
+        """
+        return self.transfer.get(remote_path, local_path, skip_same=skip_same)
+
+    def _run_command(self, cmd):
+        stdin, stdout, stderr = self._client.exec_command(cmd)
+
+        # stdout and stderr are read together, and before waiting for the
+        # exit status: the command cannot finish while either of them fills
+        # the channel window.
+        stream = CommandStream(stdout.channel)
+        out = stream.read()
+        return stream.exit_code, out, stream.stderr.read()
+
+    def _exec_command(self, cmd):
+        exit_code, out, err = self._run_command(cmd)
+        return dict(cmd=cmd, exit_code=exit_code, stdout=out, stderr=err)
+
+    def _execute_batch(self, commands, stop_on_error):
+        boundary = _batch_boundary()
+        _, out, err = self._run_command(_batch_script(commands, boundary, stop_on_error))
+        return _batch_results(commands, boundary, out, err)
@@ -6,15 +6,25 @@
 import re
 
 from aeon.cumulus.connector import Connector
-from aeon.base.device import BaseDevice
+from aeon.cumulus.linux import LinuxDevice
+from aeon.base.device import BaseDevice, api_call
 
 
 __all__ = ['Device']
 
 
-class Device(BaseDevice):
+class Device(LinuxDevice):
     OS_NAME = 'cumulus'
 
+    FACT_GROUPS = (
+        ('hostname', ('fqdn', 'hostname')),
+        ('os', ('os_version',)),
+        ('boot', ('boot_time',)),
+        ('hardware', ('virtual', 'vendor', 'serial_number', 'mac_address', 'hw_model',
+                      'hw_part_number', 'hw_version', 'service_tag')),
+    )
+    STATIC_FACT_GROUPS = ('hardware',)
+
     def __init__(self, target, **kwargs):
         """
         :param target: hostname or ipaddr of target device
@@ -25,43 +35,44 @@ class Device(BaseDevice):
         BaseDevice.__init__(self, target, Connector, **kwargs)
 
     def _serial_from_link(self, link_name):
-        good, got = self.api.execute(['ip link show dev %s' % link_name])
-        data = got[0]['stdout']
-        macaddr = data.partition('link/ether ')[-1].split()[0]
-        return macaddr.upper()
+        return self.links.mac_address(link_name)
+
+    def _gather_os(self):
+        good, got = yield api_call('execute', [
+            'cat /etc/lsb-release | grep RELEASE | cut -d= -f2'
+        ])
+
+        self.facts['os_version'] = got[0]['stdout'].strip()
 
-    def gather_facts(self):
+    def _gather_hardware(self):
 
         facts = self.facts
-        facts['os_name'] = self.OS_NAME
 
-        good, got = self.api.execute([
-            'hostname',
-            'cat /etc/lsb-release | grep RELEASE | cut -d= -f2',
-            'test -e /usr/cumulus/bin/decode-syseeprom'
-        ])
+        # whether the device is a Cumulus VX 2.x device is only known from
+        # the first command, the others are run either way.
+        good, got = yield api_call('execute', [
+            'test -e /usr/cumulus/bin/decode-syseeprom',
+            'sudo decode-syseeprom',
+            self.links.command
+        ], stop_on_error=False)
 
-        facts['fqdn'] = got[0]['stdout'].strip()
-        facts['hostname'] = facts['fqdn']
-        facts['os_version'] = got[1]['stdout'].strip()
-        virt2 = bool(0 != got[2]['exit_code'])
+        self.links.load(got[2]['stdout'])
+        virt2 = bool(0 != got[0]['exit_code'])
 
         if virt2 is True:
             # this is a Cumulus VX 2.x device
+            macaddr = self.links.mac_address('eth0')
+
             facts['virtual'] = True
             facts['vendor'] = 'CUMULUS-NETWORKS'
-            facts['serial_number'] = self._serial_from_link("eth0")
-            facts['mac_address'] = self._serial_from_link("eth0")
+            facts['serial_number'] = macaddr
+            facts['mac_address'] = macaddr
             facts['hw_model'] = 'CUMULUS-VX'
             facts['hw_part_number'] = None
             facts['hw_version'] = None
             facts['service_tag'] = None
         else:
-            good, got = self.api.execute([
-                'sudo decode-syseeprom',
-            ])
-
-            syseeprom = got[0]['stdout']
+            syseeprom = got[1]['stdout']
             scanner = re.compile(r'(.+) 0x[A-F0-9]{2}\s+\d+\s+(.+)')
             decoded = {
                 tag.strip(): value
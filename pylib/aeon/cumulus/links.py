@@ -0,0 +1,167 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import re
+import json
+from collections import namedtuple
+
+__all__ = ['Link', 'LinkInventory']
+
+
+class Link(namedtuple('Link', 'name ifindex link_type mac_address operstate mtu master kind')):
+    """
+    An interface of the device.  mac_address is upper case, or None for a
+    link that has no hardware address; kind (e.g. 'bond', 'vlan', 'bridge')
+    is only known from the JSON output of iproute2.
+    """
+    __slots__ = ()
+
+
+_LINK_HEADER = re.compile(r'^(\d+): ([^:@\s]+)(?:@\S+)?: <[^>]*>(.*)$')
+_LINK_ADDRESS = re.compile(r'^\s+link/(\S+)(?: ([0-9a-fA-F:]+))?')
+_LINK_ATTR = re.compile(r'\b(mtu|state|master) (\S+)')
+
+
+class LinkInventory(object):
+    """
+    The interfaces of a Linux-based device, read with a single iproute2
+    command and indexed by interface name and by MAC address.  The inventory
+    is read when first used and kept until refresh() is called.
+
+    iproute2 releases too old for JSON output (e.g. those of Cumulus 2.x or
+    CentOS 7) are read from the text output instead.
+    """
+    def __init__(self, api=None, ip='ip'):
+        """
+        :param api: device connector, to read the inventory with; may be
+                    None when the inventory is only ever loaded from output
+                    read by the caller, see load()
+        :param ip: path of the iproute2 'ip' command on the device
+        """
+        self.api = api
+        self.ip = ip
+        self._by_name = None
+        self._by_mac = None
+
+    @property
+    def command(self):
+        """
+        The command that reads the inventory; its output is given to load().
+        """
+        return '{ip} -json -details link show 2>/dev/null || {ip} -details link show'.format(ip=self.ip)
+
+    def refresh(self):
+        """
+        Reads the inventory from the device again.
+        :return: None
+        """
+        good, got = self.api.execute([self.command])
+        self.load(got[0]['stdout'])
+
+    def load(self, output):
+        """
+        :param output: output of the command, JSON or text
+        :return: None
+        """
+        if isinstance(output, bytes):
+            output = output.decode('utf-8', 'replace')
+
+        text = output.strip()
+        links = self._parse_json(text) if text.startswith('[') else self._parse_text(text)
+
+        self._by_name = dict((link.name, link) for link in links)
+        self._by_mac = {}
+        for link in links:
+            if link.mac_address is not None:
+                self._by_mac.setdefault(link.mac_address, []).append(link)
+
+    @staticmethod
+    def _mac(address):
+        return address.upper() if address else None
+
+    @classmethod
+    def _parse_json(cls, text):
+        return [
+            Link(name=item['ifname'],
+                 ifindex=item.get('ifindex'),
+                 link_type=item.get('link_type'),
+                 mac_address=cls._mac(item.get('address')) if item.get('link_type') == 'ether' else None,
+                 operstate=item.get('operstate'),
+                 mtu=item.get('mtu'),
+                 master=item.get('master'),
+                 kind=item.get('linkinfo', {}).get('info_kind'))
+            for item in json.loads(text)]
+
+    @classmethod
+    def _parse_text(cls, text):
+        links = []
+        header = None
+        for line in text.splitlines():
+            match = _LINK_HEADER.match(line)
+            if match:
+                header = match
+                continue
+
+            match = _LINK_ADDRESS.match(line)
+            if match and header is not None:
+                link_type, address = match.groups()
+                attrs = dict(_LINK_ATTR.findall(header.group(3)))
+                links.append(Link(
+                    name=header.group(2),
+                    ifindex=int(header.group(1)),
+                    link_type=link_type,
+                    mac_address=cls._mac(address) if link_type == 'ether' else None,
+                    operstate=attrs.get('state'),
+                    mtu=int(attrs['mtu']) if 'mtu' in attrs else None,
+                    master=attrs.get('master'),
+                    kind=None))
+                header = None
+
+        return links
+
+    def _loaded(self):
+        if self._by_name is None:
+            self.refresh()
+
+    def links(self):
+        """
+        :return: list of the Links, in ifindex order
+        """
+        self._loaded()
+        return sorted(self._by_name.values(), key=lambda link: link.ifindex)
+
+    def get(self, name):
+        """
+        :return: the Link of the interface name, or None
+        """
+        self._loaded()
+        return self._by_name.get(name)
+
+    def __getitem__(self, name):
+        self._loaded()
+        return self._by_name[name]
+
+    def __contains__(self, name):
+        self._loaded()
+        return name in self._by_name
+
+    def by_mac(self, mac_address):
+        """
+        :return: list of the Links with the MAC address; a bond, its members
+                 and its VLANs may all share one
+        """
+        self._loaded()
+        return list(self._by_mac.get(self._mac(mac_address), []))
+
+    def mac_address(self, name=None):
+        """
+        :param name: interface name, or None for the first Ethernet interface
+        :return: the upper case MAC address of the interface, or None
+        """
+        if name is not None:
+            link = self.get(name)
+        else:
+            link = next((link for link in self.links() if link.link_type == 'ether'), None)
+        return link.mac_address if link is not None else None
@@ -0,0 +1,109 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import re
+
+from aeon.base.device import BaseDevice, api_call
+from aeon.cumulus.links import LinkInventory
+
+__all__ = ['LinuxDevice']
+
+
+_DEFAULT_ROUTE_DEV = re.compile(r'^default\b.*\bdev (\S+)', re.M)
+
+
+class LinuxDevice(BaseDevice):
+    """
+    What the devices of the Linux-based NOS types (Cumulus, Ubuntu, CentOS,
+    OPX) have in common: the link inventory, the management interface, and
+    the facts that are read the same way on all of them.
+    """
+    BATCH_FACTS = True
+
+    # path of the iproute2 'ip' command on the device
+    IP_COMMAND = 'ip'
+
+    # the management interface, unless the device has none of that name;
+    # the interface of the default route is taken then.
+    MGMT_LINK = 'eth0'
+
+    @property
+    def links(self):
+        """
+        aeon.cumulus.links.LinkInventory of the device, read when first used
+        unless the facts have already read it.
+        """
+        if getattr(self, '_links', None) is None:
+            self._links = LinkInventory(getattr(self, 'api', None), ip=self.IP_COMMAND)
+        return self._links
+
+    @property
+    def route_command(self):
+        """
+        The command that reads the default route; its output is given to
+        mgmt_link().
+        """
+        return '%s route show 0.0.0.0/0' % self.IP_COMMAND
+
+    def mgmt_link(self, routes=None):
+        """
+        :param routes: output of route_command, read from the device if
+                       needed and not given
+        :return: name of the management interface, or None if not known
+        """
+        if self.MGMT_LINK in self.links:
+            return self.MGMT_LINK
+
+        if routes is None:
+            good, got = self.api.execute([self.route_command])
+            routes = got[0]['stdout']
+        if isinstance(routes, bytes):
+            routes = routes.decode('utf-8', 'replace')
+
+        match = _DEFAULT_ROUTE_DEV.search(routes)
+        return match.group(1) if match else None
+
+    def get_mac_address(self, link_name=None):
+        """
+        :param link_name: interface name, defaults to the management interface
+        :return: the upper case MAC address of the interface, or None
+        """
+        if link_name is None:
+            link_name = self.mgmt_link()
+        return self.links.mac_address(link_name) if link_name is not None else None
+
+    def _gather_hardware(self):
+        good, got = yield api_call('execute', [self.links.command])
+        self.links.load(got[0]['stdout'])
+
+        # only a device without the usual management interface has its
+        # default route read
+        routes = None
+        if self.MGMT_LINK not in self.links:
+            good, got = yield api_call('execute', [self.route_command])
+            routes = got[0]['stdout']
+
+        link_name = self.mgmt_link(routes)
+        self._hardware_facts(self.links.mac_address(link_name) if link_name is not None else None)
+
+    def _hardware_facts(self, mac_address):
+        """
+        Sets the hardware facts, once the link inventory has been read.
+        :param mac_address: MAC address of the management interface, or None
+        """
+        raise NotImplementedError
+
+    def _gather_hostname(self):
+        good, got = yield api_call('execute', ['hostname'])
+
+        self.facts['fqdn'] = got[0]['stdout'].strip()
+        self.facts['hostname'] = self.facts['fqdn']
+
+    def _gather_boot(self):
+        good, got = yield api_call('execute', [
+            "awk '/^btime/ {print $2}' /proc/stat"
+        ])
+
+        self.facts['boot_time'] = got[0]['stdout'].strip()
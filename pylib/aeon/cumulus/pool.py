@@ -0,0 +1,157 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import os
+import hmac
+import time
+import hashlib
+import threading
+
+import paramiko
+
+__all__ = ['SSHPool', 'default_pool']
+
+_clock = getattr(time, 'monotonic', time.time)
+
+
+class SSHPool(object):
+    """
+    Pool of logged in paramiko.SSHClient sessions, keyed by host, port, user
+    and a digest of the password, so that short-lived devices re-use the
+    sessions of the ones before them rather than logging in again; a session
+    is only handed to a caller with the credentials it was made with.
+
+    A session is checked out by a connector while in use and checked back in
+    when the connector is closed.  Idle sessions are closed once max_idle
+    seconds old, which is checked on every checkout and checkin; a pool
+    no longer used keeps its idle sessions open until evict() or clear() is
+    called.  Keepalives are sent on every session so that a dead peer is
+    noticed, and a session that is no longer active is discarded, and a new
+    one made, on checkout.
+    """
+    DEFAULT_MAX_IDLE = 300
+    DEFAULT_MAX_IDLE_PER_KEY = 4
+    DEFAULT_KEEPALIVE = 30
+
+    def __init__(self, max_idle=DEFAULT_MAX_IDLE, max_idle_per_key=DEFAULT_MAX_IDLE_PER_KEY,
+                 keepalive=DEFAULT_KEEPALIVE):
+        """
+        :param max_idle: seconds an idle session is kept for
+        :param max_idle_per_key: idle sessions kept for each host, port and credentials
+        :param keepalive: seconds between keepalives on a session, 0 for none
+        """
+        self.max_idle = max_idle
+        self.max_idle_per_key = max_idle_per_key
+        self.keepalive = keepalive
+        self._lock = threading.Lock()
+        self._idle = {}     # key -> [(checked in at, client)], most recent last
+        self._salt = os.urandom(16)
+
+    @staticmethod
+    def _healthy(client):
+        transport = client.get_transport()
+        return transport is not None and transport.is_active()
+
+    def _evict(self, now):
+        # with self._lock held; returns the clients to close
+        expired = []
+        for key, idle in list(self._idle.items()):
+            keep = [(at, client) for at, client in idle if now - at < self.max_idle]
+            expired.extend(client for at, client in idle if now - at >= self.max_idle)
+            if keep:
+                self._idle[key] = keep
+            else:
+                del self._idle[key]
+        return expired
+
+    def key(self, hostname, port, user, passwd):
+        """
+        :return: the key of the sessions logged in with these credentials; the
+                 password is kept only as a digest salted for this pool
+        """
+        if not isinstance(passwd, bytes):
+            passwd = passwd.encode('utf-8')
+        return hostname, port, user, hmac.new(self._salt, passwd, hashlib.sha256).hexdigest()
+
+    def checkout(self, hostname, port, user, passwd, sock=None):
+        """
+        :param sock: connected socket to use should a new session be made,
+                     closed otherwise
+        :return: a logged in paramiko.SSHClient
+        """
+        key = self.key(hostname, port, user, passwd)
+        while True:
+            with self._lock:
+                expired = self._evict(_clock())
+                idle = self._idle.get(key)
+                client = idle.pop()[1] if idle else None
+
+            for stale in expired:
+                stale.close()
+
+            if client is None:
+                break
+
+            if self._healthy(client):
+                if sock is not None:
+                    sock.close()
+                return client
+
+            # the session died while idle, try the next one
+            client.close()
+
+        client = paramiko.SSHClient()
+        client.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+        try:
+            client.connect(hostname, port=port, username=user, password=passwd, sock=sock)
+        except Exception:
+            client.close()
+            raise
+
+        if self.keepalive:
+            client.get_transport().set_keepalive(self.keepalive)
+        return client
+
+    def checkin(self, key, client):
+        """
+        Returns a session to the pool once it is no longer in use.
+        :param key: key() of the credentials the session was checked out for
+        :param client: paramiko.SSHClient
+        """
+        now = _clock()
+        with self._lock:
+            expired = self._evict(now)
+            idle = self._idle.setdefault(key, [])
+            if self._healthy(client) and len(idle) < self.max_idle_per_key:
+                idle.append((now, client))
+                client = None
+
+        for stale in expired + ([client] if client is not None else []):
+            stale.close()
+
+    def evict(self):
+        """
+        Closes the idle sessions older than max_idle, as checkout() and
+        checkin() do.
+        """
+        with self._lock:
+            expired = self._evict(_clock())
+
+        for stale in expired:
+            stale.close()
+
+    def clear(self):
+        """
+        Closes all of the idle sessions.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+
+        for entries in idle.values():
+            for _, client in entries:
+                client.close()
+
+
+default_pool = SSHPool()
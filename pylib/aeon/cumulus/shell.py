@@ -0,0 +1,94 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import re
+import socket
+import uuid
+
+from aeon.exceptions import TimeoutError
+
+__all__ = ['ShellSession']
+
+
+class ShellSession(object):
+    """
+    A shell kept open on one PTY of an SSH session, so that commands are run
+    without the setup of a new channel for each of them.
+
+    The terminal echo and the prompts are turned off, and every command is
+    followed by a line that prints a sentinel unique to the session and the
+    exit code of the command; the output of the command is what the shell
+    prints before it.  Commands run in the same shell one after the other,
+    so that e.g. 'cd' or variables carry over to the next command.
+
+    stdout and stderr share the PTY, so the stderr of a command is part of
+    its stdout.  A command that does not parse (e.g. unbalanced quotes)
+    leaves the shell waiting for more input, and times out.
+    """
+    CHUNK_SIZE = 32768
+    DEFAULT_TIMEOUT = 60
+
+    def __init__(self, client, timeout=DEFAULT_TIMEOUT):
+        """
+        :param client: logged in paramiko.SSHClient
+        :param timeout: seconds allowed for a command to finish
+        """
+        self.sentinel = 'AEON-SHELL-%s' % uuid.uuid4().hex
+        self._done = re.compile(
+            b'\n' + re.escape(self.sentinel.encode('ascii')) + b' (\\d+)\r?\n')
+        self._buffer = b''
+
+        self.channel = client.invoke_shell(term='dumb', width=4096, height=0)
+        self.channel.settimeout(timeout)
+
+        # anything the shell printed so far (motd, prompt, the echo of this
+        # setup) is discarded along with the output of the setup itself.
+        self.channel.sendall(
+            "stty -echo -onlcr 2>/dev/null; PS1=''; PS2=''; unset PROMPT_COMMAND\n%s"
+            % self._status_line())
+        self._read_output()
+
+    @property
+    def closed(self):
+        return self.channel.closed
+
+    def _status_line(self):
+        return "printf '\\n%s %%d\\n' $?\n" % self.sentinel
+
+    def _read_output(self):
+        pos = 0
+        while True:
+            match = self._done.search(self._buffer, pos)
+            if match is not None:
+                output, self._buffer = self._buffer[:match.start()], self._buffer[match.end():]
+                return output, int(match.group(1))
+
+            # the sentinel may have been split across reads
+            pos = max(0, len(self._buffer) - len(self.sentinel) - 16)
+            try:
+                data = self.channel.recv(self.CHUNK_SIZE)
+            except socket.timeout:
+                self.close()
+                raise TimeoutError('Shell command timed out.')
+
+            if not data:
+                # the command has exited the shell
+                self.close()
+                return self._buffer, self.channel.recv_exit_status()
+            self._buffer += data
+
+    def run(self, cmd):
+        """
+        :param cmd: command to run
+        :return: result dict, as for Connector.execute; stderr is always
+                 empty, being part of stdout
+        """
+        # the command is kept from reading the commands after it as input.
+        self.channel.sendall('{ %s\n} </dev/null\n%s' % (cmd, self._status_line()))
+        output, exit_code = self._read_output()
+        return dict(cmd=cmd, exit_code=exit_code, stdout=output, stderr=output[:0])
+
+    def close(self):
+        self.channel.close()
@@ -0,0 +1,114 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import select
+from tempfile import SpooledTemporaryFile
+
+from aeon.exceptions import TimeoutError
+
+__all__ = ['CommandStream']
+
+
+class CommandStream(object):
+    """
+    The output of a command run by Connector.execute_stream.  Iterating the
+    stream gives the stdout of the command, in chunks (or lines) as they are
+    received, so that an output of any size can be processed without holding
+    all of it in memory.
+
+    stderr is read alongside stdout, so that neither can stall the channel,
+    and is kept in a file that spills to disk past spool_size bytes.  Once
+    the stream is exhausted, exit_code is the exit status of the command and
+    stderr is rewound, ready to be read.
+
+    A command that produces no output for timeout seconds is given up on:
+    the channel is closed and aeon.exceptions.TimeoutError raised.
+    """
+    CHUNK_SIZE = 32768
+    DEFAULT_SPOOL_SIZE = 1024 * 1024
+
+    def __init__(self, channel, lines=False, spool_size=DEFAULT_SPOOL_SIZE, timeout=None):
+        """
+        :param channel: paramiko.Channel the command has been started on
+        :param lines: iterate lines of stdout rather than chunks
+        :param spool_size: bytes of output held in memory before spilling
+                           to a temporary file
+        :param timeout: seconds to wait for more output, None for as long
+                        as the command runs
+        """
+        self.channel = channel
+        self.lines = lines
+        self.spool_size = spool_size
+        self.timeout = timeout
+        self.exit_code = None
+        self.stderr = SpooledTemporaryFile(max_size=spool_size)
+
+    def __iter__(self):
+        chunks = self._chunks()
+        return self._split_lines(chunks) if self.lines else chunks
+
+    def _chunks(self):
+        chan = self.channel
+
+        while True:
+            while chan.recv_stderr_ready():
+                self.stderr.write(chan.recv_stderr(self.CHUNK_SIZE))
+
+            if chan.recv_ready():
+                data = chan.recv(self.CHUNK_SIZE)
+                if data:
+                    yield data
+                    continue
+
+            # the last of stdout may have come in with the EOF, since
+            # recv_ready() was asked
+            if chan.eof_received and not chan.recv_ready():
+                break
+
+            # the channel is readable while either of stdout or stderr has
+            # data, and for good once the command has finished.
+            readable, _, _ = select.select([chan], [], [], self.timeout)
+            if not readable:
+                chan.close()
+                raise TimeoutError('Command timed out.')
+
+        while chan.recv_stderr_ready():
+            self.stderr.write(chan.recv_stderr(self.CHUNK_SIZE))
+        self.stderr.seek(0)
+
+        self.exit_code = chan.recv_exit_status()
+        chan.close()
+
+    @staticmethod
+    def _split_lines(chunks):
+        partial = b''
+        for chunk in chunks:
+            lines = (partial + chunk).splitlines(True)
+            partial = lines.pop() if not lines[-1].endswith(b'\n') else b''
+            for line in lines:
+                yield line
+
+        if partial:
+            yield partial
+
+    def read(self):
+        """
+        Reads the rest of stdout into memory.
+        :return: bytes
+        """
+        return b''.join(self._chunks())
+
+    def spool(self):
+        """
+        Reads the rest of stdout into a file that spills to disk past
+        spool_size bytes.
+        :return: the file, rewound
+        """
+        spooled = SpooledTemporaryFile(max_size=self.spool_size)
+        for chunk in self._chunks():
+            spooled.write(chunk)
+
+        spooled.seek(0)
+        return spooled
@@ -0,0 +1,155 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import os
+import hashlib
+from multiprocessing.pool import ThreadPool
+
+import paramiko
+
+try:
+    from shlex import quote
+except ImportError:  # python 2
+    from pipes import quote
+
+__all__ = ['FileTransfer', 'put_many']
+
+DEFAULT_MAX_WORKERS = 32
+
+
+def _local_checksum(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as src:
+        for block in iter(lambda: src.read(FileTransfer.BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class FileTransfer(object):
+    """
+    SFTP file transfer over the SSH session of a Connector.
+
+    Writes are pipelined, i.e. sent without waiting for each to be
+    acknowledged, and reads are prefetched, so that the transfer is bound by
+    the channel window rather than by the round trip time; the window is
+    opened wide enough to keep a high latency link full.  A file whose
+    checksum already matches at the destination is not transferred again.
+    """
+    # bandwidth-delay product of 1Gb/s at 250ms.
+    WINDOW_SIZE = 32 * 1024 * 1024
+
+    # an SFTP server need not accept requests of more than 32KiB.
+    MAX_PACKET_SIZE = 32768
+
+    BLOCK_SIZE = 1024 * 1024
+
+    def __init__(self, connector):
+        """
+        :param connector: aeon.cumulus.connector.Connector
+        """
+        self.connector = connector
+        self._sftp = None
+
+    @property
+    def sftp(self):
+        if self._sftp is None:
+            self._sftp = paramiko.SFTPClient.from_transport(
+                self.connector._client.get_transport(),
+                window_size=self.WINDOW_SIZE,
+                max_packet_size=self.MAX_PACKET_SIZE)
+        return self._sftp
+
+    def close(self):
+        if self._sftp is not None:
+            self._sftp.close()
+            self._sftp = None
+
+    def remote_checksum(self, path):
+        """
+        :return: sha256 hex digest of the remote file, or None if it cannot
+                 be read
+        """
+        result = self.connector._exec_command('sha256sum %s' % quote(path))
+        fields = result['stdout'].split()
+        if result['exit_code'] != 0 or not fields:
+            return None
+
+        checksum = fields[0]
+        return checksum.decode('ascii') if isinstance(checksum, bytes) else checksum
+
+    def put(self, local_path, remote_path, skip_same=True, checksum=None):
+        """
+        :param local_path: file to copy to the device
+        :param remote_path: path of the file on the device
+        :param skip_same: do not copy the file if the remote file has the
+                          same checksum
+        :param checksum: sha256 hex digest of the local file, if known
+        :return: True if the file was copied, False if it was skipped
+        """
+        if skip_same and self.remote_checksum(remote_path) == (
+                checksum or _local_checksum(local_path)):
+            return False
+
+        with open(local_path, 'rb') as src:
+            with self.sftp.open(remote_path, 'wb') as dst:
+                dst.set_pipelined(True)
+                for block in iter(lambda: src.read(self.BLOCK_SIZE), b''):
+                    dst.write(block)
+
+        return True
+
+    def get(self, remote_path, local_path, skip_same=True):
+        """
+        :param remote_path: path of the file on the device
+        :param local_path: file to copy it to
+        :param skip_same: do not copy the file if the local file has the
+                          same checksum
+        :return: True if the file was copied, False if it was skipped
+        """
+        if skip_same and os.path.isfile(local_path) and (
+                _local_checksum(local_path) == self.remote_checksum(remote_path)):
+            return False
+
+        with self.sftp.open(remote_path, 'rb') as src:
+            src.prefetch(src.stat().st_size)
+            with open(local_path, 'wb') as dst:
+                for block in iter(lambda: src.read(self.BLOCK_SIZE), b''):
+                    dst.write(block)
+
+        return True
+
+
+def put_many(targets, local_path, remote_path, skip_same=True,
+             max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Copies a file to many devices at once, in a bounded pool of worker
+    threads.  The local checksum is computed once for all of the devices.
+
+    :param targets: iterable of devices or connectors (anything with a
+                    put_file method, or an 'api' attribute that has one)
+    :param local_path: file to copy to the devices
+    :param remote_path: path of the file on the devices
+    :param skip_same: as for FileTransfer.put
+    :param max_workers: maximum number of transfers at once
+    :return: generator of (target, True | False | exception) as each
+             transfer completes, as for FileTransfer.put; a failed
+             transfer is reported with its exception
+    """
+    checksum = _local_checksum(local_path) if skip_same else None
+
+    def transfer(target):
+        connector = getattr(target, 'api', target)
+        try:
+            return target, connector.put_file(local_path, remote_path,
+                                              skip_same=skip_same, checksum=checksum)
+        except Exception as exc:
+            return target, exc
+
+    pool = ThreadPool(processes=max_workers)
+    try:
+        for result in pool.imap_unordered(transfer, targets):
+            yield result
+    finally:
+        pool.terminate()
@@ -4,13 +4,76 @@
 # LICENSE file at http://www.apstra.com/community/eula
 
 import pyeapi
+from pyeapi import eapilib
+import requests
 import socket
 from copy import deepcopy
 
 from aeon.exceptions import ConfigError, CommandError
+from aeon.base.http import http_pool
+from aeon.base.decode import loads
+
+
+__all__ = ['Connector', 'EapiSession']
+
+
+class EapiSession(eapilib.EapiConnection):
+    """
+    pyeapi connection that sends its requests on a requests.Session, rather
+    than on a connection of its own that pyeapi closes after every request;
+    the connections to the device are kept open in an aeon.base.http pool,
+    and resume TLS sessions over https.
+    """
+    def __init__(self, host, port, transport='http', username=None, password=None,
+                 timeout=60, pool=None):
+        """
+        :param pool: aeon.base.http.HTTPPool, which may be shared by many
+                     connections; defaults to a pool of the connection's own
+        """
+        super(EapiSession, self).__init__()
+        self.transport = '{proto}://{host}:{port}/command-api'.format(
+            proto=transport, host=host, port=port)
+        self.timeout = timeout
+
+        self._owns_pool = pool is None
+        self.session = requests.Session()
+        self.session.auth = (username, password)
+        self.session.mount('http://', pool or http_pool(max_hosts=1))
+        self.session.mount('https://', self.session.get_adapter('http://'))
+
+    def send(self, data):
+        """
+        As pyeapi.eapilib.EapiConnection.send.
+        """
+        try:
+            # as for pyeapi, the device certificate is not verified; see
+            # aeon.base.http.disable_insecure_warnings
+            resp = self.session.post(
+                self.transport, data=data, timeout=self.timeout, verify=False,
+                headers={'Content-Type': 'application/json-rpc'})
+        except requests.exceptions.RequestException as exc:
+            self.socket_error = self.error = exc
+            raise eapilib.ConnectionError(
+                str(self), 'Socket error during eAPI connection: %s' % exc)
+
+        if resp.status_code == 401:
+            raise eapilib.ConnectionError(str(self), '%s. %s' % (resp.reason, resp.text))
+
+        try:
+            decoded = loads(resp.content)
+        except ValueError as exc:
+            self.socket_error, self.error = None, exc
+            raise eapilib.ConnectionError(str(self), 'unable to connect to eAPI')
 
+        if 'error' in decoded:
+            code, msg, err, out = self._parse_error_message(decoded)
+            raise eapilib.CommandError(code, msg, command_error=err, output=out)
 
-__all__ = ['Connector']
+        return decoded
+
+    def close(self):
+        if self._owns_pool:
+            self.session.close()
 
 
 class Connector(object):
@@ -38,12 +101,25 @@ class Connector(object):
             self.eapi = pyeapi.client.make_connection(
                 'socket', username=self.user, password=self.passwd,
                 **kwargs.get('socket_opts'))
+        elif self.proto in ('http', 'https'):
+            # the connections are drawn from the pool given as the 'pool'
+            # keyword (see aeon.base.http.http_pool), which may be shared by
+            # many connectors.
+            self.eapi = EapiSession(
+                host=self.hostname, port=self.port, transport=self.proto,
+                username=self.user, password=self.passwd,
+                timeout=240, pool=kwargs.get('pool'))
         else:
             self.eapi = pyeapi.connect(
                 transport=self.proto, host=self.hostname,
                 username=self.user, password=self.passwd,
                 timeout=240)
 
+    def close(self):
+        close = getattr(self.eapi, 'close', None)
+        if close is not None:
+            close()
+
     def execute(self, commands, encoding='json'):
 
         # Make a copy of commands so that commands object isn't mutated outside of this function
@@ -5,7 +5,7 @@
 
 
 from aeon.eos.connector import Connector
-from aeon.base.device import BaseDevice
+from aeon.base.device import BaseDevice, api_call
 
 
 __all__ = ['Device']
@@ -14,6 +14,12 @@ __all__ = ['Device']
 class Device(BaseDevice):
     OS_NAME = 'eos'
 
+    FACT_GROUPS = (
+        ('version', ('vendor', 'os_version', 'boot_time', 'hw_model', 'hw_version', 'hw_part_number',
+                     'hw_part_version', 'chassis_id', 'mac_address', 'virtual', 'serial_number')),
+        ('hostname', ('fqdn', 'hostname')),
+    )
+
     def __init__(self, target, **kwargs):
         """
         :param target: hostname or ipaddr of target device
@@ -23,14 +29,14 @@ class Device(BaseDevice):
         """
         BaseDevice.__init__(self, target, Connector, **kwargs)
 
-    def gather_facts(self):
+    def _gather_version(self):
 
         facts = self.facts
-        got_ver = self.api.execute('show version')
+        got_ver = yield api_call('execute', 'show version')
 
         facts['vendor'] = 'arista'
-        facts['os_name'] = self.OS_NAME
         facts['os_version'] = got_ver['version']
+        facts['boot_time'] = got_ver.get('bootupTimestamp')
         facts['hw_model'] = got_ver['modelName']
         facts['hw_version'] = got_ver['hardwareRevision']
         facts['hw_part_number'] = None
@@ -41,14 +47,18 @@ class Device(BaseDevice):
         facts['virtual'] = bool('vEOS' == facts['hw_model'])
 
         if facts['virtual']:
-            got_ma1 = self.api.execute('show interfaces ma1')
+            got_ma1 = yield api_call('execute', 'show interfaces ma1')
             macaddr = got_ma1['interfaces']['Management1']['physicalAddress']
             facts['serial_number'] = macaddr.replace(':', '').upper()
         else:
             facts['serial_number'] = got_ver['serialNumber']
 
+    def _gather_hostname(self):
+
+        facts = self.facts
+
         try:
-            got_host = self.api.execute('show hostname')
+            got_host = yield api_call('execute', 'show hostname')
             facts['fqdn'] = got_host.get('fqdn')
             facts['hostname'] = got_host.get('hostname')
         except:  # NOQA
@@ -4,7 +4,7 @@
 # LICENSE file at http://www.apstra.com/community/eula
 
 import re
-from lxml import etree
+from json.encoder import encode_basestring_ascii
 import requests
 from requests.auth import HTTPBasicAuth
 from copy import copy
@@ -13,6 +13,8 @@ import socket
 
 from aeon import exceptions
 from aeon.nxos import exceptions as NxosExc
+from aeon.base.http import http_pool
+from aeon.base.decode import Payload, loads
 
 
 _RE_CONF = re.compile(r"\n\n?\s*")
@@ -24,6 +26,164 @@ _NXOS_RESP_XPATH_HTTPCODE = 'outputs/output/code'
 _NXOS_RESP_XPATH_CLIERR = 'outputs/output/clierror'
 
 
+# the JSON-RPC method of each ins_api message type, and the key of its
+# output in the result.
+_JSONRPC_METHODS = {
+    'cli_show': ('cli', 'body'),
+    'cli_show_ascii': ('cli_ascii', 'msg'),
+}
+
+# the envelope of a JSON-RPC call up to its command, which is followed by
+# the call id; see _jsonrpc_request.
+_JSONRPC_PREFIX = dict(
+    (msg_type, '{"jsonrpc":"2.0","method":"%s","params":{"version":1,"cmd":' % method)
+    for msg_type, (method, _) in _JSONRPC_METHODS.items())
+
+_JSONRPC_HEADERS = {'content-type': 'application/json-rpc'}
+
+
+def _check_resp_status(status_code, reason):
+    if 401 == status_code:
+        cmd_exc = exceptions.UnauthorizedError()
+        cmd_exc.message = 'not authorized'
+        raise cmd_exc
+
+    if 200 != status_code:
+        cmd_exc = NxosExc.CommandError()
+        cmd_exc.errorcode = status_code
+        cmd_exc.message = "command failed, http_code={0} http_reason={1}".format(
+            status_code, reason)
+        raise cmd_exc
+
+
+def _parse_config_resp(content):
+    # now we need to check the contents of the NX-API response ...
+    # we will just check for one instance right now ... may try to gather
+    # all of them &| include the XML body as part of the exception at some
+    # later point in time.
+
+    # a response with no error in it is not parsed at all.
+    payload = Payload(content)
+    if b'<clierror' not in payload:
+        return True
+
+    cli_error = payload.xml_find(_NXOS_RESP_XPATH_CLIERR)
+    if cli_error is not None:
+        raise NxosExc.CommandError(cli_error.text)
+
+    # config OK, yea!
+    return True
+
+
+def _parse_opcmd_resp(content, resp_fmt, raw_resp=False):
+    payload = Payload(content)
+    if 'json' != resp_fmt:
+        if raw_resp is True:
+            return payload.xml
+
+        return payload.xml_find(_NXOS_RESP_XPATH_BODY)
+
+    as_json = payload.json
+    outputs = as_json['ins_api']['outputs']['output']
+
+    if 'clierror' in outputs:
+        raise NxosExc.CommandError(outputs['clierror'])
+
+    return as_json if raw_resp is True else outputs['body']
+
+
+def _parse_opcmds_resp(content, commands):
+    outputs = loads(content)['ins_api']['outputs']['output']
+
+    # the output of a single command is not given in a list
+    if isinstance(outputs, dict):
+        outputs = [outputs]
+
+    results = []
+    for index, command in enumerate(commands):
+        if index >= len(outputs):
+            results.append(NxosExc.CommandError('no output for command: %s' % command))
+            continue
+
+        output = outputs[index]
+        if 'clierror' in output or output.get('code', '200') != '200':
+            cmd_exc = NxosExc.CommandError(output.get('clierror') or output.get('msg'))
+            cmd_exc.command = command
+            results.append(cmd_exc)
+        else:
+            results.append(output.get('body'))
+
+    return results
+
+
+def _parse_chunk_resp(content):
+    as_json = loads(content)['ins_api']
+    output = as_json['outputs']['output']
+
+    if 'clierror' in output:
+        raise NxosExc.CommandError(output['clierror'])
+
+    return output.get('body'), as_json.get('sid')
+
+
+def _jsonrpc_request(commands, msg_type='cli_show'):
+    # a batch of calls, with ids counted from 1
+    prefix = _JSONRPC_PREFIX[msg_type]
+    return '[' + ','.join(
+        prefix + encode_basestring_ascii(command) + '},"id":' + str(index) + '}'
+        for index, command in enumerate(commands, 1)) + ']'
+
+
+def _parse_jsonrpc_resp(content, commands, msg_type='cli_show'):
+    got = loads(content)
+
+    # a single call may be answered on its own, rather than in a list
+    if isinstance(got, dict):
+        got = [got]
+
+    by_id = dict((each.get('id'), each) for each in got)
+    key = _JSONRPC_METHODS[msg_type][1]
+
+    results = []
+    for index, command in enumerate(commands, 1):
+        each = by_id.get(index)
+        if each is None:
+            cmd_exc = NxosExc.CommandError('no output for command: %s' % command)
+        elif 'error' in each:
+            error = each['error']
+            cmd_exc = NxosExc.CommandError((error.get('data') or {}).get('msg') or error.get('message'))
+            cmd_exc.errorcode = error.get('code')
+        else:
+            results.append((each.get('result') or {}).get(key))
+            continue
+
+        cmd_exc.command = command
+        results.append(cmd_exc)
+
+    return results
+
+
+def _post(api, data, headers, timeout=None):
+    _timeout = timeout if timeout is not None else api.DEFAULT_TIMEOUT
+    try:
+        resp = api.session.post(
+            api.api_url, headers=headers,
+            timeout=_timeout, verify=api.verify,
+            auth=api.api_auth, data=data)
+
+    except requests.exceptions.ReadTimeout as exc:
+        cmd_exc = exceptions.TimeoutError(exc)
+        cmd_exc.timeout = timeout
+        raise cmd_exc
+
+    except Exception as exc:
+        raise NxosExc.RequestError(exc)
+
+    _check_resp_status(resp.status_code, resp.reason)
+
+    return resp
+
+
 class NxosRequest(object):
     MESSGE_TYPES = ('cli_show', 'cli_show_ascii', 'cli_conf')
     OUTPUT_FMTS = ('json', 'xml')
@@ -56,34 +216,7 @@ class NxosRequest(object):
         self.__dict__['params'] = copy(self.DEFAULTS)
 
     def send(self, api, timeout=None):
-        _timeout = timeout if timeout is not None else api.DEFAULT_TIMEOUT
-        try:
-            resp = requests.post(
-                api.api_url, headers=api.api_headers,
-                timeout=_timeout,
-                auth=api.api_auth, data=str(self))
-
-        except requests.exceptions.ReadTimeout as exc:
-            cmd_exc = exceptions.TimeoutError(exc)
-            cmd_exc.timeout = timeout
-            raise cmd_exc
-
-        except Exception as exc:
-            raise NxosExc.RequestError(exc)
-
-        if 401 == resp.status_code:
-            cmd_exc = exceptions.UnauthorizedError()
-            cmd_exc.message = 'not authorized'
-            raise cmd_exc
-
-        if 200 != resp.status_code:
-            cmd_exc = NxosExc.CommandError()
-            cmd_exc.errorcode = resp.status_code
-            cmd_exc.message = "command failed, http_code={0} http_reason={1}".format(
-                resp.status_code, resp.reason)
-            raise cmd_exc
-
-        return resp
+        return _post(api, str(self), api.api_headers, timeout)
 
     def __setattr__(self, key, value):
         if key in self.__dict__['params'] and value is not None:
@@ -113,6 +246,16 @@ class NxosConnector(object):
     DEFAULT_PROTOCOL = 'http'
     DEFAULT_TIMEOUT = 60
 
+    # the most show commands NX-API runs in one request
+    MAX_OPCMDS = 10
+
+    # 'ins_api' sends the show commands in the XML envelope of NX-API;
+    # 'jsonrpc' sends them as JSON-RPC calls, which are cheaper to encode
+    # and decode.  Configuration, chunked output and XML output always use
+    # the ins_api envelope.
+    TRANSPORTS = ('ins_api', 'jsonrpc')
+    DEFAULT_TRANSPORT = 'ins_api'
+
     def __init__(self, hostname, **kwargs):
         self.hostname = hostname
 
@@ -123,13 +266,34 @@ class NxosConnector(object):
             proto=self.proto, port=self.port, target=self.hostname)
 
         self.api_headers = {
-            'cookie': 'no-cookie',
             'content-type': 'text/xml'
         }
 
+        self.transport = kwargs.get('transport') or self.DEFAULT_TRANSPORT
+        if self.transport not in self.TRANSPORTS:
+            raise ValueError('transport must be one of %s' % ', '.join(self.TRANSPORTS))
+
         self.user = kwargs.get('user')
         self.passwd = kwargs.get('passwd')
 
+        # the device certificate is verified over https unless 'verify' is
+        # False; it may also be the path of the CA bundle to verify it with.
+        self.verify = kwargs.get('verify', True)
+
+        # the session keeps the connections to the device open between
+        # requests, and keeps the nxapi_auth cookie the device sets once the
+        # user is authenticated, so that later requests skip the AAA login.
+        # The connections are drawn from the pool given as the 'pool'
+        # keyword (see aeon.base.http.http_pool), which may be shared by
+        # many connectors, and resume TLS sessions over https; the cookie is
+        # never shared.
+
+        self._owns_pool = kwargs.get('pool') is None
+        self._pool = kwargs.get('pool') or http_pool(max_hosts=1)
+        self.session = requests.Session()
+        self.session.mount('http://', self._pool)
+        self.session.mount('https://', self._pool)
+
     # ---------------------------------------------------------------
     #                             PROPERTIES
     # ---------------------------------------------------------------
@@ -148,48 +312,99 @@ class NxosConnector(object):
     def api_auth(self):
         return HTTPBasicAuth(self.user, self._passwd)
 
+    def close(self):
+        """
+        Closes the connections to the device, unless the pool is shared.
+        """
+        if self._owns_pool:
+            self.session.close()
+
     def exec_config(self, contents, timeout=None):
         rqst = NxosConfigRequest()
         rqst.command = _RE_CONF.sub(' ; ', contents)
 
         resp = rqst.send(self, timeout)
+        return _parse_config_resp(resp.content)
 
-        # now we need to check the contents of the NX-API response ...
-        # we will just check for one instance right now ... may try to gather
-        # all of them &| include the XML body as part of the exception at some
-        # later point in time.
+    def _jsonrpc(self, msg_type, raw_resp=False, resp_fmt=None):
+        # whether the request can be sent as JSON-RPC
+        if self.transport != 'jsonrpc' or raw_resp is not False:
+            return False
+        return resp_fmt in (None, 'json') and (msg_type or 'cli_show') in _JSONRPC_METHODS
 
-        as_xml = etree.XML(resp.text)
-        cli_error = as_xml.find(_NXOS_RESP_XPATH_CLIERR)
-        if cli_error is not None:
-            raise NxosExc.CommandError(cli_error.text)
-
-        # config OK, yea!
-        return True
+    def _exec_jsonrpc(self, commands, msg_type=None, timeout=None):
+        msg_type = msg_type or 'cli_show'
+        resp = _post(self, _jsonrpc_request(commands, msg_type), _JSONRPC_HEADERS, timeout)
+        return _parse_jsonrpc_resp(resp.content, commands, msg_type)
 
     def exec_opcmd(self, command, raw_resp=False, timeout=None, **kwargs):
 
+        if self._jsonrpc(kwargs.get('msg_type'), raw_resp, kwargs.get('resp_fmt')):
+            got = self._exec_jsonrpc([command], kwargs.get('msg_type'), timeout)[0]
+            if isinstance(got, Exception):
+                raise got
+            return got
+
         rqst = NxosOperRequest(command=command)
         rqst.msg_type = kwargs.get('msg_type')
         rqst.resp_fmt = kwargs.get('resp_fmt')
 
         resp = rqst.send(self, timeout)
-
-        def rsp_is_xml():
-            as_xml = etree.XML(resp.text)
-            if raw_resp is True:
-                return as_xml
-
-            return as_xml.find(_NXOS_RESP_XPATH_BODY)
-
-        def rsp_is_json():
-            as_json = resp.json()
-            outputs = as_json['ins_api']['outputs']['output']
-
-            if 'clierror' in outputs:
-                raise NxosExc.CommandError(outputs['clierror'])
-
-            return as_json if raw_resp is True else outputs['body']
-
-        proc_rsp = rsp_is_json if 'json' == rqst.resp_fmt else rsp_is_xml
-        return proc_rsp()
+        return _parse_opcmd_resp(resp.content, rqst.resp_fmt, raw_resp)
+
+    def exec_opcmds(self, commands, timeout=None, **kwargs):
+        """
+        Runs many show commands in as few requests as NX-API allows, each
+        request carrying up to MAX_OPCMDS commands joined with ' ;'.  A
+        command that fails does not fail the others.
+        :param commands: list of show commands
+        :param kwargs: 'msg_type', as for exec_opcmd
+        :return: list of the JSON body of each command, in order, or of the
+                 NxosExc.CommandError of each command that failed
+        """
+        commands = list(commands)
+        results = []
+
+        for start in range(0, len(commands), self.MAX_OPCMDS):
+            chunk = commands[start:start + self.MAX_OPCMDS]
+            if self._jsonrpc(kwargs.get('msg_type')):
+                results.extend(self._exec_jsonrpc(chunk, kwargs.get('msg_type'), timeout))
+                continue
+
+            rqst = NxosOperRequest(command=' ;'.join(chunk))
+            rqst.msg_type = kwargs.get('msg_type')
+
+            resp = rqst.send(self, timeout)
+            results.extend(_parse_opcmds_resp(resp.content, chunk))
+
+        return results
+
+    def exec_opcmd_stream(self, command, timeout=None, **kwargs):
+        """
+        Runs a show command with NX-API chunk mode, so that a large output
+        (e.g. 'show running-config', 'show ip route vrf all') is read from
+        the device a piece at a time rather than in one response.  Only the
+        current piece is ever held in memory.
+        :param command: show command
+        :param kwargs: 'msg_type', defaults to 'cli_show_ascii'; with
+                       'cli_show' the pieces are those of the JSON text
+        :return: generator of the pieces of the output text, in order
+        """
+        sid = None
+        while True:
+            rqst = NxosOperRequest(command=command)
+            rqst.msg_type = kwargs.get('msg_type') or 'cli_show_ascii'
+            rqst.chunk = 1
+            rqst.session_id = sid
+
+            resp = rqst.send(self, timeout)
+            body, sid = _parse_chunk_resp(resp.content)
+            del resp    # not to be held while the piece is handed out
+
+            if body:
+                yield body
+
+            # the device names the session of the next piece, or 'eoc'
+            # after the last one
+            if sid is None or sid == 'eoc':
+                return
@@ -4,19 +4,59 @@
 # LICENSE file at http://www.apstra.com/community/eula
 
 
-from functools import partial
 import importlib
 
-from aeon.base.device import BaseDevice
+from aeon.base.device import BaseDevice, CallBatch, api_call
 from aeon.nxos.connector import NxosConnector as Connector
 
 
 __all__ = ['Device']
 
 
+class OpcmdBatch(CallBatch):
+    """
+    Merges JSON exec_opcmd() calls into one exec_opcmds() call, so that the
+    show commands of the facts routines share an NX-API request.
+    """
+    method = 'exec_opcmd'
+
+    @staticmethod
+    def accepts(args, kwargs):
+        return len(args) == 1 and kwargs == dict(resp_fmt='json')
+
+    @staticmethod
+    def merge(calls):
+        return api_call('exec_opcmds', [args[0] for args, _ in calls])
+
+    @staticmethod
+    def split(calls, result):
+        for got in result:
+            if isinstance(got, Exception):
+                yield None, (type(got), got, None)
+            else:
+                yield got, None
+
+
 class Device(BaseDevice):
     OS_NAME = 'nxos'
 
+    FACT_GROUPS = (
+        ('hostname', ('fqdn', 'hostname', 'domain_name')),
+        ('hardware', ('os_version', 'chassis_id', 'virtual', 'serial_number', 'hw_model',
+                      'hw_part_number', 'hw_part_version', 'hw_version')),
+        ('mgmt', ('mac_address',)),
+        ('boot', ('boot_time',)),
+    )
+    STATIC_FACT_GROUPS = ('hardware', 'mgmt')
+
+    # NX-OS is only upgraded by a reload, so the boot time alone tells
+    # whether stored facts are still valid.
+    FACTS_STORE_KEY = ('boot_time',)
+
+    # the show commands of the facts routines are sent in one request.
+    BATCH_FACTS = True
+    BATCH_CALLS = (OpcmdBatch,)
+
     def __init__(self, target, **kwargs):
         """
         :param target: hostname or ipaddr of target device
@@ -26,26 +66,30 @@ class Device(BaseDevice):
         """
         BaseDevice.__init__(self, target, Connector, **kwargs)
 
-    def close(self):
-        # nothing to do for close at this time, yo!
-        pass
+    @staticmethod
+    def _exec_show(command):
+        return api_call('exec_opcmd', command, resp_fmt='json')
 
-    def gather_facts(self):
-        exec_show = partial(self.api.exec_opcmd, resp_fmt='json')
+    def _gather_hostname(self):
 
         facts = self.facts
-        facts['os_name'] = self.OS_NAME
 
-        got = exec_show('show hostname')
+        got = yield self._exec_show('show hostname')
         facts['fqdn'] = got['hostname']
         facts['hostname'], _, facts['domain_name'] = facts['fqdn'].partition('.')
 
+    def _gather_hardware(self):
+
+        facts = self.facts
+
         attempts = 1
-        while attempts < 5:
+        while True:
             try:
-                got = exec_show('show hardware')
-            except:  # NOQA
-                attempts -= 1
+                got = yield self._exec_show('show hardware')
+            except Exception:
+                if attempts == 4:
+                    raise
+                attempts += 1
             else:
                 break
 
@@ -60,9 +104,17 @@ class Device(BaseDevice):
         facts['hw_part_version'] = row['part_revision']
         facts['hw_version'] = row['hw_ver']
 
-        got = exec_show('show interface mgmt0')
-        raw_mac = got['TABLE_interface']['ROW_interface']['eth_hw_addr'].replace('.', '')
-        facts['mac_address'] = ':'.join(s.encode('hex') for s in raw_mac.decode('hex'))
+    def _gather_mgmt(self):
+
+        facts = self.facts
+
+        got = yield self._exec_show('show interface mgmt0')
+        raw_mac = got['TABLE_interface']['ROW_interface']['eth_hw_addr'].replace('.', '').lower()
+        facts['mac_address'] = ':'.join(raw_mac[i:i + 2] for i in range(0, len(raw_mac), 2))
+
+    def _gather_boot(self):
+        got = yield self._exec_show('show system uptime')
+        self.facts['boot_time'] = got['sys_st_time']
 
     def __getattr__(self, item):
         # ##
@@ -3,16 +3,27 @@
 # This source code is licensed under End User License Agreement found in the
 # LICENSE file at http://www.apstra.com/community/eula
 
-from aeon.base.device import BaseDevice
+from aeon.base.device import BaseDevice, api_call
 from aeon.cumulus.connector import Connector
+from aeon.cumulus.linux import LinuxDevice
 
 
 __all__ = ['Device']
 
 
-class Device(BaseDevice):
+class Device(LinuxDevice):
     OS_NAME = 'OPX'
 
+    FACT_GROUPS = (
+        ('hostname', ('fqdn', 'hostname')),
+        ('os', ('os_version',)),
+        ('boot', ('boot_time',)),
+        ('platform', ('virtual', 'hw_model')),
+        ('hardware', ('vendor', 'serial_number', 'mac_address',
+                      'hw_part_number', 'hw_version', 'service_tag')),
+    )
+    STATIC_FACT_GROUPS = ('platform', 'hardware')
+
     def __init__(self, target, **kwargs):
         """
         :param target: hostname or ipaddr of target device
@@ -22,31 +33,28 @@ class Device(BaseDevice):
         """
         BaseDevice.__init__(self, target, Connector, **kwargs)
 
-    def get_mac_address(self):
-        good, got = self.api.execute(['ip link show'])
-        data = got[0]['stdout']
-        macaddr = data.partition('link/ether ')[-1].split()[0]
-        return macaddr.upper()
-
-    def gather_facts(self):
+    def _gather_os(self):
+        good, got = yield api_call('execute', [
+            """grep -oP '^OS_VERSION=[\"]?\K.*\d' /etc/OPX-release-version"""
+        ])
 
-        facts = self.facts
-        facts['os_name'] = self.OS_NAME
+        self.facts['os_version'] = got[0]['stdout'].strip()
 
-        good, got = self.api.execute([
-            'hostname',
-            """grep -oP '^OS_VERSION=[\"]?\K.*\d' /etc/OPX-release-version""",
+    def _gather_platform(self):
+        good, got = yield api_call('execute', [
             """grep -oP '^PLATFORM=[\"]?\K.*\w' /etc/OPX-release-version"""
         ])
 
-        facts['fqdn'] = got[0]['stdout'].strip()
-        facts['hostname'] = facts['fqdn']
-        facts['os_version'] = got[1]['stdout'].strip()
-        facts['virtual'] = bool('vm' in got[2]['stdout'].lower())
+        self.facts['virtual'] = bool('vm' in got[0]['stdout'].lower())
+        self.facts['hw_model'] = got[0]['stdout'].strip()
+
+    def _hardware_facts(self, mac_address):
+
+        facts = self.facts
+
         facts['vendor'] = 'OPX'
-        facts['serial_number'] = self.get_mac_address().replace(':', '')
-        facts['mac_address'] = self.get_mac_address()
-        facts['hw_model'] = got[2]['stdout'].strip()
+        facts['serial_number'] = mac_address.replace(':', '') if mac_address is not None else None
+        facts['mac_address'] = mac_address
         facts['hw_part_number'] = None
         facts['hw_version'] = None
         facts['service_tag'] = None
@@ -4,26 +4,169 @@
 # LICENSE file at http://www.apstra.com/community/eula
 
 import socket
+import time
+from multiprocessing.pool import ThreadPool
 
 import paramiko
-import pexpect
-from pexpect import pxssh
 
 import aeon.nxos.device
 import aeon.eos.device
 import aeon.cumulus.device
 import aeon.ubuntu.device
 import aeon.centos.device
+import aeon.opx.device
 from aeon.exceptions import TargetError
+from aeon.utils.nos_cache import host_key_fingerprint
+from aeon.utils.fingerprint import probe_target
 
 
-def get_device(target=None, user='admin', passwd='admin', nos_only=False):
+# NOS types whose Device uses the shared SSH connector, and can therefore
+# re-use the session that was opened to detect the NOS.
+_SSH_NOS = ('cumulus', 'ubuntu', 'centos', 'opx')
+
+# NOS types whose Device uses an HTTP API, and can be identified by
+# fingerprinting the target without logging in.
+_API_NOS = ('nxos', 'eos')
+
+DEFAULT_MAX_WORKERS = 32
+DEFAULT_TARGET_TIMEOUT = 30
+
+DETECT_TIMEOUT = 10
+
+# Detection commands, and the (pattern, nos) pairs matched against their
+# output.  All of the commands are sent to the target at once, followed by
+# 'exit', on a single interactive shell channel; this works whether the login
+# shell is a NOS CLI or a Linux shell, as the commands that do not apply are
+# simply rejected.  The collected output is matched in one pass, with the
+# patterns taking priority in the order listed.
+#
+# The OPX marker is quoted so that the echo of the command itself, by the
+# shell channel's pty, does not match it.
+_NOS_PROBES = (
+    ('show version', (
+        ('Cisco', 'nxos'),
+        ('Arista', 'eos'))),
+    ('cat /proc/version', (
+        ('cumulus', 'cumulus'),
+        ('Ubuntu', 'ubuntu'),
+        ('Red Hat', 'centos'))),
+    ('[ -f /etc/opx/opx-environment.sh ] && echo "device is ""OPX"', (
+        ('device is OPX', 'opx'),))
+)
+
+
+def _candidate_probes(candidates=None):
+    """
+    :param candidates: NOS types the target may be running, or None for any
+    :return: the detection commands that can identify one of the candidates
+    """
+    for command, patterns in _NOS_PROBES:
+        if candidates is not None:
+            patterns = tuple((pattern, nos) for pattern, nos in patterns
+                             if nos in candidates)
+        if patterns:
+            yield command, patterns
+
+
+def _detection_script(probes):
+    return ''.join('%s\n' % command for command, _ in probes) + 'exit\n'
+
+
+def _match_nos(output, probes):
+    for _, patterns in probes:
+        for pattern, nos in patterns:
+            if pattern in output:
+                return nos
+    return None
+
+
+def _detect_nos(client, target, deadline=None, candidates=None):
+    """
+    Determine the NOS type of the target using an already authenticated
+    SSH client.  This costs a single round trip, and is bounded by a single
+    timeout of DETECT_TIMEOUT seconds, or less if the deadline is sooner.
+    :param client: paramiko.SSHClient connected to the target
+    :param target: IP address or hostname of target, used for error messages
+    :param deadline: time.time() value by which detection must be complete
+    :param candidates: NOS types the target may be running, or None for any
+    :return: NOS name, as used by the get_device dev_table
+    """
+    probes = list(_candidate_probes(candidates))
+
+    end = time.time() + DETECT_TIMEOUT
+    if deadline is not None:
+        end = min(end, deadline)
+        if end <= time.time():
+            raise TargetError('Timeout determining device type for %s' % target)
+
+    try:
+        chan = client.invoke_shell()
+        try:
+            chan.sendall(_detection_script(probes))
+
+            output = b''
+            while True:
+                nos = _match_nos(output.decode('utf-8', 'replace'), probes)
+                remaining = end - time.time()
+                if nos is not None or remaining <= 0:
+                    break
+
+                chan.settimeout(remaining)
+                try:
+                    data = chan.recv(32768)
+                except socket.timeout:
+                    break
+                if not data:
+                    break
+                output += data
+        finally:
+            chan.close()
+
+    except paramiko.SSHException as e:
+        raise TargetError("Error logging in to {target} : {error}".format(target=target, error=e))
+
+    if nos is None:
+        raise TargetError('Unable to determine device type for %s' % target)
+
+    return nos
+
+
+def _remaining(deadline, target):
+    """
+    :return: seconds left before the deadline, or None for no deadline
+    """
+    if deadline is None:
+        return None
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise TargetError('Timeout getting device %s' % target)
+    return remaining
+
+
+def get_device(target=None, user='admin', passwd='admin', nos_only=False, timeout=None, cache=None,
+               fingerprint=True, fields=None, facts_store=None):
     """
     Automatically determine device type based on device interrogation.
+
+    The target is first fingerprinted without logging in; when that identifies
+    an NX-OS or EOS device its API is used directly.  Otherwise the target is
+    logged into once; the NOS is determined over that SSH session, which is
+    then handed to the Device for the NOS types that use SSH as their
+    transport.  With nos_only the target is always logged into, so that the
+    credentials are checked as before; the fingerprint only narrows down
+    the detection commands sent.
     :param target: IP address or hostname of target
     :param user: Username to login to target
     :param passwd: Password to login to target
     :param nos_only: Only check for device nos and return as string, do not return device object
+    :param timeout: Overall time, in seconds, allowed to login and determine the device type;
+                    it bounds the SSH connect, banner and authentication, the NOS detection
+                    and the probe of the Device, but not the facts the Device gathers as it
+                    is made, which are bounded by the timeouts of its connector
+    :param cache: aeon.utils.nos_cache.NosCache used to skip detection of known targets
+    :param fingerprint: fingerprint the target before logging in, see aeon.utils.fingerprint
+    :param fields: facts to gather up front, defaults to all; the other facts are gathered on first read
+    :param facts_store: aeon.utils.facts_store.FactsStore the device keeps its static facts in
     :return: Device object
     """
     dev_table = {
@@ -31,14 +174,42 @@ def get_device(target=None, user='admin', passwd='admin', nos_only=False):
         'eos': aeon.eos.device.Device,
         'cumulus': aeon.cumulus.device.Device,
         'ubuntu': aeon.ubuntu.device.Device,
-        'centos': aeon.centos.device.Device
+        'centos': aeon.centos.device.Device,
+        'opx': aeon.opx.device.Device
     }
+
+    deadline = None if timeout is None else time.time() + timeout
+    dev_kwargs = {}
+    if fields is not None:
+        dev_kwargs['fields'] = fields
+    if facts_store is not None:
+        dev_kwargs['facts_store'] = facts_store
+
+    candidates, api_protos = None, {}
+    if fingerprint:
+        found = probe_target(target)
+        if found.nos in _API_NOS and not nos_only:
+            remaining = _remaining(deadline, target)
+            if remaining is not None:
+                dev_kwargs['timeout'] = remaining
+            return dev_table[found.nos](target, user=user, passwd=passwd,
+                                        proto=found.proto(found.nos), **dev_kwargs)
+
+        candidates, api_protos = found.candidates, found.api_protos
+
+    ssh = paramiko.SSHClient()
+    ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
+
+    # the banner and the authentication are bounded by what is left of the
+    # timeout, as well as the TCP connect.
+    remaining = _remaining(deadline, target)
+    login_timeouts = dict(timeout=5)
+    if remaining is not None:
+        login_timeouts = dict(timeout=min(5, remaining), banner_timeout=remaining,
+                              auth_timeout=remaining)
+
     try:
-        # Use paramiko to check if device is reachable because pxssh is bad at that.
-        ssh = paramiko.SSHClient()
-        ssh.set_missing_host_key_policy(paramiko.AutoAddPolicy())
-        ssh.connect(target, username=user, password=passwd, timeout=5)
-        ssh.close()
+        ssh.connect(target, username=user, password=passwd, **login_timeouts)
     except socket.error:
         raise TargetError('Device unreachable: %s' % target)
     except paramiko.AuthenticationException:
@@ -47,45 +218,86 @@ def get_device(target=None, user='admin', passwd='admin', nos_only=False):
         raise TargetError('Error logging in: %s' % target)
 
     try:
-        nos = ''
-        session = pxssh.pxssh(timeout=10, options={'StrictHostKeyChecking': "no",
-                                       'UserKnownHostsFile': "/dev/null"})
-        session.force_password = True
-        session.PROMPT = '\r\n.*#|\r\n.*$'
-        session.login(target, user, password=passwd, auto_prompt_reset=False, login_timeout=10)
-        session.sendline('show version')
-        i = session.expect(['Cisco', 'Arista', 'command not found', 'not installed', pexpect.TIMEOUT], timeout=10)
-        if i == 0:
-            nos = 'nxos'
-        if i == 1:
-            nos = 'eos'
-
-        if i == 2 or i == 3:
-            session.sendline('cat /proc/version')
-            i = session.expect(['cumulus', 'Ubuntu', 'Red Hat', pexpect.TIMEOUT], timeout=5)
-            if i == 0:
-                nos = 'cumulus'
-            if i == 1:
-                nos = 'ubuntu'
-            if i == 2:
-                nos = 'centos'
-            if i == 3:
-                session.sendline('[ -f /etc/opx/opx-environment.sh ] && echo "device is OPX" || echo "Not found"')
-                i = session.expect(['Not found', 'device is OPX', pexpect.TIMEOUT], timeout=5)
-                if i == 0 or i == 2:
-                    raise TargetError('Unable to determine device type for %s' % target)
-                if i == 1:
-                    nos = 'opx'
-        if i == 4:
-            raise TargetError('Unable to determine device type for %s' % target)
-
-    except pxssh.ExceptionPxssh as e:
-        raise TargetError("Error logging in to {target} : {error}".format(target=target, error=e))
+        nos = None
+        if cache is not None:
+            host_key = host_key_fingerprint(
+                ssh.get_transport().get_remote_server_key().asbytes())
+            nos = cache.get(target, host_key)
 
-    finally:
-        session.close()
+        if nos is None:
+            nos = _detect_nos(ssh, target, deadline=deadline, candidates=candidates)
+            if cache is not None:
+                cache.set(target, host_key, nos)
+
+    except Exception:
+        ssh.close()
+        raise
+
+    if nos_only or nos not in _SSH_NOS:
+        ssh.close()
 
     if nos_only:
         return nos
-    else:
-        return dev_table[nos](target, user=user, passwd=passwd)
+
+    kwargs = dict(dev_kwargs)
+    if nos in _SSH_NOS:
+        kwargs['client'] = ssh
+    if nos in api_protos:
+        kwargs['proto'] = api_protos[nos]
+
+    try:
+        remaining = _remaining(deadline, target)
+        if remaining is not None:
+            kwargs['timeout'] = remaining
+        return dev_table[nos](target, user=user, passwd=passwd, **kwargs)
+    except Exception:
+        if nos in _SSH_NOS:
+            ssh.close()
+        if cache is not None:
+            # the cached NOS may be stale
+            cache.invalidate(target)
+        raise
+
+
+def get_devices(targets, user='admin', passwd='admin', nos_only=False,
+                max_workers=DEFAULT_MAX_WORKERS, timeout=DEFAULT_TARGET_TIMEOUT, cache=None,
+                fingerprint=True, fields=None, facts_store=None):
+    """
+    Run get_device for many targets in a bounded pool of worker threads.
+
+    Results are yielded as each target completes, so a slow or unreachable
+    target does not hold up the others.  Any failure is reported as a
+    TargetError for that target; the originating exception, if any, is
+    available as the TargetError 'exc' attribute.
+    :param targets: iterable of IP addresses or hostnames
+    :param user: Username to login to the targets
+    :param passwd: Password to login to the targets
+    :param nos_only: Only check for device nos, as for get_device
+    :param max_workers: maximum number of targets being discovered at once
+    :param timeout: per-target time, in seconds, allowed to login and determine the device type,
+                    as for get_device
+    :param cache: aeon.utils.nos_cache.NosCache, as for get_device
+    :param fingerprint: fingerprint the targets before logging in, as for get_device
+    :param fields: facts to gather up front, as for get_device
+    :param facts_store: aeon.utils.facts_store.FactsStore, as for get_device
+    :return: generator of (target, Device | nos | TargetError) tuples
+    """
+    def discover(target):
+        try:
+            return target, get_device(target, user=user, passwd=passwd,
+                                      nos_only=nos_only, timeout=timeout, cache=cache,
+                                      fingerprint=fingerprint, fields=fields,
+                                      facts_store=facts_store)
+        except TargetError as exc:
+            return target, exc
+        except Exception as exc:
+            error = TargetError('Unable to get device %s: %s' % (target, exc))
+            error.exc = exc
+            return target, error
+
+    pool = ThreadPool(processes=max_workers)
+    try:
+        for result in pool.imap_unordered(discover, targets):
+            yield result
+    finally:
+        pool.terminate()
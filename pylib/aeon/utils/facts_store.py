@@ -0,0 +1,102 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import os
+import json
+import time
+import sqlite3
+from contextlib import closing
+
+
+__all__ = ['FactsStore']
+
+
+class FactsStore(object):
+    """
+    On-disk store of the static device facts (serial number, hardware model,
+    MAC address, ...), so that they need not be fetched from the device every
+    time it is created; see the 'facts_store' Device option.
+
+    Entries are keyed by target, and record when they were collected and the
+    boot time and OS version of the device at the time.  An entry is only
+    served while the device reports the same boot time and OS version, i.e.
+    until the device is rebooted or upgraded.  The store is an SQLite
+    database, so it can be shared between threads and processes.
+    """
+    DEFAULT_PATH = os.path.join('~', '.aeon', 'facts.db')
+
+    # a boot time derived from the current time and the uptime may be
+    # reported a little differently from one read to the next.
+    BOOT_TIME_SLACK = 5
+
+    def __init__(self, path=None):
+        """
+        :param path: database file, defaults to ~/.aeon/facts.db
+        """
+        self.path = os.path.expanduser(path or self.DEFAULT_PATH)
+
+        dirname = os.path.dirname(self.path)
+        if dirname and not os.path.isdir(dirname):
+            os.makedirs(dirname)
+
+        with closing(self._connect()) as db, db:
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS facts ('
+                ' target TEXT PRIMARY KEY,'
+                ' collected REAL NOT NULL,'
+                ' boot_time TEXT,'
+                ' os_version TEXT,'
+                ' facts TEXT NOT NULL)')
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get(self, target, boot_time, os_version=None):
+        """
+        :param target: IP address or hostname of target
+        :param boot_time: boot time the device reports now
+        :param os_version: OS version the device reports now, if known
+        :return: dict of the stored facts, or None if there is no valid entry
+        """
+        with closing(self._connect()) as db:
+            row = db.execute(
+                'SELECT boot_time, os_version, facts FROM facts WHERE target = ?',
+                (target,)).fetchone()
+
+        if row is None:
+            return None
+
+        stored_boot_time, stored_os_version, facts = row
+        if not self._same_boot(stored_boot_time, boot_time) or (
+                os_version is not None and stored_os_version != str(os_version)):
+            # rebooted or upgraded since; the hardware may have changed too
+            self.invalidate(target)
+            return None
+
+        return json.loads(facts)
+
+    def _same_boot(self, stored, current):
+        try:
+            return abs(float(stored) - float(current)) <= self.BOOT_TIME_SLACK
+        except (TypeError, ValueError):
+            return stored == str(current)
+
+    def set(self, target, boot_time, os_version, facts):
+        """
+        :param target: IP address or hostname of target
+        :param boot_time: boot time of the device
+        :param os_version: OS version of the device, or None
+        :param facts: dict of the static facts to store
+        """
+        with closing(self._connect()) as db, db:
+            db.execute(
+                'INSERT OR REPLACE INTO facts VALUES (?, ?, ?, ?, ?)',
+                (target, time.time(), str(boot_time),
+                 None if os_version is None else str(os_version),
+                 json.dumps(facts)))
+
+    def invalidate(self, target):
+        with closing(self._connect()) as db, db:
+            db.execute('DELETE FROM facts WHERE target = ?', (target,))
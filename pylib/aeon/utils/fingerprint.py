@@ -0,0 +1,156 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import ssl
+import socket
+from multiprocessing.pool import ThreadPool
+
+try:
+    import httplib
+except ImportError:
+    import http.client as httplib
+
+
+__all__ = ['Fingerprint', 'probe_target']
+
+
+DEFAULT_TIMEOUT = 0.5
+
+# HTTP API endpoints that identify a NOS when they answer.
+_API_PATHS = (
+    ('nxos', '/ins'),
+    ('eos', '/command-api')
+)
+
+# the protocols the APIs are probed on, in order of preference.
+_API_PROTOS = ('http', 'https')
+
+# HTTP status codes of an API endpoint that exists; without credentials
+# both NX-API and eAPI answer 401.
+_API_PRESENT = (200, 401)
+
+# SSH server version banner comments that narrow down the NOS.
+_SSH_BANNERS = (
+    ('Cisco', ('nxos',)),
+    ('Ubuntu', ('ubuntu',)),
+    ('Debian', ('cumulus', 'opx'))
+)
+
+
+class Fingerprint(object):
+    """
+    Result of probing a target before logging into it.  'candidates' is the
+    set of NOS types the target may be running; when it holds a single NOS
+    that NOS is available as 'nos'.
+    """
+    NOS_TYPES = ('nxos', 'eos', 'cumulus', 'ubuntu', 'centos', 'opx')
+    SSH_NOS_TYPES = ('cumulus', 'ubuntu', 'centos', 'opx')
+
+    def __init__(self, target):
+        self.target = target
+        self.ssh_banner = None
+        self.api_protos = {}
+        self.candidates = set(self.NOS_TYPES)
+
+    @property
+    def nos(self):
+        if len(self.candidates) == 1:
+            return next(iter(self.candidates))
+        return None
+
+    def proto(self, nos):
+        """
+        :param nos: nxos or eos
+        :return: the working API protocol, http preferred as it is the default
+                 of the connectors, or None if not known
+        """
+        return self.api_protos.get(nos)
+
+    def classify(self):
+        candidates = set(self.NOS_TYPES)
+
+        # an API answering on one of the NOS specific paths, but not both,
+        # identifies the NOS.
+        if len(self.api_protos) == 1:
+            candidates &= set(self.api_protos)
+
+        # no banner proves nothing: the probe may merely have timed out on a
+        # slow host, which is still logged in to over SSH.
+        if self.ssh_banner is not None:
+            for pattern, nos_types in _SSH_BANNERS:
+                if pattern in self.ssh_banner:
+                    candidates &= set(nos_types)
+                    break
+
+        # conflicting evidence tells us nothing
+        self.candidates = candidates or set(self.NOS_TYPES)
+
+    def __repr__(self):
+        return 'Fingerprint(%r, candidates=%r)' % (self.target, sorted(self.candidates))
+
+
+def _probe_ssh_banner(target, timeout):
+    try:
+        sock = socket.create_connection((target, socket.getservbyname('ssh')), timeout)
+        try:
+            banner = sock.recv(256)
+        finally:
+            sock.close()
+    except socket.error:
+        return None
+
+    lines = banner.decode('ascii', 'replace').splitlines()
+    if lines and lines[0].startswith('SSH-'):
+        return lines[0]
+    return None
+
+
+def _probe_api(target, proto, path, timeout):
+    if 'https' == proto:
+        # only checking whether the API answers, not who is answering
+        conn = httplib.HTTPSConnection(target, timeout=timeout,
+                                       context=ssl._create_unverified_context())
+    else:
+        conn = httplib.HTTPConnection(target, timeout=timeout)
+
+    try:
+        conn.request('POST', path, body='')
+        return conn.getresponse().status
+    except (socket.error, httplib.HTTPException):
+        return None
+    finally:
+        conn.close()
+
+
+def probe_target(target, timeout=DEFAULT_TIMEOUT):
+    """
+    Fingerprints the target by concurrently reading its SSH server banner
+    and checking whether NX-API (/ins) or eAPI (/command-api) answer, over
+    http and https.  Nothing here logs in to the target.
+    :param target: IP address or hostname of target
+    :param timeout: time, in seconds, allowed for each probe
+    :return: Fingerprint
+    """
+    fingerprint = Fingerprint(target)
+
+    api_probes = [(nos, proto, path)
+                  for nos, path in _API_PATHS
+                  for proto in _API_PROTOS]
+
+    pool = ThreadPool(processes=len(api_probes) + 1)
+    try:
+        banner = pool.apply_async(_probe_ssh_banner, (target, timeout))
+        statuses = [pool.apply_async(_probe_api, (target, proto, path, timeout))
+                    for nos, proto, path in api_probes]
+
+        fingerprint.ssh_banner = banner.get()
+        for (nos, proto, path), status in zip(api_probes, statuses):
+            if status.get() in _API_PRESENT and nos not in fingerprint.api_protos:
+                fingerprint.api_protos[nos] = proto
+    finally:
+        pool.terminate()
+
+    fingerprint.classify()
+    return fingerprint
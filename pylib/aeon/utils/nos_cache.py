@@ -0,0 +1,141 @@
+# Copyright 2014-present, Apstra, Inc. All rights reserved.
+#
+# This source code is licensed under End User License Agreement found in the
+# LICENSE file at http://www.apstra.com/community/eula
+
+import os
+import json
+import time
+import base64
+import hashlib
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # not on Windows
+    fcntl = None
+
+
+__all__ = ['NosCache', 'host_key_fingerprint']
+
+
+def host_key_fingerprint(key_blob):
+    """
+    Returns the OpenSSH style SHA256 fingerprint of an SSH host public key.
+    :param key_blob: the public key, in SSH wire format
+    :return: fingerprint string, e.g. "SHA256:nThbg6kXUpJWGl7E1IGOCspRomTxdCARLviKw6E5SY8"
+    """
+    digest = hashlib.sha256(key_blob).digest()
+    return 'SHA256:' + base64.b64encode(digest).decode('ascii').rstrip('=')
+
+
+class NosCache(object):
+    """
+    On-disk cache of the NOS type determined by aeon.utils.get_device.
+
+    Entries are keyed by target, and are only valid for the SSH host key
+    fingerprint they were recorded with, and for 'ttl' seconds.  The cache
+    file is JSON, and can be shared between processes: it is read again
+    whenever another process has replaced it, and an update is made to the
+    file as it is then, under a lock (on POSIX), and replaces it atomically.
+    """
+    DEFAULT_PATH = os.path.join('~', '.aeon', 'nos_cache.json')
+    DEFAULT_TTL = 7 * 24 * 60 * 60
+
+    def __init__(self, path=None, ttl=DEFAULT_TTL):
+        """
+        :param path: cache file, defaults to ~/.aeon/nos_cache.json
+        :param ttl: time, in seconds, an entry is valid for
+        """
+        self.path = os.path.expanduser(path or self.DEFAULT_PATH)
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = None
+        self._version = None
+
+    def _file_version(self):
+        # the file is replaced on every update, so a new inode (or mtime)
+        # tells that it has been updated
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_ino, stat.st_mtime, stat.st_size
+
+    def _load(self, fresh=False):
+        version = self._file_version()
+        if fresh or self._entries is None or version != self._version:
+            try:
+                with open(self.path) as cache_file:
+                    self._entries = json.load(cache_file)
+            except (IOError, OSError, ValueError):
+                self._entries = {}
+            self._version = version
+
+        return self._entries
+
+    def _save(self):
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(self.path), prefix='.nos_cache')
+        with os.fdopen(fd, 'w') as cache_file:
+            json.dump(self._entries, cache_file)
+
+        os.rename(tmp_path, self.path)
+        self._version = self._file_version()
+
+    def _update(self, change):
+        """
+        Changes the entries as they are in the file, with the cache locked
+        against the other threads and processes meanwhile.
+        :param change: callable given the dict of entries, that changes it
+                       and returns whether it did
+        """
+        with self._lock:
+            dirname = os.path.dirname(self.path)
+            if not os.path.isdir(dirname):
+                os.makedirs(dirname)
+
+            with open(self.path + '.lock', 'a') as lock_file:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX)
+                if change(self._load(fresh=True)):
+                    self._save()
+
+    def get(self, target, fingerprint):
+        """
+        :param target: IP address or hostname of target
+        :param fingerprint: SSH host key fingerprint of target
+        :return: the cached NOS name, or None if there is no valid entry
+        """
+        with self._lock:
+            entry = self._load().get(target)
+
+        if entry is None:
+            return None
+
+        if entry['fingerprint'] != fingerprint:
+            # the host key changed, this may be a different device now;
+            # unless it has been recorded anew since, the entry is dropped.
+            def change(entries):
+                stale = entries.get(target, {}).get('fingerprint') not in (None, fingerprint)
+                if stale:
+                    del entries[target]
+                return stale
+
+            self._update(change)
+            return None
+
+        if time.time() - entry['time'] > self.ttl:
+            return None
+
+        return entry['nos']
+
+    def set(self, target, fingerprint, nos):
+        def change(entries):
+            entries[target] = dict(fingerprint=fingerprint, nos=nos, time=time.time())
+            return True
+
+        self._update(change)
+
+    def invalidate(self, target):
+        self._update(lambda entries: entries.pop(target, None) is not None)
@@ -5,6 +5,7 @@
 #  found in the LICENSE.txt file in the root directory of this source tree.
 #
 
+import sys
 from setuptools import setup, find_packages
 from glob import glob
 from os import path
@@ -18,7 +19,9 @@ def requirements(filename):
 
 libdir = 'pylib'
 aeondir = 'pylib/aeon'
-packages = find_packages(libdir)
+# the asyncio package is only usable, and only byte-compiles, on Python 3.5+
+packages = find_packages(libdir, exclude=(
+    ['aeon.aio'] if sys.version_info < (3, 5) else []))
 
 setup(
     name="aeon-venos",
@@ -32,11 +35,13 @@ setup(
     package_dir={'': libdir},
     packages=packages,
     extras_require={
-        "eos": ["pyeapi", "pexpect==4.2.1"],
-        "nxos": ["lxml", "requests", "pexpect==4.2.1"],
-        "cumulus": ["paramiko>2.0.0", "pexpect==4.2.1"],
-        "ubuntu": ["paramiko>2.0.0", "pexpect==4.2.1"],
-        "centos": ["paramiko>2.0.0", "pexpect==4.2.1"]
+        "eos": ["pyeapi", "requests", "paramiko>2.0.0"],
+        "nxos": ["lxml", "requests", "paramiko>2.0.0"],
+        "cumulus": ["paramiko>2.0.0"],
+        "ubuntu": ["paramiko>2.0.0"],
+        "centos": ["paramiko>2.0.0"],
+        "aio": ["asyncssh", "aiohttp>=3.3"],
+        "fastjson": ["orjson; python_version >= '3.8'", "ujson; python_version < '3.8'"]
     },
     scripts=glob('bin/*'),
     classifiers=[
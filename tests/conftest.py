@@ -0,0 +1,11 @@
+import pytest
+
+from aeon.cumulus.pool import default_pool
+
+
+@pytest.fixture(autouse=True)
+def clear_ssh_pool():
+    # SSH sessions must not be carried from one test to the next
+    default_pool.clear()
+    yield
+    default_pool.clear()
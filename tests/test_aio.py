@@ -0,0 +1,335 @@
+import socket
+import subprocess
+
+import pytest
+
+aio = pytest.importorskip('aeon.aio')
+
+import asyncio  # NOQA
+from mock import AsyncMock, MagicMock, patch  # NOQA
+from aeon.aio import connector  # NOQA
+from aeon.aio import utils as aio_utils  # NOQA
+from aeon.aio.device import Device  # NOQA
+from aeon.exceptions import ProbeError, TargetError  # NOQA
+import aeon.eos.device  # NOQA
+import aeon.cumulus.device  # NOQA
+import aeon.nxos.device  # NOQA
+from aeon.nxos import exceptions as NxosExc  # NOQA
+
+from aeon.utils.fingerprint import Fingerprint  # NOQA
+from tests.test_eos import g_facts as eos_facts, show_ver_return, show_hostname_return  # NOQA
+from tests.test_cumulus import g_facts as cumulus_facts, decode_syseeprom  # NOQA
+from tests.test_nxos import nxapi, nxapi_tls, show_commands  # NOQA
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def mock_connector(**methods):
+    api = MagicMock(proto='http')
+    api.open = AsyncMock()
+    api.close = AsyncMock()
+    for name, side_effect in methods.items():
+        setattr(api, name, AsyncMock(side_effect=side_effect))
+    return MagicMock(return_value=api)
+
+
+@pytest.fixture(autouse=True)
+def mock_probe_target():
+    # by default fingerprinting narrows nothing down
+    with patch('aeon.aio.utils.probe_target', new_callable=AsyncMock) as mock_probe:
+        mock_probe.return_value = Fingerprint('1.1.1.1')
+        yield mock_probe
+
+
+def eos_execute(command):
+    if command == 'show version':
+        return show_ver_return
+    elif command == 'show hostname':
+        return show_hostname_return
+
+
+def test_aio_device_facts():
+    con = mock_connector(execute=eos_execute)
+    dev = run(Device.create('1.1.1.1', aeon.eos.device.Device, con,
+                            user='test_user', passwd='test_passwd', no_probe=True))
+    assert dev.OS_NAME == 'eos'
+    assert dev.facts == eos_facts
+    con.return_value.open.assert_awaited_once_with()
+    run(dev.close())
+    con.return_value.close.assert_awaited_once_with()
+
+
+def test_aio_device_facts_exception():
+    def execute(command):
+        if command == 'show hostname':
+            raise Exception('not supported')
+        return eos_execute(command)
+
+    con = mock_connector(execute=execute)
+    dev = run(Device.create('1.1.1.1', aeon.eos.device.Device, con, no_probe=True))
+    assert dev.facts['hostname'] == 'localhost'
+    assert dev.facts['os_version'] == eos_facts['os_version']
+
+
+def test_aio_device_facts_fields():
+    con = mock_connector(execute=eos_execute)
+    dev = run(Device.create('1.1.1.1', aeon.eos.device.Device, con, no_probe=True,
+                            fields=['hostname']))
+    con.return_value.execute.assert_awaited_once_with('show hostname')
+    assert dev.facts['hostname'] == eos_facts['hostname']
+    assert 'os_version' not in dev.facts
+    run(dev.gather_facts(fields=['os_version']))
+    assert dev.facts['os_version'] == eos_facts['os_version']
+
+
+def test_aio_device_facts_batch():
+    outputs = {
+        'hostname': cumulus_facts['hostname'],
+        'cat /etc/lsb-release | grep RELEASE | cut -d= -f2': cumulus_facts['os_version'],
+        "awk '/^btime/ {print $2}' /proc/stat": cumulus_facts['boot_time'],
+        'sudo decode-syseeprom': decode_syseeprom}
+
+    con = mock_connector(execute=lambda commands, **kwargs: (
+        True, [dict(stdout=outputs.get(cmd, ''), exit_code=0) for cmd in commands]))
+    dev = run(Device.create('1.1.1.1', aeon.cumulus.device.Device, con, no_probe=True))
+    assert dev.facts == cumulus_facts
+    assert con.return_value.execute.await_count == 1
+    assert con.return_value.execute.call_args[1] == dict(stop_on_error=False, batch=True)
+
+
+def test_aio_device_probe():
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(asyncio.start_server(lambda r, w: w.close(), '127.0.0.1', 0))
+    port = server.sockets[0].getsockname()[1]
+    dev = Device('127.0.0.1', aeon.eos.device.Device, mock_connector(), port=port)
+    try:
+        good, elapsed = loop.run_until_complete(dev.probe())
+    finally:
+        server.close()
+        loop.close()
+
+    assert good is True
+
+
+def test_aio_device_probeerror():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    port = sock.getsockname()[1]
+    sock.close()
+
+    dev = Device('127.0.0.1', aeon.eos.device.Device, mock_connector(), port=port, timeout=0.1)
+    with pytest.raises(ProbeError):
+        run(dev.probe())
+
+
+def completed(stdout='', stderr='', exit_status=0):
+    return MagicMock(stdout=stdout, stderr=stderr, exit_status=exit_status)
+
+
+@patch('aeon.aio.connector.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_ssh_connector_execute(mock_connect):
+    mock_connect.return_value.run = AsyncMock(side_effect=[
+        completed('one'), completed('two', 'error', 1), completed('three')])
+
+    con = connector.SshConnector('1.1.1.1', user='test_user', passwd='test_passwd')
+    run(con.open())
+    mock_connect.assert_awaited_once_with('1.1.1.1', port=22, username='test_user',
+                                          password='test_passwd', known_hosts=None)
+    good, results = run(con.execute(['test1', 'test2', 'test3']))
+    assert good is False
+    assert results == [
+        {'cmd': 'test1', 'exit_code': 0, 'stdout': 'one', 'stderr': ''},
+        {'cmd': 'test2', 'exit_code': 1, 'stdout': 'two', 'stderr': 'error'}]
+
+
+@patch('aeon.aio.connector.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_ssh_connector_execute_batch(mock_connect):
+    def local_run(script):
+        proc = subprocess.run(['/bin/sh', '-c', script], stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                              universal_newlines=True)
+        return completed(proc.stdout, proc.stderr, proc.returncode)
+
+    mock_connect.return_value.run = AsyncMock(side_effect=local_run)
+    con = connector.SshConnector('1.1.1.1', user='test_user', passwd='test_passwd')
+    run(con.open())
+    good, results = run(con.execute(['echo one', 'echo error >&2; false', 'echo three'], batch=True))
+    mock_connect.return_value.run.assert_awaited_once()
+    assert good is False
+    assert results == [
+        {'cmd': 'echo one', 'exit_code': 0, 'stdout': 'one\n', 'stderr': ''},
+        {'cmd': 'echo error >&2; false', 'exit_code': 1, 'stdout': '', 'stderr': 'error\n'}]
+
+
+@patch('aeon.aio.connector.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_ssh_connector_execute_concurrent(mock_connect):
+    open_channels = [0, 0]
+
+    def done(future, cmd):
+        open_channels[0] -= 1
+        future.set_result(completed('out ' + cmd))
+
+    def conn_run(cmd):
+        open_channels[0] += 1
+        open_channels[1] = max(open_channels)
+        loop = asyncio.get_event_loop()
+        future = loop.create_future()
+        loop.call_later(0.01 * (4 - int(cmd[-1])), done, future, cmd)
+        return future
+
+    mock_connect.return_value.run = MagicMock(side_effect=conn_run)
+    con = connector.SshConnector('1.1.1.1', user='test_user', passwd='test_passwd')
+    run(con.open())
+    commands = ['cmd 0', 'cmd 1', 'cmd 2', 'cmd 3']
+    good, results = run(con.execute_concurrent(commands, max_channels=3))
+    assert good is True
+    assert [r['stdout'] for r in results] == ['out ' + cmd for cmd in commands]
+    assert open_channels[1] == 3
+
+
+def mock_shell_conn(output):
+    process = MagicMock()
+    process.stdout.read = AsyncMock(side_effect=[output, b''])
+    return MagicMock(create_process=AsyncMock(return_value=process))
+
+
+@patch('aeon.aio.utils.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_get_device_nos_only(mock_connect):
+    mock_connect.return_value = mock_shell_conn(
+        b'$ show version\r\nbash: show: command not found\r\n$ cat /proc/version\r\n'
+        b'Linux version 4.1.0-cl-1-amd64 (dev-support@cumulusnetworks.com)\r\n')
+    nos = run(aio.get_device('1.1.1.1', user='test_user', passwd='test_passwd', nos_only=True))
+    assert nos == 'cumulus'
+    process = mock_connect.return_value.create_process.return_value
+    process.stdin.write.assert_called_once_with(
+        b'show version\n'
+        b'cat /proc/version\n'
+        b'[ -f /etc/opx/opx-environment.sh ] && echo "device is ""OPX"\n'
+        b'exit\n')
+    mock_connect.return_value.close.assert_called_once_with()
+
+
+@patch('aeon.aio.utils.Device.create', new_callable=AsyncMock)
+@patch('aeon.aio.utils.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_get_device_session_handoff(mock_connect, mock_create):
+    mock_connect.return_value = mock_shell_conn(
+        b'bash: show: command not found\nLinux version 4.1.0-cl-1-amd64 (cumulus)')
+    run(aio.get_device('1.1.1.1', user='test_user', passwd='test_passwd'))
+    mock_create.assert_awaited_once_with('1.1.1.1', aeon.cumulus.device.Device, connector.SshConnector,
+                                         user='test_user', passwd='test_passwd',
+                                         client=mock_connect.return_value)
+    assert not mock_connect.return_value.close.called
+
+
+@patch('aeon.aio.utils.Device.create', new_callable=MagicMock)
+@patch('aeon.aio.utils.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_get_device_timeout(mock_connect, mock_create):
+    mock_connect.return_value = mock_shell_conn(
+        b'bash: show: command not found\nLinux version 4.1.0-cl-1-amd64 (cumulus)')
+    # a device that takes forever to gather its facts
+    mock_create.side_effect = lambda *args, **kwargs: asyncio.sleep(10)
+    with pytest.raises(TargetError) as exc:
+        run(aio.get_device('1.1.1.1', timeout=0.5))
+    assert str(exc.value) == 'Timeout getting device 1.1.1.1'
+    mock_connect.return_value.close.assert_called_once_with()
+
+
+@patch('aeon.aio.utils.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_get_device_unreachable(mock_connect):
+    mock_connect.side_effect = OSError
+    with pytest.raises(TargetError):
+        run(aio.get_device('1.1.1.1'))
+
+
+@patch('aeon.aio.utils.asyncssh.connect', new_callable=AsyncMock)
+def test_aio_get_device_fingerprint(mock_connect, mock_probe_target):
+    found = Fingerprint('1.1.1.1')
+    found.api_protos['nxos'] = 'https'
+    found.classify()
+    mock_probe_target.return_value = found
+    mock_connect.return_value = mock_shell_conn(b'switch# show version\r\nCisco Nexus Operating System (NX-OS)\r\n')
+    # nos_only still logs in, so that the credentials are checked
+    assert run(aio.get_device('1.1.1.1', nos_only=True)) == 'nxos'
+    assert mock_connect.called
+    process = mock_connect.return_value.create_process.return_value
+    process.stdin.write.assert_called_once_with(b'show version\nexit\n')
+
+
+def test_aio_probe_target():
+    loop = asyncio.new_event_loop()
+
+    def answer(reader, writer):
+        writer.write(b'HTTP/1.0 401 Unauthorized\r\n\r\n')
+        writer.close()
+
+    server = loop.run_until_complete(asyncio.start_server(answer, '127.0.0.1', 0))
+    port = server.sockets[0].getsockname()[1]
+    try:
+        with patch('aeon.aio.utils.socket.getservbyname', return_value=port):
+            assert loop.run_until_complete(aio_utils._probe_api('127.0.0.1', 'http', '/ins', 1)) == 401
+    finally:
+        server.close()
+        loop.close()
+
+
+def test_aio_nxos_connector(nxapi):
+    loop = asyncio.new_event_loop()
+    con = connector.NxosConnector('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin')
+    loop.run_until_complete(con.open())
+    try:
+        # the responses are parsed from their bytes
+        assert loop.run_until_complete(con.exec_opcmd('show hostname', resp_fmt='json')) == \
+            show_commands['show hostname']
+        assert loop.run_until_complete(con.exec_config('hostname nxos')) is True
+    finally:
+        loop.run_until_complete(con.close())
+        loop.close()
+
+    # one login, then the nxapi_auth cookie of the device
+    assert nxapi.logins == 1
+    assert [r['cookie'] for r in nxapi.requests] == [None, 'nxapi_auth=admin:1']
+
+
+def test_aio_nxos_connector_verify(nxapi_tls):
+    loop = asyncio.new_event_loop()
+    try:
+        # the self-signed certificate of the device is refused by default
+        for verify in (True, False):
+            con = connector.NxosConnector('127.0.0.1', port=nxapi_tls.server_port, proto='https',
+                                          user='admin', passwd='admin', verify=verify)
+            loop.run_until_complete(con.open())
+            try:
+                if verify:
+                    with pytest.raises(NxosExc.RequestError):
+                        loop.run_until_complete(con.exec_opcmd('show hostname', resp_fmt='json'))
+                else:
+                    assert loop.run_until_complete(con.exec_opcmd('show hostname', resp_fmt='json')) == \
+                        show_commands['show hostname']
+            finally:
+                loop.run_until_complete(con.close())
+    finally:
+        loop.close()
+
+
+def test_aio_nxos_device_facts(nxapi):
+    loop = asyncio.new_event_loop()
+    try:
+        dev = loop.run_until_complete(Device.create(
+            '127.0.0.1', aeon.nxos.device.Device, connector.NxosConnector,
+            port=nxapi.server_port, user='admin', passwd='admin', no_probe=True))
+        loop.run_until_complete(dev.close())
+    finally:
+        loop.close()
+
+    # the show commands of the facts routines share one request
+    assert [r['commands'] for r in nxapi.requests] == [
+        ['show hostname', 'show hardware', 'show interface mgmt0', 'show system uptime']]
+    assert dev.facts['fqdn'] == 'nxos.example.com'
+    assert dev.facts['serial_number'] == 'TM6012EC74B'
+    assert dev.facts['mac_address'] == '00:0c:29:36:1c:15'
+    assert dev.facts['boot_time'] == 'Mon Oct 16 10:04:13 2017'
@@ -1,13 +1,23 @@
+import errno
+import itertools
+import pickle
+import socket
+import threading
+import time
+
 from mock import patch, Mock
 import pytest
 
-from aeon.exceptions import ProbeError
-from aeon.base.device import BaseDevice
+from aeon.exceptions import CommandError, ProbeError
+from aeon.base.device import BaseDevice, api_call, batch_routines
+from aeon.base.facts import LazyFacts, Facts
+from aeon.base import decode
+from aeon.base.probe import probe_many
 
 
-@patch('pylib.aeon.base.device.socket.socket')
-def test_base_device_probeerror(mock_socket):
-    mock_socket.return_value.connect.side_effect = Exception()
+@patch('aeon.base.device.probe_many')
+def test_base_device_probeerror(mock_probe_many):
+    mock_probe_many.return_value = iter([('1.1.1.1', None)])
     target = '1.1.1.1'
     user = 'test_user'
     passwd = 'test_passwd'
@@ -17,11 +27,249 @@ def test_base_device_probeerror(mock_socket):
         BaseDevice(target, connector=mock_con, user=user, passwd=passwd)
 
 
-@patch('pylib.aeon.base.device.socket.socket')
-def test_base_device(mock_socket):
+@patch('aeon.base.device.probe_many')
+def test_base_device(mock_probe_many):
+    mock_probe_many.return_value = iter([('1.1.1.1', 0.5)])
     target = '1.1.1.1'
     user = 'test_user'
     passwd = 'test_passwd'
     mock_con = Mock(proto='ssh')
     mock_con.return_value.proto = 'ssh'
     bd = BaseDevice(target, connector=mock_con, user=user, passwd=passwd)
+    mock_probe_many.assert_called_once_with([target], 22, bd.timeout)
+
+
+def free_port():
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.bind(('127.0.0.1', 0))
+    port = s.getsockname()[1]
+    s.close()
+    return port
+
+
+def listen(port):
+    s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    s.bind(('127.0.0.1', port))
+    s.listen(8)
+    return s
+
+
+def test_probe_many():
+    port = free_port()
+    server = listen(port)
+    try:
+        results = dict(probe_many(['127.0.0.1', 'localhost'], port, 2))
+    finally:
+        server.close()
+    assert set(results) == set(['127.0.0.1', 'localhost'])
+    assert all(elapsed is not None and elapsed < 2 for elapsed in results.values())
+
+
+def test_probe_many_unreachable():
+    results = list(probe_many(['127.0.0.1'], free_port(), 0.5, interval=0.1))
+    assert results == [('127.0.0.1', None)]
+
+
+def test_probe_many_retry():
+    port = free_port()
+    servers = []
+    timer = threading.Timer(0.3, lambda: servers.append(listen(port)))
+    timer.start()
+    try:
+        results = list(probe_many(['127.0.0.1'], port, 3, interval=0.1))
+    finally:
+        timer.join()
+        for server in servers:
+            server.close()
+    (target, elapsed), = results
+    assert target == '127.0.0.1'
+    assert 0.3 <= elapsed < 1
+
+
+@patch('aeon.base.probe._Poller')
+@patch('aeon.base.probe.socket.socket')
+def test_probe_many_retry_after_timeout(mock_socket, mock_poller):
+    # a target that never answers: each attempt is abandoned after
+    # connect_timeout, then retried only after interval
+    mock_socket.return_value.connect_ex.return_value = errno.EINPROGRESS
+    mock_socket.return_value.fileno.side_effect = itertools.count()
+    mock_poller.return_value.poll.side_effect = lambda timeout: time.sleep(max(timeout, 0)) or []
+    results = list(probe_many(['127.0.0.1'], 22, 1, interval=0.2, connect_timeout=0.1))
+    assert results == [('127.0.0.1', None)]
+    assert 3 <= mock_socket.return_value.connect_ex.call_count <= 4
+
+
+def test_probe_many_keep_open():
+    port = free_port()
+    server = listen(port)
+    try:
+        (target, elapsed, sock), = probe_many(['127.0.0.1'], port, 2, keep_open=True)
+        try:
+            conn, _ = server.accept()
+            conn.sendall(b'SSH-2.0-test\r\n')
+            assert sock.recv(64) == b'SSH-2.0-test\r\n'
+            conn.close()
+        finally:
+            sock.close()
+    finally:
+        server.close()
+    assert target == '127.0.0.1'
+    assert elapsed is not None
+
+
+def test_lazy_facts():
+    loads = []
+
+    def loader(fields):
+        loads.append(fields)
+        for group in facts.pending(fields):
+            if group == 'one':
+                facts['a'], facts['b'] = 1, 2
+            else:
+                facts['c'] = 3
+            facts.loaded(group)
+
+    facts = LazyFacts((('one', ('a', 'b')), ('two', ('c',))), loader=loader)
+    assert facts.pending(['b']) == ['one']
+    assert facts['b'] == 2
+    assert facts['a'] == 1
+    assert loads == [['b']]
+    with pytest.raises(KeyError):
+        facts['z']
+    assert facts == dict(a=1, b=2, c=3)
+    assert loads == [['b'], None]
+    assert facts.pending() == []
+
+
+def test_lazy_facts_no_loader():
+    facts = LazyFacts((('one', ('a',)),))
+    with pytest.raises(KeyError):
+        facts['a']
+    assert dict(facts) == {}
+
+
+def test_facts_record():
+    facts = Facts.from_mapping(dict(os_name='eos', os_version='4.18.4F', virtual=False, uptime=10))
+    assert facts.os_version == '4.18.4F'
+    assert facts.to_dict() == dict(os_name='eos', os_version='4.18.4F', virtual=False)
+    with pytest.raises(AttributeError):
+        facts.serial_number
+    with pytest.raises(AttributeError):
+        facts.uptime = 10
+    for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+        assert pickle.loads(pickle.dumps(facts, protocol)) == facts
+
+
+@pytest.mark.parametrize('nos', ['cumulus', 'ubuntu', 'centos', 'opx', 'eos', 'nxos'])
+def test_facts_schema(nos):
+    module = pytest.importorskip('aeon.%s.device' % nos)
+    for _, fields in module.Device.FACT_GROUPS:
+        assert set(fields) <= set(Facts.__slots__)
+
+
+def test_batch_routines():
+    seen = {}
+
+    def first():
+        seen['first'] = yield api_call('execute', ['a', 'b'], stop_on_error=False)
+        seen['first-2'] = yield api_call('execute', ['c', 'd'])
+
+    def second():
+        seen['second'] = yield api_call('execute', ['e'])
+        seen['other'] = yield api_call('get_facts', 'all')
+        try:
+            yield api_call('execute', ['f'])
+        except IOError as exc:
+            seen['error'] = exc
+        yield api_call('execute', ['g'])
+
+    api = Mock()
+    api.execute.side_effect = [
+        (False, [dict(cmd=cmd, exit_code=int(cmd == 'b')) for cmd in 'eab']),
+        (True, [dict(cmd=cmd, exit_code=0) for cmd in 'cd']),
+        IOError('lost'),
+        IOError('lost again')]
+    api.get_facts.return_value = 'facts'
+
+    device = BaseDevice.__new__(BaseDevice)
+    device.api = api
+    # an error the routines do not handle is raised, as it would be were
+    # they run one after the other
+    with pytest.raises(IOError):
+        device._run_routine(batch_routines([second(), first()]))
+
+    calls = [(args, kwargs) for args, kwargs in api.execute.call_args_list]
+    assert calls[0] == ((['e', 'a', 'b'],), dict(stop_on_error=False, batch=True))
+    assert seen['first'] == (False, [dict(cmd='a', exit_code=0), dict(cmd='b', exit_code=1)])
+    assert seen['second'] == (True, [dict(cmd='e', exit_code=0)])
+    assert seen['other'] == 'facts'
+    # a call that stops on error is made on its own, unless of one command
+    assert calls[1] == ((['c', 'd'],), {})
+    assert seen['first-2'] == (True, [dict(cmd='c', exit_code=0), dict(cmd='d', exit_code=0)])
+    assert calls[2] == ((['f'],), dict(stop_on_error=False, batch=True))
+    assert isinstance(seen['error'], IOError)
+
+
+def test_batch_routines_short_results():
+    seen = {}
+
+    def routine(name, commands):
+        try:
+            seen[name] = yield api_call('execute', commands, stop_on_error=False)
+        except CommandError as exc:
+            seen[name] = exc
+
+    api = Mock()
+    api.execute.return_value = (True, [dict(cmd='a', exit_code=0), dict(cmd='b', exit_code=0)])
+    device = BaseDevice.__new__(BaseDevice)
+    device.api = api
+    device._run_routine(batch_routines([routine('first', ['a']), routine('second', ['b', 'c'])]))
+
+    assert seen['first'] == (True, [dict(cmd='a', exit_code=0)])
+    assert isinstance(seen['second'], CommandError)
+    assert seen['second'].commands == ['c']
+
+
+def test_json_backend():
+    default = decode.json_backend()
+    assert default in decode.JSON_BACKENDS
+    try:
+        assert decode.set_json_backend('json') == 'json'
+        assert decode.loads(b'{"hostname": "switch"}') == {'hostname': 'switch'}
+        with pytest.raises(ImportError):
+            decode.set_json_backend('no-such-json')
+        assert decode.json_backend() == 'json'
+    finally:
+        decode.set_json_backend(default)
+
+
+def test_json_backend_text_only():
+    # the json module of Python 3.5 parses text only
+    default = decode.json_backend()
+    module = Mock()
+    try:
+        with patch.object(decode, '_JSON_BYTES', False), \
+                patch.object(decode.importlib, 'import_module', return_value=module):
+            decode.set_json_backend('json')
+        decode.loads(b'{"hostname": "switch"}')
+        module.loads.assert_called_once_with(u'{"hostname": "switch"}')
+    finally:
+        decode.set_json_backend(default)
+
+
+def test_payload():
+    pytest.importorskip('lxml')
+    payload = decode.Payload(
+        b'<?xml version="1.0" encoding="UTF-8"?>\n<ins_api><outputs><output>'
+        b'<body><body>inner</body><hostname>switch</hostname></body><code>200</code>'
+        b'</output></outputs></ins_api>')
+
+    assert b'<clierror' not in payload
+    body = payload.xml_find('outputs/output/body')
+    assert body.findtext('hostname') == 'switch'
+    assert payload.xml_find('outputs/output/clierror') is None
+
+    payload = decode.Payload(b'{"body": {"hostname": "switch"}}')
+    assert payload.json['body'] == {'hostname': 'switch'}
+    assert payload.json is payload.json
@@ -16,6 +16,7 @@ g_facts = {
     'vendor': 'CentOS',
     'mac_address': '01:23:45:67:89:0A',
     'os_name': 'centos',
+    'boot_time': '1507000000',
     'service_tag': None
 }
 
@@ -51,9 +52,11 @@ def centos_device(mock_connector, mock_probe, request):
             if arg == 'cat /etc/centos-release | cut -d" " -f3':
                 results.append({'stdout': cat_version_out})
             # hostname
+            elif arg == "awk '/^btime/ {print $2}' /proc/stat":
+                results.append({'stdout': '1507000000\n'})
             elif arg == 'hostname':
                 results.append({'stdout': hostname_out})
-            elif arg =='/sbin/ip link show dev eth0':
+            elif arg == '/sbin/ip -json -details link show 2>/dev/null || /sbin/ip -details link show':
                 results.append({'stdout': ip_link_show_dev_eth0_out})
         return True, results
     mock_connector.return_value.execute.side_effect = mock_execute
@@ -1,7 +1,20 @@
+import os
+import select
+import socket
+import subprocess
+import threading
+import time
+
 import mock
 import pytest
 from pylib.aeon.cumulus import connector, device
-from aeon.exceptions import LoginNotReadyError, ProbeError
+from aeon.exceptions import LoginNotReadyError, ProbeError, TimeoutError
+from aeon.utils.facts_store import FactsStore
+from aeon.cumulus.pool import SSHPool, default_pool
+from aeon.cumulus.links import LinkInventory
+from aeon.cumulus.shell import ShellSession
+from aeon.cumulus.stream import CommandStream
+from aeon.cumulus.transfer import FileTransfer, put_many
 
 
 g_facts = {
@@ -16,6 +29,7 @@ g_facts = {
     'vendor': 'Cumulus',
     'mac_address': '01:23:45:67:89:0a',
     'os_name': 'cumulus',
+    'boot_time': '1507000000',
     'service_tag': 'no-service-tag'
 }
 
@@ -73,6 +87,8 @@ def cumulus_device(mock_connector, mock_probe, request):
             if arg == 'cat /etc/lsb-release | grep RELEASE | cut -d= -f2':
                 results.append({'stdout': request.param['os_version']})
             # hostname
+            elif arg == "awk '/^btime/ {print $2}' /proc/stat":
+                results.append({'stdout': '1507000000\n'})
             elif arg == 'hostname':
                 results.append({'stdout': request.param['hostname']})
             # test if dev is virtual Cumulus OS 2.x (return sets device to not be virt2
@@ -83,7 +99,7 @@ def cumulus_device(mock_connector, mock_probe, request):
                     results.append({'exit_code': 0})
             elif arg =='sudo decode-syseeprom':
                 results.append({'stdout':decode_syseeprom})
-            elif arg =='ip link show dev eth0':
+            elif arg == 'ip -json -details link show 2>/dev/null || ip -details link show':
                 results.append({'stdout': ip_link_show_dev_eth0})
         return True, results
     mock_connector.return_value.execute.side_effect = mock_execute
@@ -117,14 +133,10 @@ def test_cumulus_connector_exception(mock_ssh):
 
 @mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
 def test_cumulus_connector_execute(mock_ssh):
-    mock_stdin = mock.MagicMock()
-    mock_stdout = mock.MagicMock()
-    mock_stderr = mock.MagicMock()
-    mock_stdout.read.return_value = 'stdout text'
-    mock_stderr.read.return_value = 'stderr text'
     # Set exit status to 0 for test1 and test2 in results_good, but 1 for results_bad
-    mock_stdout.channel.recv_exit_status.side_effect = [0, 0, 1, 1, 1]
-    mock_ssh.return_value.exec_command.return_value = (mock_stdin, mock_stdout, mock_stderr)
+    exit_codes = iter([0, 0, 1, 1, 1])
+    mock_ssh.return_value.exec_command.side_effect = lambda cmd: exec_result(
+        b'stdout text', b'stderr text', next(exit_codes))
     target = '1.1.1.1'
     user = 'test_user'
     passwd = 'test_passwd'
@@ -133,30 +145,30 @@ def test_cumulus_connector_execute(mock_ssh):
     results_good = con.execute(['test1', 'test2'])
     assert results_good == (True, [{'cmd': 'test1',
                               'exit_code': 0,
-                              'stderr': 'stderr text',
-                              'stdout': 'stdout text'
+                              'stderr': b'stderr text',
+                              'stdout': b'stdout text'
                                },
                               {'cmd': 'test2',
                                'exit_code': 0,
-                               'stderr': 'stderr text',
-                               'stdout': 'stdout text'
+                               'stderr': b'stderr text',
+                               'stdout': b'stdout text'
                                }])
     results_bad = con.execute(['test1', 'test2'])
     assert results_bad == (False, [{'cmd': 'test1',
                               'exit_code': 1,
-                              'stderr': 'stderr text',
-                              'stdout': 'stdout text'
+                              'stderr': b'stderr text',
+                              'stdout': b'stdout text'
                                }])
     results_bad_no_stop = con.execute(['test1', 'test2'], stop_on_error=False)
     assert results_bad_no_stop == (False, [{'cmd': 'test1',
                               'exit_code': 1,
-                              'stderr': 'stderr text',
-                              'stdout': 'stdout text'
+                              'stderr': b'stderr text',
+                              'stdout': b'stdout text'
                                },
                               {'cmd': 'test2',
                                'exit_code': 1,
-                               'stderr': 'stderr text',
-                               'stdout': 'stdout text'
+                               'stderr': b'stderr text',
+                               'stdout': b'stdout text'
                                }])
 
 
@@ -173,3 +185,627 @@ def test_cumulus_device(cumulus_device):
 
 
 
+
+
+@mock.patch('pylib.aeon.cumulus.device.BaseDevice.probe')
+@mock.patch('pylib.aeon.cumulus.device.Connector')
+def test_cumulus_device_facts_one_round_trip(mock_connector, mock_probe):
+    outputs = {
+        'hostname': g_facts['hostname'],
+        'cat /etc/lsb-release | grep RELEASE | cut -d= -f2': g_facts['os_version'],
+        "awk '/^btime/ {print $2}' /proc/stat": g_facts['boot_time'],
+        'sudo decode-syseeprom': decode_syseeprom}
+    mock_connector.return_value.execute.side_effect = lambda args, **kwargs: (
+        True, [{'stdout': outputs.get(arg, ''), 'exit_code': 0} for arg in args])
+
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd')
+    assert dev.facts == g_facts
+    mock_connector.return_value.execute.assert_called_once_with(
+        ['hostname', 'cat /etc/lsb-release | grep RELEASE | cut -d= -f2',
+         "awk '/^btime/ {print $2}' /proc/stat",
+         'test -e /usr/cumulus/bin/decode-syseeprom', 'sudo decode-syseeprom',
+         'ip -json -details link show 2>/dev/null || ip -details link show'],
+        stop_on_error=False, batch=True)
+
+
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_client_handoff(mock_ssh):
+    client = mock.MagicMock()
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', client=client)
+    assert con._client is client
+    assert not mock_ssh.called
+    assert not client.connect.called
+
+
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_sock_handoff(mock_ssh):
+    sock = mock.MagicMock()
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', sock=sock)
+    mock_ssh.return_value.connect.assert_called_once_with(
+        '1.1.1.1', port=22, username='test_user', password='test_passwd', sock=sock)
+    assert con._sock is None
+
+
+@mock.patch('aeon.base.device.probe_many')
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_device_probe_sock_handoff(mock_ssh, mock_probe_many):
+    sock = mock.MagicMock()
+    mock_probe_many.return_value = iter([('1.1.1.1', 0.5, sock)])
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', no_gather_facts=True)
+    mock_probe_many.assert_called_once_with(['1.1.1.1'], 22, dev.timeout, keep_open=True)
+    mock_ssh.return_value.connect.assert_called_once_with(
+        '1.1.1.1', port=22, username='test_user', password='test_passwd', sock=sock)
+
+
+@mock.patch('aeon.base.device.probe_many')
+def test_cumulus_device_client_no_probe(mock_probe_many):
+    client = mock.MagicMock()
+    client.get_transport.return_value.is_active.return_value = True
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd',
+                        client=client, no_gather_facts=True)
+    assert dev.api._client is client
+    assert not mock_probe_many.called
+
+
+@mock.patch('pylib.aeon.cumulus.device.BaseDevice.probe')
+@mock.patch('pylib.aeon.cumulus.device.Connector')
+def test_cumulus_device_facts_store(mock_connector, mock_probe, tmpdir):
+    boot_time = ['1507000000']
+
+    def mock_execute(args, **kwargs):
+        outputs = {
+            'hostname': g_facts['hostname'],
+            'cat /etc/lsb-release | grep RELEASE | cut -d= -f2': g_facts['os_version'],
+            "awk '/^btime/ {print $2}' /proc/stat": boot_time[0],
+            'sudo decode-syseeprom': decode_syseeprom}
+        return True, [{'stdout': outputs.get(arg, ''), 'exit_code': 0} for arg in args]
+
+    def commands():
+        return [cmd for c in mock_connector.return_value.execute.call_args_list for cmd in c[0][0]]
+
+    mock_connector.return_value.execute.side_effect = mock_execute
+    store = FactsStore(path=str(tmpdir.join('facts.db')))
+
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', facts_store=store)
+    assert dev.facts == g_facts
+    assert 'sudo decode-syseeprom' in commands()
+
+    # served from the store
+    mock_connector.return_value.execute.reset_mock()
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', facts_store=store)
+    assert dev.facts == g_facts
+    assert 'sudo decode-syseeprom' not in commands()
+    assert 'test -e /usr/cumulus/bin/decode-syseeprom' not in commands()
+
+    # the device has been rebooted
+    boot_time[0] = '1508000000'
+    mock_connector.return_value.execute.reset_mock()
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', facts_store=store)
+    assert dev.facts['serial_number'] == g_facts['serial_number']
+    assert 'sudo decode-syseeprom' in commands()
+
+
+def exec_result(out, err=b'', exit_code=0):
+    """
+    :return: what SSHClient.exec_command returns for a command that has
+             finished, its output waiting on the channel
+    """
+    stdout = mock.MagicMock()
+    stdout.channel = FakeChannel([], exit_code=exit_code)
+    stdout.channel.buffers = {'out': out, 'err': err}
+    stdout.channel.eof_received = True
+    return mock.MagicMock(), stdout, mock.MagicMock()
+
+
+def local_exec_command(script):
+    # runs the script locally, as the target shell would
+    proc = subprocess.Popen(['/bin/sh', '-c', script], stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    out, err = proc.communicate()
+    return exec_result(out, err, proc.returncode)
+
+
+@pytest.mark.parametrize('stop_on_error', [True, False])
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_execute_batch(mock_ssh, stop_on_error):
+    mock_ssh.return_value.exec_command.side_effect = local_exec_command
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd')
+    commands = ['echo one', 'printf two', 'cd /; echo "it\'s bad" >&2; exit 3', 'pwd']
+    good, results = con.execute(commands, stop_on_error=stop_on_error, batch=True)
+
+    assert mock_ssh.return_value.exec_command.call_count == 1
+    assert good is False
+    assert results[:3] == [
+        dict(cmd='echo one', exit_code=0, stdout=b'one\n', stderr=b''),
+        dict(cmd='printf two', exit_code=0, stdout=b'two', stderr=b''),
+        dict(cmd=commands[2], exit_code=3, stdout=b'', stderr=b"it's bad\n")]
+    if stop_on_error:
+        assert len(results) == 3
+    else:
+        # each command runs in a subshell of its own
+        assert results[3] == dict(cmd='pwd', exit_code=0, stdout=os.getcwd().encode() + b'\n', stderr=b'')
+
+
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_execute_batch_good(mock_ssh):
+    mock_ssh.return_value.exec_command.side_effect = local_exec_command
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd')
+    good, results = con.execute(['true', 'echo ok'], batch=True)
+    assert good is True
+    assert [r['stdout'] for r in results] == [b'', b'ok\n']
+
+
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_execute_concurrent(mock_ssh):
+    lock = threading.Lock()
+    open_channels = [0, 0]      # now, most at once
+
+    def exec_command(cmd):
+        with lock:
+            open_channels[0] += 1
+            open_channels[1] = max(open_channels)
+        # the first commands are the slowest
+        time.sleep(0.05 * (4 - int(cmd[-1])))
+        with lock:
+            open_channels[0] -= 1
+        return exec_result(b'out ' + cmd.encode(), exit_code=1 if cmd == 'cmd 2' else 0)
+
+    mock_ssh.return_value.exec_command.side_effect = exec_command
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd')
+    commands = ['cmd 0', 'cmd 1', 'cmd 2', 'cmd 3']
+    good, results = con.execute_concurrent(commands, max_channels=2)
+    assert good is False
+    assert [r['cmd'] for r in results] == commands
+    assert [r['stdout'] for r in results] == [b'out ' + cmd.encode() for cmd in commands]
+    assert [r['exit_code'] for r in results] == [0, 0, 1, 0]
+    assert open_channels[1] == 2
+
+
+def mock_ssh_client(*args):
+    client = mock.MagicMock()
+    client.get_transport.return_value.is_active.return_value = True
+    return client
+
+
+@mock.patch('pylib.aeon.cumulus.pool.paramiko.SSHClient', side_effect=mock_ssh_client)
+def test_ssh_pool(mock_ssh):
+    pool = SSHPool(max_idle=60, max_idle_per_key=1, keepalive=15)
+    key = pool.key('1.1.1.1', 22, 'test_user', 'test_passwd')
+
+    client = pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd')
+    client.connect.assert_called_once_with('1.1.1.1', port=22, username='test_user',
+                                           password='test_passwd', sock=None)
+    client.get_transport.return_value.set_keepalive.assert_called_once_with(15)
+    other = pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd')
+    assert other is not client
+
+    # one idle session is kept per key
+    pool.checkin(key, client)
+    pool.checkin(key, other)
+    assert other.close.called and not client.close.called
+
+    # re-used, and the probe socket handed over is not needed
+    sock = mock.MagicMock()
+    assert pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd', sock=sock) is client
+    sock.close.assert_called_once_with()
+
+    # a session that died while idle is replaced
+    pool.checkin(key, client)
+    client.get_transport.return_value.is_active.return_value = False
+    assert pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd') is not client
+    assert client.close.called
+    assert mock_ssh.call_count == 3
+
+
+@mock.patch('pylib.aeon.cumulus.pool.paramiko.SSHClient', side_effect=mock_ssh_client)
+def test_ssh_pool_credentials(mock_ssh):
+    pool = SSHPool()
+    client = pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd')
+    pool.checkin(pool.key('1.1.1.1', 22, 'test_user', 'test_passwd'), client)
+    # a session is not handed to a caller with another password
+    assert pool.checkout('1.1.1.1', 22, 'test_user', 'other_passwd') is not client
+    assert pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd') is client
+    assert 'test_passwd' not in repr(pool._idle)
+
+
+@mock.patch('pylib.aeon.cumulus.pool.paramiko.SSHClient', side_effect=mock_ssh_client)
+def test_ssh_pool_max_idle(mock_ssh):
+    pool = SSHPool(max_idle=60)
+    key = pool.key('1.1.1.1', 22, 'test_user', 'test_passwd')
+    with mock.patch('aeon.cumulus.pool._clock', return_value=100):
+        client = pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd')
+        pool.checkin(key, client)
+        other = pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd')
+        pool.checkin(key, other)
+    with mock.patch('aeon.cumulus.pool._clock', return_value=161):
+        assert pool.checkout('1.1.1.1', 22, 'test_user', 'test_passwd') is not client
+    assert client.close.called
+
+    # an unused pool closes its expired sessions when asked to
+    with mock.patch('aeon.cumulus.pool._clock', return_value=100):
+        pool.checkin(key, other)
+    with mock.patch('aeon.cumulus.pool._clock', return_value=161):
+        pool.evict()
+    assert other.close.called
+
+
+@mock.patch('pylib.aeon.cumulus.pool.paramiko.SSHClient', side_effect=mock_ssh_client)
+def test_cumulus_connector_pooled(mock_ssh):
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', pool=default_pool)
+    client = con._client
+    con.close()
+    assert not client.close.called
+
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', pool=default_pool)
+    assert con._client is client
+    assert mock_ssh.call_count == 1
+    con.close()
+    default_pool.clear()
+    assert client.close.called
+
+    # without a pool, the session is the connector's own
+    with mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient') as mock_own:
+        con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd')
+        con.close()
+    assert con._client.close.called
+    assert mock_own.call_count == 1
+    assert mock_ssh.call_count == 1
+
+
+class FakeChannel(object):
+    """
+    Stands in for a paramiko.Channel; each select() on it delivers the next
+    of the scripted ('out' | 'err', data) events, then EOF.
+    """
+    def __init__(self, events, exit_code=0):
+        self.events = list(events)
+        self.buffers = {'out': b'', 'err': b''}
+        self.eof_received = False
+        self.exit_code = exit_code
+        self.closed = False
+
+    def deliver(self):
+        if self.events:
+            kind, data = self.events.pop(0)
+            self.buffers[kind] += data
+        else:
+            self.eof_received = True
+
+    def _recv(self, kind, size):
+        data, self.buffers[kind] = self.buffers[kind][:size], self.buffers[kind][size:]
+        return data
+
+    def recv_ready(self):
+        return bool(self.buffers['out'])
+
+    def recv(self, size):
+        return self._recv('out', size)
+
+    def recv_stderr_ready(self):
+        return bool(self.buffers['err'])
+
+    def recv_stderr(self, size):
+        return self._recv('err', size)
+
+    def recv_exit_status(self):
+        return self.exit_code
+
+    def close(self):
+        self.closed = True
+
+
+def fake_select(rlist, wlist, xlist, timeout=None):
+    rlist[0].deliver()
+    return rlist, [], []
+
+
+@mock.patch('aeon.cumulus.stream.select.select', side_effect=fake_select)
+def test_command_stream(mock_select):
+    chan = FakeChannel([('out', b'10.0.0.0/8 via'), ('err', b'warn'), ('out', b' 1.1.1.1\n10.1'),
+                        ('out', b'.0.0/16 via 2.2.2.2\n20.0.0.0/8')], exit_code=2)
+    stream = CommandStream(chan, lines=True)
+    assert list(stream) == [b'10.0.0.0/8 via 1.1.1.1\n', b'10.1.0.0/16 via 2.2.2.2\n', b'20.0.0.0/8']
+    assert stream.exit_code == 2
+    assert stream.stderr.read() == b'warn'
+    assert chan.closed
+
+
+@mock.patch('aeon.cumulus.stream.select.select', side_effect=fake_select)
+def test_command_stream_spool(mock_select):
+    chan = FakeChannel([('out', b'x' * 100)] * 5 + [('err', b'e' * 100)] * 5)
+    stream = CommandStream(chan, spool_size=256)
+    spooled = stream.spool()
+    assert spooled.read() == b'x' * 500
+    assert spooled._rolled and stream.stderr._rolled
+    assert stream.stderr.read() == b'e' * 500
+    assert stream.exit_code == 0
+
+
+class LateEOFChannel(FakeChannel):
+    """
+    A FakeChannel the last data and EOF of which come in together, just
+    after recv_ready() has found no data.
+    """
+    def __init__(self, events, last):
+        super(LateEOFChannel, self).__init__(events)
+        self.last = last
+
+    def recv_ready(self):
+        ready = super(LateEOFChannel, self).recv_ready()
+        if not ready and not self.events and self.last:
+            self.buffers['out'], self.last = self.last, None
+            self.eof_received = True
+        return ready
+
+
+@mock.patch('aeon.cumulus.stream.select.select', side_effect=fake_select)
+def test_command_stream_data_with_eof(mock_select):
+    chan = LateEOFChannel([('out', b'one')], last=b'two')
+    stream = CommandStream(chan)
+    assert stream.read() == b'onetwo'
+    assert stream.exit_code == 0
+
+
+@mock.patch('aeon.cumulus.stream.select.select', return_value=([], [], []))
+def test_command_stream_timeout(mock_select):
+    chan = FakeChannel([('out', b'one')])
+    stream = CommandStream(chan, timeout=5)
+    with pytest.raises(TimeoutError):
+        list(stream)
+    assert mock_select.call_args[0][3] == 5
+    assert chan.closed
+
+
+@mock.patch('aeon.cumulus.stream.select.select', side_effect=fake_select)
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_execute_drains_stderr(mock_ssh, mock_select):
+    # stderr is read as it comes, not only once stdout is done
+    chan = FakeChannel([('err', b'e' * 100), ('out', b'one'), ('err', b'e' * 100), ('out', b'two')],
+                       exit_code=1)
+    stdout = mock.MagicMock(channel=chan)
+    mock_ssh.return_value.exec_command.return_value = (mock.MagicMock(), stdout, mock.MagicMock())
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd')
+    good, results = con.execute(['cmd'])
+    assert results == [dict(cmd='cmd', exit_code=1, stdout=b'onetwo', stderr=b'e' * 200)]
+    assert not stdout.read.called
+
+
+@mock.patch('aeon.cumulus.stream.select.select', side_effect=fake_select)
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_execute_stream(mock_ssh, mock_select):
+    chan = FakeChannel([('out', b'one'), ('out', b'two')])
+    mock_ssh.return_value.get_transport.return_value.open_session.return_value = chan
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', pool=None)
+    chan.exec_command = mock.MagicMock()
+    stream = con.execute_stream('ip route show')
+    chan.exec_command.assert_called_once_with('ip route show')
+    assert list(stream) == [b'one', b'two']
+    assert stream.exit_code == 0
+
+
+class FakeSFTPFile(object):
+    """
+    Stands in for a paramiko.SFTPFile, over a local file.
+    """
+    def __init__(self, path, mode):
+        self.file = open(path, mode)
+        self.pipelined = False
+        self.prefetched = None
+
+    def set_pipelined(self, pipelined=True):
+        self.pipelined = pipelined
+
+    def prefetch(self, file_size=None):
+        self.prefetched = file_size
+
+    def stat(self):
+        return os.stat(self.file.name)
+
+    def read(self, size):
+        return self.file.read(size)
+
+    def write(self, data):
+        assert self.pipelined
+        self.file.write(data)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.file.close()
+
+
+@pytest.fixture()
+def mock_sftp():
+    sftp = mock.MagicMock()
+    sftp.open.side_effect = lambda path, mode: FakeSFTPFile(path, mode)
+    with mock.patch('pylib.aeon.cumulus.transfer.paramiko.SFTPClient.from_transport',
+                    return_value=sftp) as from_transport:
+        yield from_transport
+
+
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_put_file(mock_ssh, mock_sftp, tmpdir):
+    mock_ssh.return_value.exec_command.side_effect = local_exec_command
+    local, remote = tmpdir.join('image.bin'), tmpdir.join('remote.bin')
+    local.write_binary(os.urandom(3 * FileTransfer.BLOCK_SIZE + 100))
+
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', pool=None)
+    assert con.put_file(str(local), str(remote)) is True
+    assert remote.read_binary() == local.read_binary()
+    mock_sftp.assert_called_once_with(mock_ssh.return_value.get_transport.return_value,
+                                      window_size=FileTransfer.WINDOW_SIZE,
+                                      max_packet_size=FileTransfer.MAX_PACKET_SIZE)
+
+    # the remote checksum matches
+    assert con.put_file(str(local), str(remote)) is False
+    assert mock_sftp.return_value.open.call_count == 1
+    assert con.put_file(str(local), str(remote), skip_same=False) is True
+
+    con.close()
+    assert mock_sftp.return_value.close.called
+
+
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_get_file(mock_ssh, mock_sftp, tmpdir):
+    mock_ssh.return_value.exec_command.side_effect = local_exec_command
+    local, remote = tmpdir.join('local.log'), tmpdir.join('remote.log')
+    remote.write_binary(b'log line\n' * 1000)
+
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', pool=None)
+    assert con.get_file(str(remote), str(local)) is True
+    assert local.read_binary() == remote.read_binary()
+    assert con.get_file(str(remote), str(local)) is False
+
+
+def test_put_many(tmpdir):
+    local = tmpdir.join('image.bin')
+    local.write_binary(b'image')
+
+    good, bad = mock.MagicMock(), mock.MagicMock(spec=['put_file'])
+    good.put_file.return_value = True
+    bad.put_file.side_effect = IOError('no space left')
+    dev = mock.MagicMock(api=good)
+
+    results = dict(put_many([dev, bad], str(local), '/tmp/image.bin', max_workers=2))
+    assert results[dev] is True
+    assert isinstance(results[bad], IOError)
+    good.put_file.assert_called_once_with(
+        str(local), '/tmp/image.bin', skip_same=True,
+        checksum='6105d6cc76af400325e94d588ce511be5bfdbb73b437dc51eca43917d7a43e3d')
+
+
+class LocalShellChannel(object):
+    """
+    Stands in for the paramiko.Channel of invoke_shell, with a local shell
+    behind it.
+    """
+    def __init__(self, *args, **kwargs):
+        self.proc = subprocess.Popen(['/bin/sh'], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        self.timeout = None
+        self.closed = False
+
+    def settimeout(self, timeout):
+        self.timeout = timeout
+
+    def sendall(self, data):
+        self.proc.stdin.write(data.encode())
+        self.proc.stdin.flush()
+
+    def recv(self, size):
+        if not select.select([self.proc.stdout], [], [], self.timeout)[0]:
+            raise socket.timeout()
+        return os.read(self.proc.stdout.fileno(), size)
+
+    def recv_exit_status(self):
+        return self.proc.wait()
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.proc.kill()
+            self.proc.wait()
+
+
+def test_shell_session(tmpdir):
+    client = mock.MagicMock()
+    client.invoke_shell.side_effect = LocalShellChannel
+    shell = ShellSession(client)
+
+    assert shell.run('echo one') == dict(cmd='echo one', exit_code=0, stdout=b'one\n', stderr=b'')
+    assert shell.run('printf two')['stdout'] == b'two'
+    assert shell.run('echo oops >&2; false') == dict(
+        cmd='echo oops >&2; false', exit_code=1, stdout=b'oops\n', stderr=b'')
+
+    # one shell throughout, which does not read the commands as input
+    assert shell.run('cd %s' % tmpdir)['exit_code'] == 0
+    assert shell.run('pwd')['stdout'] == str(tmpdir).encode() + b'\n'
+    assert shell.run('cat')['stdout'] == b''
+    assert shell.run('seq 100000')['stdout'] == b''.join(
+        str(n).encode() + b'\n' for n in range(1, 100001))
+
+    assert shell.run('exit 3')['exit_code'] == 3
+    assert shell.closed
+    assert client.invoke_shell.call_count == 1
+
+
+def test_shell_session_timeout():
+    client = mock.MagicMock()
+    client.invoke_shell.side_effect = LocalShellChannel
+    shell = ShellSession(client, timeout=0.2)
+    with pytest.raises(TimeoutError):
+        shell.run('sleep 5')
+    assert shell.closed
+
+
+@mock.patch('pylib.aeon.cumulus.connector.paramiko.SSHClient')
+def test_cumulus_connector_execute_shell(mock_ssh):
+    mock_ssh.return_value.invoke_shell.side_effect = LocalShellChannel
+    con = connector.Connector('1.1.1.1', user='test_user', passwd='test_passwd', pool=None)
+    good, results = con.execute(['X=1', 'echo $X', 'false', 'echo not run'], shell=True)
+    assert good is False
+    assert [r['stdout'] for r in results] == [b'', b'1\n', b'']
+
+    good, results = con.execute(['echo $X'], shell=True)
+    assert good is True and results[0]['stdout'] == b'1\n'
+    assert mock_ssh.return_value.invoke_shell.call_count == 1
+    assert not mock_ssh.return_value.exec_command.called
+
+    channel = con.shell.channel
+    con.close()
+    assert channel.closed
+
+
+ip_json_details_link = b'''[{"ifindex":1,"ifname":"lo","flags":["LOOPBACK","UP"],"mtu":65536,
+"operstate":"UNKNOWN","link_type":"loopback","address":"00:00:00:00:00:00"},
+{"ifindex":2,"ifname":"eth0","flags":["BROADCAST","UP"],"mtu":1500,"master":"mgmt",
+"operstate":"UP","link_type":"ether","address":"01:23:45:67:89:0a"},
+{"ifindex":4,"ifname":"swp1","mtu":9216,"master":"bond0","operstate":"UP",
+"link_type":"ether","address":"44:38:39:00:00:01","linkinfo":{"info_slave_kind":"bond"}},
+{"ifindex":3,"ifname":"bond0","mtu":9216,"operstate":"UP","link_type":"ether",
+"address":"44:38:39:00:00:01","linkinfo":{"info_kind":"bond"}}]'''
+
+ip_details_link = '''1: lo: <LOOPBACK,UP,LOWER_UP> mtu 65536 qdisc noqueue state UNKNOWN mode DEFAULT group default
+    link/loopback 00:00:00:00:00:00 brd 00:00:00:00:00:00 promiscuity 0
+2: eth0: <BROADCAST,MULTICAST,UP,LOWER_UP> mtu 1500 qdisc pfifo_fast master mgmt state UP mode DEFAULT group default qlen 1000
+    link/ether 01:23:45:67:89:0a brd ff:ff:ff:ff:ff:ff promiscuity 0
+    vrf_slave table 1001
+3: bond0: <BROADCAST,MULTICAST,MASTER,UP,LOWER_UP> mtu 9216 qdisc noqueue state UP mode DEFAULT group default
+    link/ether 44:38:39:00:00:01 brd ff:ff:ff:ff:ff:ff promiscuity 0
+4: swp1: <BROADCAST,MULTICAST,SLAVE,UP,LOWER_UP> mtu 9216 qdisc pfifo_fast master bond0 state UP mode DEFAULT group default qlen 1000
+    link/ether 44:38:39:00:00:01 brd ff:ff:ff:ff:ff:ff promiscuity 0
+5: swp1.100@swp1: <BROADCAST,MULTICAST> mtu 9216 qdisc noop state DOWN mode DEFAULT group default
+    link/ether 44:38:39:00:00:01 brd ff:ff:ff:ff:ff:ff promiscuity 0
+'''
+
+
+@pytest.mark.parametrize('output', [ip_json_details_link, ip_details_link], ids=['json', 'text'])
+def test_link_inventory(output):
+    api = mock.MagicMock()
+    api.execute.return_value = True, [{'stdout': output, 'exit_code': 0}]
+    links = LinkInventory(api)
+    assert not api.execute.called
+
+    assert [link.name for link in links.links()][:4] == ['lo', 'eth0', 'bond0', 'swp1']
+    assert links['eth0'].mac_address == '01:23:45:67:89:0A'
+    assert links['eth0'].master == 'mgmt' and links['eth0'].mtu == 1500
+    assert links['lo'].mac_address is None
+    assert links.mac_address() == '01:23:45:67:89:0A'
+    assert links.mac_address('swp1') == '44:38:39:00:00:01'
+    assert links.get('swp2') is None and 'swp2' not in links
+    assert set(link.name for link in links.by_mac('44:38:39:00:00:01')) >= set(['bond0', 'swp1'])
+    if output is ip_json_details_link:
+        assert links['bond0'].kind == 'bond'
+    else:
+        assert links['swp1.100'].operstate == 'DOWN'
+    api.execute.assert_called_once_with([links.command])
+
+    links.refresh()
+    assert api.execute.call_count == 2
+
+
+def test_cumulus_device_links(cumulus_device):
+    # read along with the facts
+    cumulus_device.api.execute.reset_mock()
+    assert cumulus_device._serial_from_link('eth0') == '01:23:45:67:89:0A'
+    assert not cumulus_device.api.execute.called
@@ -16,6 +16,7 @@ g_facts = {'hw_version': '1.0.1',
            'vendor': 'arista',
            'hw_part_version': None,
            'os_name': 'eos',
+           'boot_time': 1507000000.5,
             'mac_address': '01:23:45:67:89:0a',
            }
 
@@ -23,6 +24,7 @@ show_ver_return = {'version': g_facts['os_version'],
     'modelName': g_facts['hw_model'],
     'hardwareRevision': g_facts['hw_version'],
     'systemMacAddress': '01:23:45:67:89:0a',
+    'bootupTimestamp': g_facts['boot_time'],
     'serialNumber': g_facts['serial_number']}
 
 show_hostname_return = {
@@ -95,7 +97,7 @@ def test_eos_exception():
 #             print results
 
 
-@mock.patch('pylib.aeon.eos.connector.pyeapi.connect')
+@mock.patch('pylib.aeon.eos.connector.EapiSession')
 def test_eos_connector_execute_exception(mock_eapi):
     mock_eapi.return_value.execute.side_effect = Exception
     target = '1.1.1.1'
@@ -107,7 +109,7 @@ def test_eos_connector_execute_exception(mock_eapi):
         con.execute('test')
 
 
-@mock.patch('pylib.aeon.eos.connector.pyeapi.connect')
+@mock.patch('pylib.aeon.eos.connector.EapiSession')
 def test_eos_connector_execute(mock_eapi):
     def mock_execute(commands, encoding='json', **kwargs):
         return {'result': commands}
@@ -122,7 +124,7 @@ def test_eos_connector_execute(mock_eapi):
     assert results == ['test1', 'test2']
 
 
-@mock.patch('pylib.aeon.eos.connector.pyeapi.connect')
+@mock.patch('pylib.aeon.eos.connector.EapiSession')
 def test_eos_connector_configure_exception(mock_eapi):
     mock_eapi.return_value.execute.side_effect = Exception
     target = '1.1.1.1'
@@ -134,7 +136,7 @@ def test_eos_connector_configure_exception(mock_eapi):
         con.configure(['test'])
 
 
-@mock.patch('pylib.aeon.eos.connector.pyeapi.connect')
+@mock.patch('pylib.aeon.eos.connector.EapiSession')
 def test_eos_connector_configure_runtime_exception(mock_eapi):
     mock_eapi.return_value.execute.side_effect = Exception
     target = '1.1.1.1'
@@ -146,7 +148,7 @@ def test_eos_connector_configure_runtime_exception(mock_eapi):
         con.configure('test')
 
 
-@mock.patch('pylib.aeon.eos.connector.pyeapi.connect')
+@mock.patch('pylib.aeon.eos.connector.EapiSession')
 def test_eos_connector_configure(mock_eapi):
     def mock_execute(*args):
         return {'result': list(args)[0]}
@@ -158,6 +160,7 @@ def test_eos_connector_configure(mock_eapi):
 
     con = connector.Connector(target, user=user, passwd=passwd)
     con.configure(['test1', 'test2', ''])
-    expected = [mock.call(host=target, password=passwd, transport='http', username=user, timeout=240),
+    expected = [mock.call(host=target, port=80, password=passwd, transport='http', username=user,
+                          timeout=240, pool=None),
                 mock.call().execute(['enable', 'configure', 'test1', 'test2'])]
     assert mock_eapi.mock_calls == expected
@@ -1,131 +1,164 @@
 import socket
-from mock import patch, Mock, call
+from mock import patch, MagicMock
 import pytest
-from pexpect.pxssh import ExceptionPxssh
 from paramiko import AuthenticationException, SSHException
 from aeon.exceptions import TargetError
 
-from aeon.utils import get_device
+from aeon.utils import get_device, get_devices
+from aeon.utils.nos_cache import NosCache, host_key_fingerprint
+from aeon.utils.facts_store import FactsStore
+from aeon.utils.fingerprint import Fingerprint, probe_target
 
 dev_info = {'target': '1.1.1.1',
        'user': 'test_user',
        'passwd': 'test_passwd'}
-nos_only_params = [True, False]
+
+show_version_out = {
+    'nxos': 'Cisco Nexus Operating System (NX-OS) Software',
+    'eos': 'Arista vEOS',
+}
+
+proc_version_out = {
+    'cumulus': 'Linux version 4.1.0-cl-1-amd64 (dev-support@cumulusnetworks.com)',
+    'ubuntu': 'Linux version 4.4.0-31-generic (buildd@lgw01-16) (gcc version 5.3.1 (Ubuntu 5.3.1-14ubuntu2.1) )',
+    'centos': 'Linux version 3.10.0-514.el7.x86_64 (gcc version 4.8.5 20150623 (Red Hat 4.8.5-11) (GCC) )',
+    'opx': 'Linux version 3.16.0-4-amd64 (debian-kernel@lists.debian.org)',
+}
+
+
+@pytest.fixture(autouse=True)
+def mock_probe_target():
+    # by default fingerprinting narrows nothing down
+    with patch('aeon.utils.probe_target') as mock_probe:
+        mock_probe.return_value = Fingerprint(dev_info['target'])
+        yield mock_probe
+
+
+def mock_shell(nos):
+    """
+    :return: a mock shell channel producing what the detection script outputs on the nos
+    """
+    if nos in show_version_out:
+        output = 'switch# show version\r\n' + show_version_out[nos]
+    else:
+        output = '$ show version\r\nbash: show: command not found\r\n$ cat /proc/version\r\n'
+        output += proc_version_out.get(nos, '')
+        output += '\r\n$ [ -f /etc/opx/opx-environment.sh ] && echo "device is ""OPX"\r\n'
+        if nos == 'opx':
+            output += 'device is OPX\r\n'
+        output += '$ exit\r\n'
+
+    chan = MagicMock()
+    half = len(output) // 2
+    chan.recv.side_effect = [output[:half].encode(), output[half:].encode(), b'']
+    return chan
+
+
+def sent_script(mock_ssh):
+    chan = mock_ssh.return_value.invoke_shell.return_value
+    return [args[0] for args, _ in chan.sendall.call_args_list]
 
 
 @patch('pylib.aeon.utils.paramiko.SSHClient')
 @patch('pylib.aeon.utils.aeon.nxos.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_login(mock_pxssh, mock_nxos_device, mock_paramiko):
-    mock_pxssh.return_value.expect.return_value = 0
+def test_get_device_login(mock_nxos_device, mock_paramiko):
+    mock_paramiko.return_value.invoke_shell.return_value = mock_shell('nxos')
     get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
-    mock_paramiko.return_value.connect.assert_called_with(dev_info['target'],
+    mock_paramiko.return_value.connect.assert_called_once_with(dev_info['target'],
                                                      username=dev_info['user'],
                                                      timeout=5,
                                                      password=dev_info['passwd'])
-    mock_pxssh.return_value.login.assert_called_with(dev_info['target'],
-                                                     dev_info['user'],
-                                                     auto_prompt_reset=False,
-                                                     login_timeout=10,
-                                                     password=dev_info['passwd'])
 
 
 @patch('pylib.aeon.utils.paramiko.SSHClient')
 @patch('pylib.aeon.utils.aeon.cumulus.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_sendline(mock_pxssh, mock_nxos_device, mock_paramiko):
-    mock_pxssh.return_value.expect.side_effect = [2, 0]
+def test_get_device_detection_script(mock_cumulus_device, mock_paramiko):
+    mock_paramiko.return_value.invoke_shell.return_value = mock_shell('cumulus')
     get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
-    calls = [call('show version'), call('cat /proc/version')]
-    mock_pxssh.return_value.sendline.assert_has_calls(calls)
-
+    # all of the detection commands are sent at once, on one channel
+    assert sent_script(mock_paramiko) == [
+        'show version\n'
+        'cat /proc/version\n'
+        '[ -f /etc/opx/opx-environment.sh ] && echo "device is ""OPX"\n'
+        'exit\n']
+    mock_paramiko.return_value.invoke_shell.assert_called_once_with()
+    mock_paramiko.return_value.invoke_shell.return_value.close.assert_called_once_with()
 
-@patch('pylib.aeon.utils.paramiko.SSHClient')
-@patch('pylib.aeon.utils.aeon.nxos.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_nxos(mock_pxssh, mock_nxos_device, mock_paramiko):
-    device_name = 'nxos_device'
-    mock_pxssh.return_value.expect.return_value = 0
-    mock_nxos_device.return_value = device_name
-    dev = get_device(target=dev_info['target'],
-                     user=dev_info['user'],
-                     passwd=dev_info['passwd'])
-    assert dev == device_name
 
+@pytest.mark.parametrize('nos', ['nxos', 'eos'])
+def test_get_device_api_nos(nos):
+    with patch('pylib.aeon.utils.paramiko.SSHClient') as mock_paramiko, \
+            patch('pylib.aeon.utils.aeon.%s.device.Device' % nos) as mock_device:
+        device_name = '%s_device' % nos
+        mock_paramiko.return_value.invoke_shell.return_value = mock_shell(nos)
+        mock_device.return_value = device_name
+        dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+        assert dev == device_name
+        mock_device.assert_called_with(dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+        mock_paramiko.return_value.close.assert_called_once_with()
 
-@patch('pylib.aeon.utils.paramiko.SSHClient')
-@patch('pylib.aeon.utils.aeon.nxos.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_nos_only(mock_pxssh, mock_nxos_device, mock_paramiko):
-    device_name = 'nxos'
-    mock_pxssh.return_value.expect.return_value = 0
-    mock_nxos_device.return_value = device_name
-    dev = get_device(target=dev_info['target'],
-                     user=dev_info['user'],
-                     passwd=dev_info['passwd'],
-                     nos_only=True)
-    assert dev == device_name
 
-@patch('pylib.aeon.utils.paramiko.SSHClient')
-@patch('pylib.aeon.utils.aeon.eos.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_eos(mock_pxssh, mock_eos_device, mock_paramiko):
-    device_name = 'eos_device'
-    mock_pxssh.return_value.expect.return_value = 1
-    mock_eos_device.return_value = device_name
-    dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
-    assert dev == device_name
+@pytest.mark.parametrize('nos', ['cumulus', 'ubuntu', 'centos', 'opx'])
+def test_get_device_ssh_nos(nos):
+    with patch('pylib.aeon.utils.paramiko.SSHClient') as mock_paramiko, \
+            patch('pylib.aeon.utils.aeon.%s.device.Device' % nos) as mock_device:
+        device_name = '%s_device' % nos
+        mock_paramiko.return_value.invoke_shell.return_value = mock_shell(nos)
+        mock_device.return_value = device_name
+        dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+        assert dev == device_name
+        # the detection session is handed to the device, not closed
+        mock_device.assert_called_with(dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'],
+                                       client=mock_paramiko.return_value)
+        assert not mock_paramiko.return_value.close.called
 
 
 @patch('pylib.aeon.utils.paramiko.SSHClient')
 @patch('pylib.aeon.utils.aeon.cumulus.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_cumulus(mock_pxssh, mock_cumulus_device, mock_paramiko):
-    device_name = 'cumulus_device'
-    mock_pxssh.return_value.expect.side_effect = [2, 0]
-    mock_cumulus_device.return_value = device_name
-    dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
-    assert dev == device_name
+def test_get_device_ssh_nos_device_error(mock_cumulus_device, mock_paramiko):
+    mock_paramiko.return_value.invoke_shell.return_value = mock_shell('cumulus')
+    mock_cumulus_device.side_effect = Exception
+    with pytest.raises(Exception):
+        get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+    mock_paramiko.return_value.close.assert_called_once_with()
 
 
 @patch('pylib.aeon.utils.paramiko.SSHClient')
-@patch('pylib.aeon.utils.aeon.ubuntu.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_ubuntu(mock_pxssh, mock_ubuntu_device, mock_paramiko):
-    device_name = 'ubuntu_device'
-    mock_pxssh.return_value.expect.side_effect = [2, 1]
-    mock_ubuntu_device.return_value = device_name
-    dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
-    assert dev == device_name
+@patch('pylib.aeon.utils.aeon.nxos.device.Device')
+def test_get_device_nos_only(mock_nxos_device, mock_paramiko):
+    mock_paramiko.return_value.invoke_shell.return_value = mock_shell('cumulus')
+    dev = get_device(target=dev_info['target'],
+                     user=dev_info['user'],
+                     passwd=dev_info['passwd'],
+                     nos_only=True)
+    assert dev == 'cumulus'
+    assert not mock_nxos_device.called
+    mock_paramiko.return_value.close.assert_called_once_with()
 
 
 @patch('pylib.aeon.utils.paramiko.SSHClient')
-@patch('pylib.aeon.utils.aeon.centos.device.Device')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_centos(mock_pxssh, mock_centos_device, mock_paramiko):
-    device_name = 'centos_device'
-    mock_pxssh.return_value.expect.side_effect = [2, 2]
-    mock_centos_device.return_value = device_name
-    dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
-    assert dev == device_name
+def test_get_device_target_error(mock_ssh):
+    mock_ssh.return_value.invoke_shell.return_value = mock_shell('unknown')
+    with pytest.raises(TargetError) as e:
+        get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+    assert e.value.message == 'Unable to determine device type for %s' % dev_info['target']
+    mock_ssh.return_value.close.assert_called_once_with()
 
 
 @patch('pylib.aeon.utils.paramiko.SSHClient')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_target_error(mock_pxssh, mock_ssh):
-    mock_pxssh.return_value.expect.side_effect = [2, 4]
+def test_get_device_detect_timeout(mock_ssh):
+    mock_ssh.return_value.invoke_shell.return_value.recv.side_effect = [b'$ show version', socket.timeout]
     with pytest.raises(TargetError) as e:
-        dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+        get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
     assert e.value.message == 'Unable to determine device type for %s' % dev_info['target']
 
 
 @patch('pylib.aeon.utils.paramiko.SSHClient')
-@patch('pylib.aeon.utils.pexpect.pxssh.pxssh')
-def test_get_device_exception(mock_pxssh, mock_ssh):
+def test_get_device_exception(mock_ssh):
     exception_msg = 'Test Exception Message'
-    mock_pxssh.return_value.login.side_effect = ExceptionPxssh(exception_msg)
+    mock_ssh.return_value.invoke_shell.side_effect = SSHException(exception_msg)
     with pytest.raises(TargetError) as e:
-        dev = get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+        get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
     assert e.value.message == 'Error logging in to {target} : {error}'.format(target=dev_info['target'], error=exception_msg)
 
 
@@ -150,4 +183,228 @@ def test_get_device_paramiko_ssh_exception(mock_paramiko):
     mock_paramiko.return_value.connect.side_effect = SSHException
     with pytest.raises(TargetError) as e:
         get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
-    assert e.value.message == ('Error logging in: %s' % dev_info['target'])
\ No newline at end of file
+    assert e.value.message == ('Error logging in: %s' % dev_info['target'])
+
+
+@patch('pylib.aeon.utils.paramiko.SSHClient')
+def test_get_device_timeout(mock_ssh):
+    mock_ssh.return_value.invoke_shell.return_value = mock_shell('cumulus')
+    get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'],
+               nos_only=True, timeout=2)
+    # the banner and the authentication are bounded by the timeout too
+    login = mock_ssh.return_value.connect.call_args[1]
+    assert 0 < login['timeout'] <= 2
+    assert 0 < login['banner_timeout'] <= 2
+    assert 0 < login['auth_timeout'] <= 2
+    for args, _ in mock_ssh.return_value.invoke_shell.return_value.settimeout.call_args_list:
+        assert 0 < args[0] <= 2
+
+
+@patch('pylib.aeon.utils.time.time')
+@patch('pylib.aeon.utils.paramiko.SSHClient')
+def test_get_device_timeout_expired(mock_ssh, mock_time):
+    mock_time.side_effect = [0] + [100] * 10
+    with pytest.raises(TargetError) as e:
+        get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'], timeout=2)
+    assert e.value.message == 'Timeout getting device %s' % dev_info['target']
+    assert not mock_ssh.return_value.connect.called
+
+
+@patch('aeon.utils.get_device')
+def test_get_devices(mock_get_device):
+    error = TargetError('Device unreachable: 1.1.1.2')
+    failure = ValueError('boom')
+
+    def get_device_side_effect(target, **kwargs):
+        assert kwargs == dict(user='test_user', passwd='test_passwd', nos_only=True, timeout=5, cache=None,
+                      fingerprint=True, fields=None, facts_store=None)
+        if target == '1.1.1.2':
+            raise error
+        if target == '1.1.1.3':
+            raise failure
+        return 'cumulus'
+
+    mock_get_device.side_effect = get_device_side_effect
+    targets = ['1.1.1.1', '1.1.1.2', '1.1.1.3']
+    results = dict(get_devices(targets, user='test_user', passwd='test_passwd',
+                               nos_only=True, max_workers=2, timeout=5))
+    assert sorted(results) == targets
+    assert results['1.1.1.1'] == 'cumulus'
+    assert results['1.1.1.2'] is error
+    assert isinstance(results['1.1.1.3'], TargetError)
+    assert results['1.1.1.3'].exc is failure
+
+
+@patch('pylib.aeon.utils.paramiko.SSHClient')
+@patch('pylib.aeon.utils.aeon.cumulus.device.Device')
+def test_get_device_cache(mock_cumulus_device, mock_ssh, tmpdir):
+    mock_ssh.return_value.invoke_shell.return_value = mock_shell('cumulus')
+    host_key = mock_ssh.return_value.get_transport.return_value.get_remote_server_key.return_value
+    host_key.asbytes.return_value = b'host-key'
+    cache = NosCache(path=str(tmpdir.join('nos_cache.json')))
+
+    get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'], cache=cache)
+    assert mock_ssh.return_value.invoke_shell.called
+    assert NosCache(path=cache.path).get(dev_info['target'], host_key_fingerprint(b'host-key')) == 'cumulus'
+
+    # a cache hit skips detection
+    mock_ssh.return_value.invoke_shell.reset_mock()
+    get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'], cache=cache)
+    assert not mock_ssh.return_value.invoke_shell.called
+    mock_cumulus_device.assert_called_with(dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'],
+                                           client=mock_ssh.return_value)
+
+    # a failure to build the device invalidates the entry
+    mock_cumulus_device.side_effect = Exception
+    with pytest.raises(Exception):
+        get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'], cache=cache)
+    assert cache.get(dev_info['target'], host_key_fingerprint(b'host-key')) is None
+
+
+def test_nos_cache(tmpdir):
+    cache = NosCache(path=str(tmpdir.join('aeon', 'nos_cache.json')), ttl=60)
+    cache.set('1.1.1.1', 'SHA256:one', 'eos')
+    assert cache.get('1.1.1.1', 'SHA256:one') == 'eos'
+    assert cache.get('1.1.1.2', 'SHA256:one') is None
+
+    # a changed host key drops the entry
+    assert cache.get('1.1.1.1', 'SHA256:two') is None
+    assert cache.get('1.1.1.1', 'SHA256:one') is None
+
+    cache.set('1.1.1.1', 'SHA256:one', 'eos')
+    with patch('pylib.aeon.utils.nos_cache.time.time') as mock_time:
+        mock_time.return_value = cache._entries['1.1.1.1']['time'] + 61
+        assert cache.get('1.1.1.1', 'SHA256:one') is None
+
+    cache.invalidate('1.1.1.1')
+    assert NosCache(path=cache.path).get('1.1.1.1', 'SHA256:one') is None
+
+
+def test_nos_cache_shared(tmpdir):
+    # two caches on one file, as two processes would have
+    one = NosCache(path=str(tmpdir.join('aeon', 'nos_cache.json')))
+    two = NosCache(path=one.path)
+    assert two.get('1.1.1.1', 'SHA256:one') is None
+
+    one.set('1.1.1.1', 'SHA256:one', 'eos')
+    two.set('1.1.1.2', 'SHA256:two', 'nxos')
+    assert two.get('1.1.1.1', 'SHA256:one') == 'eos'
+
+    one.invalidate('1.1.1.3')
+    fresh = NosCache(path=one.path)
+    assert fresh.get('1.1.1.1', 'SHA256:one') == 'eos'
+    assert fresh.get('1.1.1.2', 'SHA256:two') == 'nxos'
+
+
+def test_facts_store(tmpdir):
+    store = FactsStore(path=str(tmpdir.join('aeon', 'facts.db')))
+    store.set('1.1.1.1', '1507000000', '3.7.2', {'serial_number': 'ABC'})
+    assert store.get('1.1.1.1', '1507000000', '3.7.2') == {'serial_number': 'ABC'}
+    assert store.get('1.1.1.2', '1507000000', '3.7.2') is None
+
+    # the boot time read back from a device may jitter a little
+    assert FactsStore(path=store.path).get('1.1.1.1', '1507000001') == {'serial_number': 'ABC'}
+
+    # an upgrade drops the entry
+    assert store.get('1.1.1.1', '1507000000', '3.7.3') is None
+    assert store.get('1.1.1.1', '1507000000', '3.7.2') is None
+
+    # as does a reboot
+    store.set('1.1.1.1', 'Tue Oct 10 10:00:00 2017', None, {'serial_number': 'ABC'})
+    assert store.get('1.1.1.1', 'Tue Oct 10 10:00:00 2017') == {'serial_number': 'ABC'}
+    assert store.get('1.1.1.1', 'Wed Oct 11 10:00:00 2017') is None
+
+    store.set('1.1.1.1', '1507000000', '3.7.2', {'serial_number': 'ABC'})
+    store.invalidate('1.1.1.1')
+    assert store.get('1.1.1.1', '1507000000', '3.7.2') is None
+
+
+@pytest.mark.parametrize('nos', ['nxos', 'eos'])
+def test_get_device_fingerprint_api_nos(nos, mock_probe_target):
+    found = Fingerprint(dev_info['target'])
+    found.api_protos[nos] = 'https'
+    found.classify()
+    mock_probe_target.return_value = found
+    with patch('pylib.aeon.utils.paramiko.SSHClient') as mock_ssh, \
+            patch('pylib.aeon.utils.aeon.%s.device.Device' % nos) as mock_device:
+        get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'])
+        mock_device.assert_called_with(dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'],
+                                       proto='https')
+        # no login was needed
+        assert not mock_ssh.called
+
+        # but nos_only still logs in, so that the credentials are checked
+        mock_ssh.return_value.invoke_shell.return_value = mock_shell(nos)
+        assert get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'],
+                          nos_only=True) == nos
+        assert mock_ssh.return_value.connect.called
+        assert sent_script(mock_ssh) == ['show version\nexit\n']
+
+
+@patch('pylib.aeon.utils.paramiko.SSHClient')
+def test_get_device_fingerprint_no_banner(mock_ssh, mock_probe_target):
+    # the banner of a slow host may not come within the probe timeout
+    mock_probe_target.return_value = Fingerprint(dev_info['target'])
+    mock_probe_target.return_value.classify()
+    mock_ssh.return_value.invoke_shell.return_value = mock_shell('cumulus')
+    assert get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'],
+                      nos_only=True) == 'cumulus'
+    assert 'cat /proc/version' in sent_script(mock_ssh)[0]
+
+
+@patch('pylib.aeon.utils.paramiko.SSHClient')
+@patch('pylib.aeon.utils.aeon.opx.device.Device')
+def test_get_device_fingerprint_candidates(mock_opx_device, mock_ssh, mock_probe_target):
+    found = Fingerprint(dev_info['target'])
+    found.ssh_banner = 'SSH-2.0-OpenSSH_6.7p1 Debian-5+deb8u3'
+    found.classify()
+    mock_probe_target.return_value = found
+    mock_ssh.return_value.invoke_shell.return_value = mock_shell('opx')
+    assert get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'],
+                      nos_only=True) == 'opx'
+    # show version can only identify NX-OS or EOS, so is not sent
+    assert sent_script(mock_ssh) == [
+        'cat /proc/version\n'
+        '[ -f /etc/opx/opx-environment.sh ] && echo "device is ""OPX"\n'
+        'exit\n']
+
+
+@pytest.mark.parametrize('banner, api_protos, candidates', [
+    (None, {}, Fingerprint.NOS_TYPES),
+    ('SSH-2.0-OpenSSH_7.4', {}, Fingerprint.NOS_TYPES),
+    ('SSH-2.0-OpenSSH_7.2p2 Ubuntu-4ubuntu2.4', {}, ['ubuntu']),
+    ('SSH-2.0-OpenSSH_6.7p1 Debian-5+deb8u3', {}, ['cumulus', 'opx']),
+    ('SSH-2.0-Cisco-1.25', {}, ['nxos']),
+    ('SSH-2.0-OpenSSH_7.4', {'nxos': 'http'}, ['nxos']),
+    (None, {'eos': 'https'}, ['eos']),
+    ('SSH-2.0-OpenSSH_7.4', {'eos': 'https', 'nxos': 'https'}, Fingerprint.NOS_TYPES),
+    ('SSH-2.0-OpenSSH_7.2p2 Ubuntu-4ubuntu2.4', {'eos': 'https'}, Fingerprint.NOS_TYPES),
+])
+def test_fingerprint_classify(banner, api_protos, candidates):
+    found = Fingerprint(dev_info['target'])
+    found.ssh_banner = banner
+    found.api_protos.update(api_protos)
+    found.classify()
+    assert sorted(found.candidates) == sorted(candidates)
+    assert found.nos == (candidates[0] if len(candidates) == 1 else None)
+
+
+@patch('aeon.utils.fingerprint._probe_api')
+@patch('aeon.utils.fingerprint._probe_ssh_banner')
+def test_probe_target(mock_banner, mock_api):
+    mock_banner.return_value = 'SSH-2.0-OpenSSH_7.4'
+    mock_api.side_effect = lambda target, proto, path, timeout: \
+        401 if path == '/command-api' else 404
+    found = probe_target(dev_info['target'], timeout=0.1)
+    assert found.nos == 'eos'
+    assert found.proto('eos') == 'http'
+    assert found.ssh_banner == 'SSH-2.0-OpenSSH_7.4'
+
+
+@patch('pylib.aeon.utils.aeon.cumulus.device.Device')
+@patch('pylib.aeon.utils.paramiko.SSHClient')
+def test_get_device_timeout_device(mock_ssh, mock_device):
+    mock_ssh.return_value.invoke_shell.return_value = mock_shell('cumulus')
+    get_device(target=dev_info['target'], user=dev_info['user'], passwd=dev_info['passwd'], timeout=2)
+    # the probe of the device is bounded by what is left of the timeout
+    assert 0 < mock_device.call_args[1]['timeout'] <= 2
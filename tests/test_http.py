@@ -0,0 +1,149 @@
+import datetime
+import json
+import ssl
+import threading
+import warnings
+
+import pytest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+from pyeapi import eapilib
+from requests.packages.urllib3.exceptions import InsecureRequestWarning
+
+from aeon.eos.connector import Connector
+from aeon.base.http import TLS_RESUMPTION, disable_insecure_warnings, http_pool
+
+
+def self_signed_cert(tmpdir):
+    from cryptography import x509
+    from cryptography.x509.oid import NameOID
+    from cryptography.hazmat.backends import default_backend
+    from cryptography.hazmat.primitives import hashes, serialization
+    from cryptography.hazmat.primitives.asymmetric import ec
+
+    key = ec.generate_private_key(ec.SECP256R1(), default_backend())
+    name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, u'switch')])
+    now = datetime.datetime.utcnow()
+    cert = x509.CertificateBuilder().subject_name(name).issuer_name(name).public_key(
+        key.public_key()).serial_number(1).not_valid_before(now).not_valid_after(
+        now + datetime.timedelta(days=1)).sign(key, hashes.SHA256(), default_backend())
+
+    certfile, keyfile = tmpdir.join('cert.pem'), tmpdir.join('key.pem')
+    certfile.write_binary(cert.public_bytes(serialization.Encoding.PEM))
+    keyfile.write_binary(key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.TraditionalOpenSSL,
+        serialization.NoEncryption()))
+    return str(certfile), str(keyfile)
+
+
+class EapiHandler(BaseHTTPRequestHandler):
+    """
+    Stands in for eAPI: runs 'show hostname' only.
+    """
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers['content-length'])).decode())
+        self.server.requests.append(dict(
+            client=self.client_address,
+            resumed=getattr(self.connection, 'session_reused', None)))
+
+        cmds = request['params']['cmds']
+        if all(cmd in ('enable', 'show hostname') for cmd in cmds):
+            got = dict(result=[{} if cmd == 'enable' else {'hostname': 'eos'} for cmd in cmds])
+        else:
+            got = dict(error=dict(code=1002, message='CLI command 2 of 2 failed: invalid command',
+                                  data=[{}, dict(errors=['Invalid input'])]))
+        got.update(jsonrpc='2.0', id=request['id'])
+
+        body = json.dumps(got).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class TLSServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def get_request(self):
+        sock, addr = self.socket.accept()
+        return self.context.wrap_socket(sock, server_side=True), addr
+
+    def handle_error(self, request, client_address):
+        # the client closing a kept-alive connection
+        pass
+
+
+@pytest.fixture()
+def eapi(tmpdir):
+    server = TLSServer(('127.0.0.1', 0), EapiHandler)
+    server.context = ssl.SSLContext(getattr(ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23))
+    server.context.load_cert_chain(*self_signed_cert(tmpdir))
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, kwargs=dict(poll_interval=0.05))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_eapi_session(eapi):
+    con = Connector('127.0.0.1', port=eapi.server_port, proto='https', user='admin', passwd='admin')
+    assert con.execute('show hostname') == {'hostname': 'eos'}
+    assert con.execute(['show hostname', 'show hostname']) == [{'hostname': 'eos'}] * 2
+
+    # one connection, kept open between the requests
+    assert len(set(r['client'] for r in eapi.requests)) == 1
+
+    with pytest.raises(eapilib.CommandError):
+        con.eapi.execute(['enable', 'show bogus'])
+    con.close()
+
+
+def test_eapi_session_unverified(eapi):
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        con = Connector('127.0.0.1', port=eapi.server_port, proto='https', user='admin', passwd='admin')
+        con.execute('show hostname')
+        assert [w for w in caught if issubclass(w.category, InsecureRequestWarning)]
+
+        del caught[:]
+        disable_insecure_warnings()
+        con.execute('show hostname')
+        con.close()
+        assert not [w for w in caught if issubclass(w.category, InsecureRequestWarning)]
+
+
+def test_http_pool_size():
+    # a shared pool keeps the connections of many devices
+    pool = http_pool()
+    assert pool.poolmanager.pools._maxsize == 64
+    con = Connector('127.0.0.1', user='admin', passwd='admin')
+    assert con.eapi.session.get_adapter('http://').poolmanager.pools._maxsize == 1
+
+
+@pytest.mark.skipif(not TLS_RESUMPTION, reason='TLS sessions cannot be resumed')
+def test_tls_session_resumption(eapi):
+    pool = http_pool()
+    for _ in range(3):
+        con = Connector('127.0.0.1', port=eapi.server_port, proto='https',
+                        user='admin', passwd='admin', pool=pool)
+        con.execute('show hostname')
+        # drop the connection, so that the next connector makes a new one
+        pool.poolmanager.clear()
+
+    assert len(set(r['client'] for r in eapi.requests)) == 3
+    assert [r['resumed'] for r in eapi.requests] == [False, True, True]
@@ -0,0 +1,282 @@
+import json
+import re
+import ssl
+import threading
+
+import pytest
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:  # python 2
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+pytest.importorskip('lxml')
+
+from aeon.nxos.connector import NxosConnector, _parse_config_resp  # NOQA
+from aeon.nxos.device import Device  # NOQA
+from aeon.nxos.exceptions import CommandError, RequestError  # NOQA
+from aeon.base.http import http_pool  # NOQA
+from tests.test_http import TLSServer, self_signed_cert  # NOQA
+
+
+show_commands = {
+    'show hostname': {'hostname': 'nxos.example.com'},
+    'show hardware': {
+        'kickstart_ver_str': '7.0(3)I5(1)', 'chassis_id': 'NX-OSv Chassis',
+        'TABLE_slot': {'ROW_slot': {'TABLE_slot_info': {'ROW_slot_info': [{
+            'serial_num': 'TM6012EC74B', 'model_num': 'N9K-NXOSV', 'part_num': 'N9K-C9300v',
+            'part_revision': '0.0', 'hw_ver': '0.0'}]}}}},
+    'show interface mgmt0': {'TABLE_interface': {'ROW_interface': {'eth_hw_addr': '000c.2936.1c15'}}},
+    'show system uptime': {'sys_st_time': 'Mon Oct 16 10:04:13 2017'},
+}
+
+running_config = ''.join('interface Ethernet1/%d\n  no shutdown\n' % port for port in range(1, 500))
+
+
+class NxapiHandler(BaseHTTPRequestHandler):
+    """
+    Stands in for NX-API: logs the user in once, then authenticates them by
+    their nxapi_auth cookie.
+    """
+    protocol_version = 'HTTP/1.1'
+    CHUNK_SIZE = 4096
+
+    def do_POST(self):
+        data = self.rfile.read(int(self.headers['content-length'])).decode()
+        if self.headers.get('content-type') == 'application/json-rpc':
+            return self.send_jsonrpc(json.loads(data))
+        if '<chunk>1</chunk>' in data:
+            return self.send_chunk(data)
+
+        commands = re.search('<input>(.*)</input>', data).group(1).split(' ;')
+        server = self.server
+        server.requests.append(dict(client=self.client_address,
+                                    cookie=self.headers.get('cookie'),
+                                    auth=self.headers.get('authorization'),
+                                    commands=commands))
+
+        outputs = [
+            dict(code='200', msg='Success', input=cmd, body=show_commands[cmd])
+            if cmd in show_commands else
+            dict(code='400', msg='Input CLI command error', input=cmd,
+                 clierror='% Invalid command at \'^\' marker.\n')
+            for cmd in commands]
+        if len(outputs) == 1:
+            outputs = outputs[0]
+        body = json.dumps({'ins_api': {'outputs': {'output': outputs}}}).encode()
+        self.send_response(200)
+        if 'nxapi_auth' not in (self.headers.get('cookie') or ''):
+            server.logins += 1
+            self.send_header('Set-Cookie', 'nxapi_auth=admin:%d' % server.logins)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_jsonrpc(self, calls):
+        self.server.requests.append(dict(commands=[call['params']['cmd'] for call in calls]))
+        got = [
+            dict(jsonrpc='2.0', id=call['id'], result=dict(body=show_commands[call['params']['cmd']]))
+            if call['params']['cmd'] in show_commands else
+            dict(jsonrpc='2.0', id=call['id'], error=dict(
+                code=-32602, message='Invalid params', data=dict(msg='% Invalid command\n')))
+            for call in calls]
+        self.send_json(got[0] if len(got) == 1 else got)
+
+    def send_json(self, got):
+        body = json.dumps(got).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_chunk(self, data):
+        # the output of 'show running-config', CHUNK_SIZE characters a time
+        sid = re.search('<sid>(.*)</sid>', data).group(1)
+        offset = 0 if sid == '1' else int(sid)
+        self.server.requests.append(dict(sid=sid))
+
+        offset, piece = offset + self.CHUNK_SIZE, running_config[offset:offset + self.CHUNK_SIZE]
+        self.send_json({'ins_api': {
+            'sid': str(offset) if offset < len(running_config) else 'eoc',
+            'outputs': {'output': dict(code='200', msg='Success', input='show running-config',
+                                       body=piece)}}})
+
+    def log_message(self, *args):
+        pass
+
+
+class NxapiServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture()
+def nxapi():
+    server = NxapiServer(('127.0.0.1', 0), NxapiHandler)
+    server.requests = []
+    server.logins = 0
+    thread = threading.Thread(target=server.serve_forever, kwargs=dict(poll_interval=0.05))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def nxapi_tls(tmpdir):
+    server = TLSServer(('127.0.0.1', 0), NxapiHandler)
+    server.context = ssl.SSLContext(getattr(ssl, 'PROTOCOL_TLS_SERVER', ssl.PROTOCOL_SSLv23))
+    server.context.load_cert_chain(*self_signed_cert(tmpdir))
+    server.requests = []
+    server.logins = 0
+    thread = threading.Thread(target=server.serve_forever, kwargs=dict(poll_interval=0.05))
+    thread.daemon = True
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_nxos_connector_verify(nxapi_tls):
+    # the self-signed certificate of the device is refused by default
+    con = NxosConnector('127.0.0.1', port=nxapi_tls.server_port, proto='https',
+                        user='admin', passwd='admin')
+    with pytest.raises(RequestError):
+        con.exec_opcmd('show hostname')
+    con.close()
+
+    con = NxosConnector('127.0.0.1', port=nxapi_tls.server_port, proto='https',
+                        user='admin', passwd='admin', verify=False)
+    assert con.exec_opcmd('show hostname') == {'hostname': 'nxos.example.com'}
+    con.close()
+
+
+def test_nxos_connector_keepalive(nxapi):
+    con = NxosConnector('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin')
+    for _ in range(3):
+        assert con.exec_opcmd('show hostname') == {'hostname': 'nxos.example.com'}
+
+    # one connection and one login throughout
+    assert len(set(r['client'] for r in nxapi.requests)) == 1
+    assert nxapi.logins == 1
+    assert [r['cookie'] for r in nxapi.requests] == [None, 'nxapi_auth=admin:1', 'nxapi_auth=admin:1']
+    con.close()
+
+
+def test_nxos_connector_shared_pool(nxapi):
+    pool = http_pool()
+    first, second = [
+        NxosConnector('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin', pool=pool)
+        for _ in range(2)]
+    first.exec_opcmd('show hostname')
+    first.close()
+    second.exec_opcmd('show hostname')
+
+    # the connection is shared, the login is not
+    assert len(set(r['client'] for r in nxapi.requests)) == 1
+    assert nxapi.logins == 2
+
+
+def test_nxos_connector_exec_opcmds(nxapi):
+    con = NxosConnector('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin')
+    commands = ['show hostname', 'show bogus'] + ['show system uptime'] * 10
+    got = con.exec_opcmds(commands)
+
+    assert [r['commands'] for r in nxapi.requests] == [commands[:10], commands[10:]]
+    assert got[0] == {'hostname': 'nxos.example.com'}
+    assert isinstance(got[1], CommandError)
+    assert got[1].command == 'show bogus'
+    assert got[2:] == [{'sys_st_time': 'Mon Oct 16 10:04:13 2017'}] * 10
+
+    # a single output is not given in a list
+    assert con.exec_opcmds(['show hostname']) == [{'hostname': 'nxos.example.com'}]
+    con.close()
+
+
+def test_nxos_device_facts_one_round_trip(nxapi):
+    dev = Device('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin', no_probe=True)
+    assert [r['commands'] for r in nxapi.requests] == [
+        ['show hostname', 'show hardware', 'show interface mgmt0', 'show system uptime']]
+    assert dev.facts['fqdn'] == 'nxos.example.com'
+    assert dev.facts['serial_number'] == 'TM6012EC74B'
+    assert dev.facts['mac_address'] == '00:0c:29:36:1c:15'
+    assert dev.facts['boot_time'] == 'Mon Oct 16 10:04:13 2017'
+
+    # as aeon-nxos facts outputs them
+    assert json.loads(json.dumps(dict(dev.facts)))['hw_model'] == 'N9K-NXOSV'
+    dev.close()
+
+
+@pytest.mark.parametrize('failures', [3, 4])
+def test_nxos_device_gather_hardware_retry(failures):
+    dev = Device.__new__(Device)
+    dev.facts = {}
+    routine = dev._gather_hardware()
+    next(routine)
+    for _ in range(failures - 1):
+        routine.throw(CommandError('busy'))
+
+    if failures < 4:
+        routine.throw(CommandError('busy'))
+        with pytest.raises(StopIteration):
+            routine.send(show_commands['show hardware'])
+        assert dev.facts['serial_number'] == 'TM6012EC74B'
+    else:
+        # the error of the last attempt is raised
+        with pytest.raises(CommandError):
+            routine.throw(CommandError('busy'))
+
+
+def test_nxos_connector_exec_opcmd_stream(nxapi):
+    con = NxosConnector('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin')
+    pieces = list(con.exec_opcmd_stream('show running-config'))
+
+    assert ''.join(pieces) == running_config
+    assert max(len(piece) for piece in pieces) == NxapiHandler.CHUNK_SIZE
+    # the first request starts a session, the others name it
+    sids = [r['sid'] for r in nxapi.requests]
+    assert len(sids) == len(pieces)
+    assert sids[:2] == ['1', str(NxapiHandler.CHUNK_SIZE)]
+    con.close()
+
+
+def test_nxos_connector_jsonrpc(nxapi):
+    con = NxosConnector('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin',
+                        transport='jsonrpc')
+    assert con.exec_opcmd('show hostname') == {'hostname': 'nxos.example.com'}
+    with pytest.raises(CommandError):
+        con.exec_opcmd('show bogus')
+
+    commands = ['show bogus'] + ['show hostname'] * 11
+    got = con.exec_opcmds(commands)
+    assert got[0].command == 'show bogus'
+    assert got[1:] == [{'hostname': 'nxos.example.com'}] * 11
+    assert [r['commands'] for r in nxapi.requests][2:] == [commands[:10], commands[10:]]
+    con.close()
+
+    with pytest.raises(ValueError):
+        NxosConnector('127.0.0.1', transport='soap')
+
+
+def test_nxos_device_facts_jsonrpc(nxapi):
+    dev = Device('127.0.0.1', port=nxapi.server_port, user='admin', passwd='admin', no_probe=True,
+                 transport='jsonrpc')
+    assert len(nxapi.requests) == 1
+    assert dev.facts['hw_model'] == 'N9K-NXOSV'
+    dev.close()
+
+
+def test_nxos_parse_config_resp():
+    ok = (b'<?xml version="1.0" encoding="UTF-8"?>\n<ins_api><outputs>'
+          b'<output><body/><code>200</code><msg>Success</msg></output></outputs></ins_api>')
+    assert _parse_config_resp(ok) is True
+
+    failed = ok.replace(b'<body/><code>200</code>',
+                        b'<clierror>% Invalid command</clierror><code>400</code>')
+    with pytest.raises(CommandError) as exc:
+        _parse_config_resp(failed)
+    assert exc.value.args == ('% Invalid command',)
@@ -16,6 +16,7 @@ g_facts = {
     'vendor': 'OPX',
     'mac_address': '52:54:00:A5:EC:36',
     'os_name': 'OPX',
+    'boot_time': '1507000000',
     'service_tag': None
 }
 
@@ -57,9 +58,11 @@ def opx_device(mock_connector, mock_probe, request):
             if arg == """grep -oP '^PLATFORM=[\"]?\K.*\w' /etc/OPX-release-version""":
                 results.append({'stdout': grep_platform_out})
             # hostname
+            elif arg == "awk '/^btime/ {print $2}' /proc/stat":
+                results.append({'stdout': '1507000000\n'})
             elif arg == 'hostname':
                 results.append({'stdout': hostname_out})
-            elif arg =='ip link show':
+            elif arg == 'ip -json -details link show 2>/dev/null || ip -details link show':
                 results.append({'stdout': ip_link_show_out})
         return True, results
     mock_connector.return_value.execute.side_effect = mock_execute
@@ -80,4 +83,14 @@ def test_opx_device(opx_device):
     assert dev.facts == g_facts
 
 
-
+@mock.patch('pylib.aeon.opx.device.Connector')
+def test_opx_device_no_mac_address(mock_connector):
+    outputs = {
+        'ip -json -details link show 2>/dev/null || ip -details link show': ip_link_show_out.split('\n2:')[0],
+        'ip route show 0.0.0.0/0': ''}
+    mock_connector.return_value.execute.side_effect = lambda args, **kwargs: (
+        True, [{'stdout': outputs[arg]} for arg in args])
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', no_probe=True,
+                        fields=['mac_address'])
+    assert dev.facts['mac_address'] is None
+    assert dev.facts['serial_number'] is None
@@ -1,3 +1,5 @@
+import pickle
+
 import mock
 import pytest
 from pylib.aeon.ubuntu import device
@@ -16,6 +18,7 @@ g_facts = {
     'vendor': 'Canonical',
     'mac_address': '01:23:45:67:89:0A',
     'os_name': 'ubuntu',
+    'boot_time': '1507000000',
     'service_tag': None
 }
 
@@ -26,6 +29,8 @@ ip_link_show_out = '''
     link/ether 01:23:45:67:89:0A brd ff:ff:ff:ff:ff:ff
 '''
 
+ip_route_show_out = 'default via 10.0.0.1 dev ens3 proto dhcp src 10.0.0.5 metric 100\n'
+
 hostname_out = "ubuntu"
 cat_version_out = "14.04"
 
@@ -53,10 +58,14 @@ def ubuntu_device(mock_connector, mock_probe, request):
             if arg == 'cat /etc/lsb-release | grep RELEASE | cut -d= -f2':
                 results.append({'stdout': cat_version_out})
             # hostname
+            elif arg == "awk '/^btime/ {print $2}' /proc/stat":
+                results.append({'stdout': '1507000000\n'})
             elif arg == 'hostname':
                 results.append({'stdout': hostname_out})
-            elif arg =='ip link show':
+            elif arg == 'ip -json -details link show 2>/dev/null || ip -details link show':
                 results.append({'stdout': ip_link_show_out})
+            elif arg == 'ip route show 0.0.0.0/0':
+                results.append({'stdout': ip_route_show_out})
         return True, results
     mock_connector.return_value.execute.side_effect = mock_execute
     mock_probe.return_value = True, 10
@@ -77,3 +86,64 @@ def test_ubuntu_device(ubuntu_device):
 
 
 
+
+
+@mock.patch('pylib.aeon.ubuntu.device.BaseDevice.probe')
+@mock.patch('pylib.aeon.ubuntu.device.Connector')
+def test_ubuntu_device_lazy_facts(mock_connector, mock_probe):
+    mock_connector.return_value.execute.return_value = True, [{'stdout': cat_version_out}]
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', no_gather_facts=True)
+    assert not mock_connector.return_value.execute.called
+    assert dev.facts['os_name'] == 'ubuntu'
+    assert not mock_connector.return_value.execute.called
+
+    assert dev.facts['os_version'] == '14.04'
+    assert dev.facts['os_version'] == '14.04'
+    mock_connector.return_value.execute.assert_called_once_with(
+        ['cat /etc/lsb-release | grep RELEASE | cut -d= -f2'])
+
+
+@mock.patch('pylib.aeon.ubuntu.device.BaseDevice.probe')
+@mock.patch('pylib.aeon.ubuntu.device.Connector')
+def test_ubuntu_device_gather_fields(mock_connector, mock_probe):
+    mock_connector.return_value.execute.return_value = True, [{'stdout': hostname_out}]
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', fields=['hostname'])
+    mock_connector.return_value.execute.assert_called_once_with(['hostname'])
+    dev.gather_facts(fields=['fqdn', 'hostname'])
+    assert mock_connector.return_value.execute.call_count == 1
+    assert dev.facts['fqdn'] == 'ubuntu'
+
+
+@mock.patch('pylib.aeon.ubuntu.device.Connector')
+def test_ubuntu_device_mgmt_link(mock_connector):
+    # the first Ethernet interface is a data port; the management
+    # interface is that of the default route
+    outputs = {
+        'ip -json -details link show 2>/dev/null || ip -details link show': ip_link_show_out.replace(
+            '2: ens3:', '2: ens2: <BROADCAST> mtu 1500\n    link/ether 52:54:00:00:00:02 brd ff:ff:ff:ff:ff:ff\n'
+            '3: ens3:'),
+        'ip route show 0.0.0.0/0': ip_route_show_out}
+    mock_connector.return_value.execute.side_effect = lambda args, **kwargs: (
+        True, [{'stdout': outputs[arg]} for arg in args])
+    dev = device.Device('1.1.1.1', user='test_user', passwd='test_passwd', no_probe=True,
+                        fields=['mac_address'])
+    assert dev.links.mac_address() == '52:54:00:00:00:02'
+    assert dev.mgmt_link() == 'ens3'
+    assert dev.facts['mac_address'] == g_facts['mac_address']
+    assert dev.get_mac_address() == g_facts['mac_address']
+    assert dev.get_mac_address('ens2') == '52:54:00:00:00:02'
+
+
+@mock.patch('pylib.aeon.ubuntu.device.BaseDevice.probe')
+@mock.patch('pylib.aeon.ubuntu.device.Connector')
+def test_ubuntu_device_snapshot(mock_connector, mock_probe, ubuntu_device):
+    snapshot = pickle.loads(pickle.dumps(ubuntu_device.snapshot(), pickle.HIGHEST_PROTOCOL))
+    assert snapshot.target == '1.1.1.1'
+    assert snapshot.facts.to_dict() == g_facts
+
+    dev = snapshot.attach()
+    assert isinstance(dev, device.Device)
+    assert dev.facts == g_facts
+    mock_connector.assert_called_once_with(hostname='1.1.1.1', user='test_user', passwd='test_passwd',
+                                           no_gather_facts=True)
+    assert not mock_connector.return_value.execute.called